@@ -56,6 +56,16 @@ class Settings(BaseSettings):
         default="redis://localhost:6379/0",
         env="CELERY_RESULT_BACKEND"
     )
+    PROVIDER_DISTRIBUTED_CONCURRENCY: bool = Field(
+        default=True,
+        env="PROVIDER_DISTRIBUTED_CONCURRENCY",
+        description="是否通过Redis在所有进程间共享同一API Key的并发上限"
+    )
+    PROVIDER_CONCURRENCY_LEASE_SECONDS: int = Field(
+        default=30,
+        env="PROVIDER_CONCURRENCY_LEASE_SECONDS",
+        description="跨进程并发名额的租期(秒),调用期间定期续租,持有进程异常退出时名额在到期后回收"
+    )
 
     # =============================================================================
     # JWT配置
@@ -128,6 +138,50 @@ class Settings(BaseSettings):
     ALLOWED_AVATAR_TYPES: List[str] = ["jpg", "jpeg", "png", "webp"]
     AVATAR_DEFAULT_SIZE: tuple = (200, 200)
 
+    # =============================================================================
+    # 电影合成配置
+    # =============================================================================
+    MOVIE_DOWNLOAD_CONCURRENCY: int = Field(
+        default=16,
+        env="MOVIE_DOWNLOAD_CONCURRENCY",
+        description="合成电影时并发下载过渡视频的最大数量"
+    )
+    MOVIE_TRANSITION_CACHE_DIR: Optional[str] = Field(
+        default=None,
+        env="MOVIE_TRANSITION_CACHE_DIR",
+        description="过渡视频本地缓存目录,为空时使用系统临时目录"
+    )
+    MOVIE_TRANSITION_CACHE_SIZE_GB: float = Field(
+        default=5.0,
+        env="MOVIE_TRANSITION_CACHE_SIZE_GB",
+        description="过渡视频本地缓存容量上限(GB),为0时禁用缓存"
+    )
+    MOVIE_TRANSITION_PROMPT_CACHE_TTL: int = Field(
+        default=7 * 24 * 3600,
+        env="MOVIE_TRANSITION_PROMPT_CACHE_TTL",
+        description="过渡提示词缓存有效期(秒),相同分镜内容和模型复用之前的LLM结果,0表示不缓存"
+    )
+    MOVIE_TRANSITION_LLM_RPM: int = Field(
+        default=60,
+        env="MOVIE_TRANSITION_LLM_RPM",
+        description="生成过渡提示词时每个API Key每分钟最多调用LLM的次数,0表示不限制"
+    )
+    MOVIE_VIDEO_API_RPM: int = Field(
+        default=60,
+        env="MOVIE_VIDEO_API_RPM",
+        description="调用视频生成服务(创建任务、查询状态)时每个API Key每分钟最多请求的次数,0表示不限制"
+    )
+    MOVIE_SCENE_EXTRACTION_MAX_CHARS: int = Field(
+        default=100000,
+        env="MOVIE_SCENE_EXTRACTION_MAX_CHARS",
+        description="单次场景提取允许的章节最大字符数,超过时直接拒绝而不调用LLM,0表示不限制"
+    )
+    MOVIE_STREAM_UPLOAD: bool = Field(
+        default=False,
+        env="MOVIE_STREAM_UPLOAD",
+        description="拼接输出分片MP4并直接管道上传到对象存储,不落盘"
+    )
+
     # =============================================================================
     # 日志配置
     # =============================================================================
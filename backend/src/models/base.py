@@ -4,7 +4,8 @@
 
 import uuid
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from enum import Enum
+from typing import Any, Dict, List, Optional
 
 from sqlalchemy import Column, DateTime
 from sqlalchemy.dialects.postgresql import UUID as PostgreSQLUUID
@@ -12,6 +13,9 @@ from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
 
+# 批量写入行数达到该阈值时使用PostgreSQL COPY，低于阈值时executemany更划算
+COPY_THRESHOLD = 100
+
 
 class TimestampMixin:
     """时间戳混入类"""
@@ -44,10 +48,73 @@ class BaseModel(Base, UUIDMixin, TimestampMixin):
         """字符串表示"""
         return f"<{self.__class__.__name__}(id={self.id})>"
 
+    @staticmethod
+    def _copy_value(column: Column, row: Dict[str, Any]) -> Any:
+        """
+        获取COPY写入的列值，缺失时补齐Python侧默认值
+
+        Args:
+            column: 表的列对象
+            row: 行数据
+
+        Returns:
+            列值
+        """
+        if column.name in row:
+            value = row[column.name]
+        elif column.default is None:
+            value = None
+        elif column.default.is_callable:
+            value = column.default.arg(None)
+        else:
+            value = column.default.arg
+
+        if isinstance(value, Enum):
+            value = value.value
+        return value
+
+    @classmethod
+    async def bulk_insert(cls, db_session, rows: List[Dict[str, Any]]) -> None:
+        """
+        批量插入记录
+
+        行数达到COPY_THRESHOLD且驱动为asyncpg时通过COPY协议写入，
+        否则使用INSERT executemany。COPY绕过SQLAlchemy的默认值处理，
+        因此所有列的Python侧默认值在这里补齐；行数据中需已包含主键ID。
+
+        Args:
+            db_session: 数据库会话
+            rows: 行数据列表，键为列名
+        """
+        if not rows:
+            return
+
+        table = cls.__table__
+        if len(rows) >= COPY_THRESHOLD:
+            connection = await db_session.connection()
+            if connection.dialect.driver == "asyncpg":
+                columns = list(table.columns)
+                records = [
+                    tuple(cls._copy_value(column, row) for column in columns)
+                    for row in rows
+                ]
+                # 与会话共用同一连接，COPY处于当前事务内
+                raw_connection = await connection.get_raw_connection()
+                await raw_connection.driver_connection.copy_records_to_table(
+                    table.name,
+                    records=records,
+                    columns=[column.name for column in columns],
+                    schema_name=table.schema,
+                )
+                return
+
+        await db_session.execute(table.insert(), rows)
+
 
 __all__ = [
     "Base",
     "BaseModel",
+    "COPY_THRESHOLD",
     "TimestampMixin",
     "UUIDMixin",
 ]
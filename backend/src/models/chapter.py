@@ -99,19 +99,15 @@ class Chapter(BaseModel):
         if not chapters_data:
             return []
 
-        # 生成ID并添加到数据中
+        # 生成ID并添加到数据中（已预分配ID的沿用）
         chapter_ids = []
         for chapter_data in chapters_data:
-            chapter_id = uuid.uuid4()
-            chapter_data['id'] = chapter_id
+            chapter_id = chapter_data.setdefault('id', uuid.uuid4())
             chapter_data.setdefault('is_confirmed', False)
             chapter_ids.append(chapter_id)
 
-        # 批量插入
-        await db_session.execute(
-            cls.__table__.insert(),
-            chapters_data
-        )
+        # 批量插入（大批量时使用COPY）
+        await cls.bulk_insert(db_session, chapters_data)
 
         # 提交以确保获取ID
         await db_session.flush()
@@ -5,7 +5,7 @@
 
 import uuid
 from enum import Enum
-from typing import Dict, List, TYPE_CHECKING
+from typing import Dict, List, Optional, TYPE_CHECKING
 
 from sqlalchemy import Boolean, Column, ForeignKey, Index, Integer, String, Text, func
 from sqlalchemy import select
@@ -61,14 +61,15 @@ class Paragraph(BaseModel):
     # ==================== 批量操作方法 ====================
 
     @classmethod
-    async def batch_create(cls, db_session, paragraphs_data: List[Dict], chapter_ids: List[str]) -> List[str]:
+    async def batch_create(cls, db_session, paragraphs_data: List[Dict],
+                           chapter_ids: Optional[List[str]] = None) -> List[str]:
         """
         批量创建段落记录
 
         Args:
             db_session: 数据库会话
             paragraphs_data: 段落数据列表
-            chapter_ids: 对应的章节ID列表
+            chapter_ids: 对应的章节ID列表，为None时使用数据中已有的chapter_id
 
         Returns:
             创建的段落ID列表
@@ -76,21 +77,18 @@ class Paragraph(BaseModel):
         if not paragraphs_data:
             return []
 
-        # 生成ID并添加到数据中
+        # 生成ID并添加到数据中（已预分配ID的沿用）
         paragraph_ids = []
         for i, paragraph_data in enumerate(paragraphs_data):
-            paragraph_id = uuid.uuid4()
-            paragraph_data['id'] = paragraph_id
-            paragraph_data['chapter_id'] = chapter_ids[i]
+            paragraph_id = paragraph_data.setdefault('id', uuid.uuid4())
+            if chapter_ids is not None:
+                paragraph_data['chapter_id'] = chapter_ids[i]
             paragraph_data.setdefault('action', ParagraphAction.KEEP.value)
             paragraph_data.setdefault('is_confirmed', False)
             paragraph_ids.append(paragraph_id)
 
-        # 批量插入
-        await db_session.execute(
-            cls.__table__.insert(),
-            paragraphs_data
-        )
+        # 批量插入（大批量时使用COPY）
+        await cls.bulk_insert(db_session, paragraphs_data)
 
         # 提交以确保获取ID
         await db_session.flush()
@@ -185,6 +183,50 @@ class Paragraph(BaseModel):
         )
         return result.scalars().all()
 
+    @classmethod
+    async def count_by_project_id(cls, db_session, project_id: str) -> int:
+        """
+        统计项目的段落数量
+
+        Args:
+            db_session: 数据库会话
+            project_id: 项目ID
+
+        Returns:
+            段落数量
+        """
+        from src.models.chapter import Chapter
+
+        result = await db_session.execute(
+            select(func.count(cls.id))
+            .where(cls.chapter_id.in_(
+                select(Chapter.id).where(Chapter.project_id == project_id)
+            ))
+        )
+        return result.scalar()
+
+    @classmethod
+    async def sum_word_count_by_project_id(cls, db_session, project_id: str) -> int:
+        """
+        统计项目所有段落的总字数
+
+        Args:
+            db_session: 数据库会话
+            project_id: 项目ID
+
+        Returns:
+            总字数
+        """
+        from src.models.chapter import Chapter
+
+        result = await db_session.execute(
+            select(func.coalesce(func.sum(cls.word_count), 0))
+            .where(cls.chapter_id.in_(
+                select(Chapter.id).where(Chapter.project_id == project_id)
+            ))
+        )
+        return result.scalar()
+
     @classmethod
     async def delete_by_project_id(cls, db_session, project_id: str) -> int:
         """
@@ -6,7 +6,7 @@
 import uuid
 from datetime import datetime
 from enum import Enum
-from typing import Dict, List, TYPE_CHECKING
+from typing import Dict, List, Optional, TYPE_CHECKING
 
 from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, String, Text, func
 from sqlalchemy import select
@@ -110,14 +110,15 @@ class Sentence(BaseModel):
     # ==================== 批量操作方法 ====================
 
     @classmethod
-    async def batch_create(cls, db_session, sentences_data: List[Dict], paragraph_ids: List[str]) -> List[str]:
+    async def batch_create(cls, db_session, sentences_data: List[Dict],
+                           paragraph_ids: Optional[List[str]] = None) -> List[str]:
         """
         批量创建句子记录
 
         Args:
             db_session: 数据库会话
             sentences_data: 句子数据列表
-            paragraph_ids: 对应的段落ID列表
+            paragraph_ids: 对应的段落ID列表，为None时使用数据中已有的paragraph_id
 
         Returns:
             创建的句子ID列表
@@ -125,20 +126,17 @@ class Sentence(BaseModel):
         if not sentences_data:
             return []
 
-        # 生成ID并添加到数据中
+        # 生成ID并添加到数据中（已预分配ID的沿用）
         sentence_ids = []
         for i, sentence_data in enumerate(sentences_data):
-            sentence_id = uuid.uuid4()
-            sentence_data['id'] = sentence_id
-            sentence_data['paragraph_id'] = paragraph_ids[i]
+            sentence_id = sentence_data.setdefault('id', uuid.uuid4())
+            if paragraph_ids is not None:
+                sentence_data['paragraph_id'] = paragraph_ids[i]
             sentence_data.setdefault('status', SentenceStatus.PENDING.value)
             sentence_ids.append(sentence_id)
 
-        # 批量插入
-        await db_session.execute(
-            cls.__table__.insert(),
-            sentences_data
-        )
+        # 批量插入（大批量时使用COPY）
+        await cls.bulk_insert(db_session, sentences_data)
 
         # 提交以确保获取ID
         await db_session.flush()
@@ -212,6 +210,33 @@ class Sentence(BaseModel):
         )
         return result.scalars().all()
 
+    @classmethod
+    async def count_by_project_id(cls, db_session, project_id: str) -> int:
+        """
+        统计项目的句子数量
+
+        Args:
+            db_session: 数据库会话
+            project_id: 项目ID
+
+        Returns:
+            句子数量
+        """
+        from src.models.paragraph import Paragraph
+        from src.models.chapter import Chapter
+
+        result = await db_session.execute(
+            select(func.count(cls.id))
+            .where(cls.paragraph_id.in_(
+                select(Paragraph.id).where(
+                    Paragraph.chapter_id.in_(
+                        select(Chapter.id).where(Chapter.project_id == project_id)
+                    )
+                )
+            ))
+        )
+        return result.scalar()
+
     @classmethod
     async def get_pending_sentences(cls, db_session, limit: int = 100) -> List['Sentence']:
         """
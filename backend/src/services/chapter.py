@@ -14,7 +14,8 @@
 """
 
 from datetime import timedelta
-from typing import List, Optional, Tuple
+from itertools import chain, repeat
+from typing import Dict, List, Optional, Tuple
 
 from sqlalchemy import desc, func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -53,6 +54,44 @@ class ChapterService(BaseService):
             f"ChapterService 初始化完成，会话管理: {'外部注入' if db_session else '自管理'}"
         )
 
+    async def _create_paragraphs_with_sentences(
+        self, chapter_id, paragraphs_data: List[Dict], sentences_data: List[Dict]
+    ) -> None:
+        """
+        批量创建章节的段落和句子
+
+        句子数据按段落顺序排列，每个段落的sentence_count表示其句子数量。
+        按句子数量展开段落ID后一次性写入全部句子，而不是逐段落插入。
+
+        Args:
+            chapter_id: 章节ID
+            paragraphs_data: 段落数据列表
+            sentences_data: 句子数据列表
+        """
+        paragraph_ids = await Paragraph.batch_create(
+            self.db_session,
+            paragraphs_data,
+            [chapter_id] * len(paragraphs_data),
+        )
+
+        if not sentences_data or not paragraph_ids:
+            return
+
+        # 每个句子对应的段落ID，例如句子数[2, 1] -> [p1, p1, p2]
+        sentence_paragraph_ids = list(chain.from_iterable(
+            repeat(paragraph_id, paragraph_data["sentence_count"])
+            for paragraph_id, paragraph_data in zip(paragraph_ids, paragraphs_data)
+        ))
+
+        # 数据不一致时只保存能对应上段落的句子
+        count = min(len(sentences_data), len(sentence_paragraph_ids))
+        if count:
+            await Sentence.batch_create(
+                self.db_session,
+                sentences_data[:count],
+                sentence_paragraph_ids[:count],
+            )
+
     async def create_chapter(
         self, project_id: str, title: str, content: str, chapter_number: int
     ) -> Chapter:
@@ -115,50 +154,12 @@ class ChapterService(BaseService):
             self.add(chapter)
             await self.flush()  # 获取数据库生成的ID
 
-            # 更新段落数据中的章节ID并创建段落
+            # 创建段落和句子并关联章节ID
             if paragraphs_data:
-                for paragraph_data in paragraphs_data:
-                    paragraph_data["chapter_id"] = chapter.id
-
-                # 批量创建段落
-                paragraph_ids = await Paragraph.batch_create(
-                    self.db_session,
-                    paragraphs_data,
-                    [chapter.id] * len(paragraphs_data),
+                await self._create_paragraphs_with_sentences(
+                    chapter.id, paragraphs_data, sentences_data
                 )
 
-                # 创建句子并关联段落ID
-                if sentences_data and paragraph_ids:
-                    # 直接使用解析服务已经分配好的句子数据
-                    sentence_idx = 0
-                    for para_idx, paragraph_id in enumerate(paragraph_ids):
-                        if para_idx >= len(paragraphs_data):
-                            break
-
-                        # 获取当前段落的句子数量
-                        para_sentence_count = paragraphs_data[para_idx][
-                            "sentence_count"
-                        ]
-
-                        # 获取对应的句子数据
-                        para_sentences_data = sentences_data[
-                            sentence_idx : sentence_idx + para_sentence_count
-                        ]
-
-                        # 设置句子的段落ID
-                        for sentence_data in para_sentences_data:
-                            sentence_data["paragraph_id"] = paragraph_id
-
-                        # 批量创建当前段落的句子
-                        if para_sentences_data:
-                            await Sentence.batch_create(
-                                self.db_session,
-                                para_sentences_data,
-                                [paragraph_id] * len(para_sentences_data),
-                            )
-
-                        sentence_idx += para_sentence_count
-
             # 提交事务
             await self.commit()
             await self.refresh(chapter)  # 确保获取最新数据
@@ -396,45 +397,10 @@ class ChapterService(BaseService):
 
             # 创建新的段落和句子
             if paragraphs_data:
-                # 批量创建段落
-                paragraph_ids = await Paragraph.batch_create(
-                    self.db_session,
-                    paragraphs_data,
-                    [chapter.id] * len(paragraphs_data),
+                await self._create_paragraphs_with_sentences(
+                    chapter.id, paragraphs_data, sentences_data
                 )
 
-                # 创建句子并关联段落ID
-                if sentences_data and paragraph_ids:
-                    # 直接使用解析服务已经分配好的句子数据
-                    sentence_idx = 0
-                    for para_idx, paragraph_id in enumerate(paragraph_ids):
-                        if para_idx >= len(paragraphs_data):
-                            break
-
-                        # 获取当前段落的句子数量
-                        para_sentence_count = paragraphs_data[para_idx][
-                            "sentence_count"
-                        ]
-
-                        # 获取对应的句子数据
-                        para_sentences_data = sentences_data[
-                            sentence_idx : sentence_idx + para_sentence_count
-                        ]
-
-                        # 设置句子的段落ID
-                        for sentence_data in para_sentences_data:
-                            sentence_data["paragraph_id"] = paragraph_id
-
-                        # 批量创建当前段落的句子
-                        if para_sentences_data:
-                            await Sentence.batch_create(
-                                self.db_session,
-                                para_sentences_data,
-                                [paragraph_id] * len(para_sentences_data),
-                            )
-
-                        sentence_idx += para_sentence_count
-
         await self.commit()
         await self.refresh(chapter)
 
@@ -10,6 +10,7 @@ from src.models.movie import MovieShot, MovieCharacter, MovieScene, MovieScript
 from src.services.base import BaseService
 from src.services.provider.factory import ProviderFactory
 from src.services.api_key import APIKeyService
+from src.services.movie_prompts import _compile_template
 
 logger = get_logger(__name__)
 
@@ -39,6 +40,7 @@ class DialoguePromptEngine(BaseService):
 ### 提示词范例：
 "The character's mouth moves naturally synchronized with the speech, lips forming precise vowels. Eyes narrowing with subtle intensity, eyebrows slightly furrowed to express controlled anger. A slight twitch at the corner of the mouth, enhancing the realistic facial performance."
 """
+    _render_performance_design = staticmethod(_compile_template(PERFORMANCE_DESIGN_PROMPT))
 
     async def design_performance_prompt(self, shot_id: str, character_id: Optional[str], api_key_id: str) -> str:
         """
@@ -69,7 +71,7 @@ class DialoguePromptEngine(BaseService):
 
         try:
             system_prompt = "你是一个专业的AI视频提示词优化专家。只输出提示词文本。"
-            user_prompt = self.PERFORMANCE_DESIGN_PROMPT.format(
+            user_prompt = self._render_performance_design(
                 char_traits=char_traits,
                 dialogue=shot.dialogue or "None",
                 visual_desc=shot.shot,
@@ -16,15 +16,34 @@ from src.services.base import BaseService
 from src.services.provider.base import BaseLLMProvider
 from src.services.provider.factory import ProviderFactory
 from src.utils.storage import get_storage_client
-from openai import RateLimitError
+from openai import APIStatusError, RateLimitError
 
 logger = get_logger(__name__)
 
 
+# 请求本身有误、重试也不会成功的状态码（408/409/429 除外的 4xx）
+_NON_RETRYABLE_STATUS = frozenset(range(400, 500)) - {408, 409, 429}
+
+# 服务端通过 Retry-After 要求的最长等待时间（秒）
+RETRY_AFTER_MAX = 60.0
+
+
+def _retry_after_seconds(error: Exception) -> float | None:
+    """读取 API 错误响应中的 Retry-After（秒），没有或无法解析时返回 None"""
+    if not isinstance(error, APIStatusError):
+        return None
+    try:
+        return min(float(error.response.headers.get("retry-after")), RETRY_AFTER_MAX)
+    except (TypeError, ValueError):
+        return None
+
+
 async def retry_with_backoff(task_fn, max_retries=5):
     """
-    针对 429 限流错误加入指数退避重试机制
+    针对 429 限流、5xx 和网络错误加入指数退避重试机制
 
+    - 参数错误、鉴权失败等 4xx 错误直接抛出，不做无意义的重试
+    - 响应带 Retry-After 时按服务端要求等待，否则指数退避 + 随机抖动
     """
     delay = 1.0
     for attempt in range(max_retries):
@@ -33,9 +52,14 @@ async def retry_with_backoff(task_fn, max_retries=5):
         except Exception as e:
             if attempt == max_retries - 1:
                 raise
-            # 指数退避 + 随机抖动
-            sleep_time = delay + random.random() * 0.5
-            print(f"[Retry] 限流，{sleep_time:.2f} 秒后重试 attempt={attempt + 1}/{max_retries}")
+            if isinstance(e, APIStatusError) and e.status_code in _NON_RETRYABLE_STATUS:
+                raise
+            retry_after = _retry_after_seconds(e)
+            sleep_time = retry_after if retry_after is not None else delay + random.random() * delay
+            logger.warning(
+                f"[Retry] 调用失败({type(e).__name__}: {e})，{sleep_time:.2f} 秒后重试 "
+                f"attempt={attempt + 1}/{max_retries}"
+            )
             await asyncio.sleep(sleep_time)
             delay = min(delay * 2, 20)  # 最长等待 20 秒
 
@@ -91,7 +115,8 @@ async def process_sentence(
                 logger.info(f"[LLM] Base64 字符串长度: {len(b64_string)},ContentType:{content_type}")
 
                 try:
-                    content = base64.b64decode(b64_string)
+                    # 多MB图片的base64解码放到线程池中执行，避免阻塞事件循环
+                    content = await asyncio.to_thread(base64.b64decode, b64_string)
                 except Exception as e:
                     logger.error(f"[LLM] Base64 解码失败: {e}")
                     raise
@@ -202,7 +227,9 @@ class ImageService(BaseService):
 
         logger.info(f"[LLM] 开始并发处理，共 {len(tasks)} 项")
 
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        # 整批请求共用 Provider 的连接，结束后统一释放
+        async with llm_provider:
+            results = await asyncio.gather(*tasks, return_exceptions=True)
 
         # 统计成功和失败数量
         success_count = 0
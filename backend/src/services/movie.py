@@ -2,6 +2,7 @@
 电影服务 - 负责协调电影生成的各个环节
 """
 
+from operator import attrgetter
 from typing import Optional, List
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload, joinedload
@@ -46,9 +47,10 @@ class MovieService(BaseService):
         characters = list(chars_result.scalars().all())
         
         # 3. 为每个shot生成专业提示词(包含上一帧信息)
+        sorted_shots_by_scene = {}
         for scene in script.scenes:
-            # 按顺序处理分镜,以便能找到上一个分镜
-            sorted_shots = sorted(scene.shots, key=lambda s: s.order_index)
+            # 按顺序处理分镜,以便能找到上一个分镜(排序结果在第4步复用)
+            sorted_shots = sorted_shots_by_scene[scene.id] = sorted(scene.shots, key=attrgetter('order_index'))
             
             logger.info(f"场景 {scene.order_index} 共有 {len(sorted_shots)} 个分镜")
             
@@ -81,12 +83,12 @@ class MovieService(BaseService):
         modified = False
         for scene in script.scenes:
             if not scene.scene_image_prompt:
-                if scene.shots and len(scene.shots) > 0:
+                sorted_shots = sorted_shots_by_scene[scene.id]
+                if sorted_shots:
                     # 基于分镜描述生成
-                    shots_desc = "\n\n".join([
-                        f"Shot {shot.order_index}: {shot.shot}"
-                        for shot in sorted(scene.shots, key=lambda x: x.order_index)
-                    ])
+                    shots_desc = "\n\n".join(
+                        f"Shot {shot.order_index}: {shot.shot}" for shot in sorted_shots
+                    )
                     scene.scene_image_prompt = MoviePromptTemplates.get_scene_image_prompt_from_shots(shots_desc)
                 else:
                     # 基于原始场景描述生成
@@ -14,7 +14,9 @@ from src.services.base import BaseService
 from src.services.provider.factory import ProviderFactory
 from src.services.api_key import APIKeyService
 from src.services.image import retry_with_backoff
+from src.services.movie_prompts import _compile_template
 from src.utils.storage import get_storage_client
+from src.utils.text_utils import strip_code_fence
 import uuid
 import io
 import aiohttp
@@ -69,6 +71,7 @@ Technical Output:
 - Aspect ratio: 16:9
 - Place the English name in the top-left corner, clearly visible and readable
 """
+    _render_template = staticmethod(_compile_template(TEMPLATE))
     
     @classmethod
     def build_prompt(
@@ -108,7 +111,7 @@ Technical Output:
             traits_str = "Standard appearance"
         
         # 生成提示词
-        prompt = cls.TEMPLATE.format(
+        prompt = cls._render_template(
             name=name,
             era_background=era,
             occupation=occ,
@@ -164,6 +167,7 @@ class MovieCharacterService(BaseService):
 {text}
 ---
 """
+    _render_extract_characters = staticmethod(_compile_template(EXTRACT_CHARACTERS_PROMPT))
 
     async def extract_characters_from_chapter(self, chapter_id: str, api_key_id: str, model: str = None) -> List[MovieCharacter]:
         """
@@ -208,7 +212,7 @@ class MovieCharacterService(BaseService):
         )
 
         try:
-            prompt = self.EXTRACT_CHARACTERS_PROMPT.format(text=script_text[:5000]) # 限制长度
+            prompt = self._render_extract_characters(text=script_text[:5000]) # 限制长度
             response = await llm_provider.completions(
                 model=model,
                 messages=[
@@ -219,8 +223,7 @@ class MovieCharacterService(BaseService):
             )
             
             content = response.choices[0].message.content.strip()
-            if content.startswith("```json"): content = content[7:-3].strip()
-            elif content.startswith("```"): content = content[3:-3].strip()
+            content = strip_code_fence(content)
             
             char_data = json.loads(content)
             
@@ -3,9 +3,101 @@ Movie Prompt Templates
 电影工作流的所有Prompt模板集中管理
 """
 
+from functools import lru_cache
+from string import Formatter
+from typing import Any, Callable, Dict
+
+
+def _compile_template(template: str) -> Callable[..., str]:
+    """
+    将str.format风格的模板预编译为等价的f-string渲染函数
+
+    模板只在类定义时解析一次,之后每次渲染只需执行f-string拼接,
+    不再重复解析格式字符串
+
+    Args:
+        template: 仅包含 {name} 形式占位符的模板
+
+    Returns:
+        接收关键字参数的渲染函数
+    """
+    parts = []
+    field_names = []
+    for literal, field_name, format_spec, conversion in Formatter().parse(template):
+        if literal:
+            # 普通字符串字面量与f-string相邻时会被编译为同一个字符串拼接
+            parts.append(repr(literal))
+        if field_name is not None:
+            if not field_name.isidentifier() or format_spec or conversion:
+                raise ValueError(f"不支持的模板占位符: {field_name!r}")
+            parts.append(f"f'{{{field_name}}}'")
+            if field_name not in field_names:
+                field_names.append(field_name)
+
+    params = ", ".join(field_names)
+    body = " ".join(parts) or "''"
+    source = f"def _render(*, {params}):\n    return {body}\n" if params else f"def _render():\n    return {body}\n"
+
+    namespace: dict = {}
+    exec(compile(source, "<prompt-template>", "exec"), namespace)
+    return namespace["_render"]
+
+
+def _list_schema(list_key: str, item_properties: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    构建 {list_key: [item, ...]} 结构的严格JSON Schema（所有字段必填、不允许额外字段）
+
+    Args:
+        list_key: 顶层列表字段名
+        item_properties: 列表元素的字段定义
+
+    Returns:
+        JSON Schema
+    """
+    return {
+        "type": "object",
+        "properties": {
+            list_key: {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": item_properties,
+                    "required": list(item_properties),
+                    "additionalProperties": False,
+                },
+            },
+        },
+        "required": [list_key],
+        "additionalProperties": False,
+    }
+
+
 class MoviePromptTemplates:
     """电影工作流Prompt模板管理器"""
     
+    # 支持 json_schema 结构化输出（服务端按schema约束生成）的 provider，其余使用 json_object
+    STRUCTURED_OUTPUT_PROVIDERS = frozenset({"openai"})
+
+    @classmethod
+    def json_response_format(cls, provider: str, name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        获取LLM调用的 response_format 参数
+
+        Args:
+            provider: API Key 的 provider
+            name: schema 名称
+            schema: 输出的JSON Schema
+
+        Returns:
+            支持结构化输出时为 json_schema 格式，否则为 json_object
+        """
+        if provider and provider.lower() in cls.STRUCTURED_OUTPUT_PROVIDERS:
+            return {
+                "type": "json_schema",
+                "json_schema": {"name": name, "schema": schema, "strict": True},
+            }
+        return {"type": "json_object"}
+
     # 场景提取Prompt
     SCENE_EXTRACTION = """你是一名国际获奖级的电影编剧与导演，擅长将长篇小说章节转化为可直接用于电影制作与视频生成的结构化电影场景数据。
 
@@ -94,6 +186,14 @@ Scene 描述应接近"剧本 + 文学描写"的融合，但始终以 **镜头可
 ## 【待改编小说章节】：
 {text}
 """
+    _render_scene_extraction = staticmethod(_compile_template(SCENE_EXTRACTION))
+
+    # 场景提取输出的JSON Schema
+    SCENE_EXTRACTION_SCHEMA = _list_schema("scenes", {
+        "order_index": {"type": "integer"},
+        "scene": {"type": "string"},
+        "characters": {"type": "array", "items": {"type": "string"}},
+    })
 
     @classmethod
     def get_scene_extraction_prompt(cls, characters: str, text: str) -> str:
@@ -107,7 +207,7 @@ Scene 描述应接近"剧本 + 文学描写"的融合，但始终以 **镜头可
         Returns:
             str: 格式化后的prompt
         """
-        return cls.SCENE_EXTRACTION.format(characters=characters, text=text)
+        return cls._render_scene_extraction(characters=characters, text=text)
 
     # 分镜提取Prompt
     SHOT_EXTRACTION = """你是一名国际获奖级的电影导演与分镜设计师，擅长将电影场景拆分为**可直接生成固定 8 秒视频的分镜头（Shot）**。
@@ -237,6 +337,18 @@ Scene 描述应接近"剧本 + 文学描写"的融合，但始终以 **镜头可
 
 ---
 """
+    # 以 {scene} 为界拆分: 前半部分只依赖角色列表,同一章节内所有场景共用
+    _render_shot_extraction_prefix, _render_shot_extraction_suffix = (
+        staticmethod(_compile_template(part)) for part in SHOT_EXTRACTION.split("{scene}", 1)
+    )
+
+    # 分镜提取输出的JSON Schema
+    SHOT_EXTRACTION_SCHEMA = _list_schema("shots", {
+        "order_index": {"type": "integer"},
+        "shot": {"type": "string"},
+        "dialogue": {"type": "string"},
+        "characters": {"type": "array", "items": {"type": "string"}},
+    })
 
     @classmethod
     def get_shot_extraction_prompt(cls, characters: str, scene: str) -> str:
@@ -250,7 +362,34 @@ Scene 描述应接近"剧本 + 文学描写"的融合，但始终以 **镜头可
         Returns:
             str: 格式化后的prompt
         """
-        return cls.SHOT_EXTRACTION.format(characters=characters, scene=scene)
+        return cls.get_shot_extraction_prefix(characters) + cls.get_shot_extraction_suffix(scene)
+
+    @classmethod
+    @lru_cache(maxsize=32)
+    def get_shot_extraction_prefix(cls, characters: str) -> str:
+        """
+        获取分镜提取Prompt中与场景无关的前缀(按角色列表缓存)
+        
+        Args:
+            characters: JSON格式的角色列表
+            
+        Returns:
+            str: 格式化后的prompt前缀
+        """
+        return cls._render_shot_extraction_prefix(characters=characters)
+
+    @classmethod
+    def get_shot_extraction_suffix(cls, scene: str) -> str:
+        """
+        获取分镜提取Prompt中随场景变化的后缀
+        
+        Args:
+            scene: 场景描述
+            
+        Returns:
+            str: 格式化后的prompt后缀
+        """
+        return scene + cls._render_shot_extraction_suffix()
 
     # 场景图生成Prompt
     SCENE_IMAGE_GENERATION = """Create a cinematic establishing shot of the following environment.
@@ -310,6 +449,7 @@ Establish the mood and visual aesthetic:
 - NO mannequins or human-shaped objects
 
 Generate a detailed, cinematic establishing shot that captures the essence and atmosphere of this environment."""
+    _render_scene_image = staticmethod(_compile_template(SCENE_IMAGE_GENERATION))
 
     @classmethod
     def get_scene_image_prompt(cls, scene_description: str) -> str:
@@ -322,7 +462,7 @@ Generate a detailed, cinematic establishing shot that captures the essence and a
         Returns:
             str: 格式化后的prompt
         """
-        return cls.SCENE_IMAGE_GENERATION.format(scene_description=scene_description)
+        return cls._render_scene_image(scene_description=scene_description)
     
     # 基于分镜描述的场景图生成Prompt
     SCENE_IMAGE_FROM_SHOTS = """Create a cinematic establishing shot based on the visual elements described in the following shots.
@@ -382,6 +522,7 @@ Use Veo 3.1 Formula:
 - ❌ Clean, perfect surfaces (real world has imperfections)
 
 Generate a detailed, cinematic establishing shot that captures the environment where these shots take place."""
+    _render_scene_image_from_shots = staticmethod(_compile_template(SCENE_IMAGE_FROM_SHOTS))
 
     @classmethod
     def get_scene_image_prompt_from_shots(cls, shots_description: str) -> str:
@@ -394,9 +535,10 @@ Generate a detailed, cinematic establishing shot that captures the environment w
         Returns:
             str: 格式化后的prompt
         """
-        return cls.SCENE_IMAGE_FROM_SHOTS.format(shots_description=shots_description)
+        return cls._render_scene_image_from_shots(shots_description=shots_description)
 
     # 过渡视频提示词生成Prompt
+    # 分镜内容放在末尾：同一批次的所有调用共享前面的完整说明，便于服务商的前缀缓存命中
     TRANSITION_VIDEO = """你是一名精通 **Google Veo 3.1** 的电影级视频提示词生成专家。
 
 你的任务是：
@@ -407,18 +549,7 @@ Generate a detailed, cinematic establishing shot that captures the environment w
 * 前一个分镜已完整呈现，不得在本视频中重复、回放、延续或重新表现
 * 本视频 **必须从当前分镜的起始状态直接开始**
 * 前一个分镜的信息仅用于理解上下文连续性，绝对不能被生成到视频中
-
----
-
-### 【前一个分镜（仅作上下文参考，禁止生成）】
-
-{previous_shot}
-
----
-
-### 【当前分镜（这是你要生成的内容）】
-
-{current_shot}
+* 两个分镜的具体内容在本说明末尾给出
 
 ---
 
@@ -515,9 +646,23 @@ NO background music, NO BGM, NO soundtrack, only natural sound effects and ambie
 - [ ] 对话语言是否根据角色名称正确判断？
 - [ ] 是否声明了禁止背景音乐？
 
+---
+
+### 【前一个分镜（仅作上下文参考，禁止生成）】
+
+{previous_shot}
+
+---
+
+### 【当前分镜（这是你要生成的内容）】
+
+{current_shot}
+
+---
+
 **请严格按照上述要求，生成一个完整的8秒视频中文提示词。只输出提示词本身，不要有任何额外说明。**
 """
-
+    _render_transition_video = staticmethod(_compile_template(TRANSITION_VIDEO))
 
     @classmethod
     def get_transition_video_prompt(cls, previous_shot: str, current_shot: str) -> str:
@@ -531,7 +676,7 @@ NO background music, NO BGM, NO soundtrack, only natural sound effects and ambie
         Returns:
             str: 格式化后的prompt
         """
-        return cls.TRANSITION_VIDEO.format(previous_shot=previous_shot, current_shot=current_shot)
+        return cls._render_transition_video(previous_shot=previous_shot, current_shot=current_shot)
 
 
 __all__ = ["MoviePromptTemplates"]
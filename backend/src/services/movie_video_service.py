@@ -5,39 +5,76 @@
 - 获取章节的所有分镜视频
 - 验证分镜视频完整性
 - 并发下载分镜视频
-- 拼接分镜视频
-- 混合BGM
+- 拼接分镜视频并混合BGM(单次FFmpeg调用)
 - 上传到MinIO
 
 注意: 此服务不依赖Whisper模型,避免内存浪费
 """
 
 import asyncio
+import os
 import shutil
 import tempfile
+import time
 from pathlib import Path
-from typing import List, Optional
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 
 from sqlalchemy import select
-from sqlalchemy.orm import joinedload
 
+from src.core.config import settings
 from src.core.exceptions import BusinessLogicError
 from src.core.logging import get_logger
 from src.models import Chapter, VideoTask, VideoTaskStatus
-from src.models.movie import MovieScript
+from src.models.bgm import BGM
+from src.models.movie import MovieScript, MovieShotTransition
 from src.services.base import BaseService
+from src.services.bgm_service import BGMService
 from src.services.chapter import ChapterService
 from src.services.video_task import VideoTaskService
 from src.utils.ffmpeg_utils import (
+    FRAGMENTED_MP4_OUTPUT_ARGS,
+    build_concat_command,
     check_ffmpeg_installed,
-    concatenate_videos,
+    concat_and_mix_bgm,
+    concatenate_videos_fast,
+    create_concat_file,
+    finish_ffmpeg_stream,
     get_audio_duration,
-    mix_bgm_with_video,
+    parse_ffmpeg_output_duration,
+    start_ffmpeg_stream,
 )
+from src.utils.file_cache import LocalFileCache
 from src.utils.storage import get_storage_client
 
 logger = get_logger(__name__)
 
+# 下载阶段进度提交的最小间隔(秒),避免每个分镜下载完成都写一次数据库
+PROGRESS_COMMIT_INTERVAL = 5.0
+
+# 下载过渡视频时的最小分块大小(字节)
+DOWNLOAD_MIN_CHUNK_SIZE = 1024 * 1024
+
+
+class _AbortableStream:
+    """
+    可中止的FFmpeg输出流
+
+    取消后FFmpeg被结束,上传线程会读到EOF并把截断的数据当作完整对象提交;
+    标记中止后读取改为抛出异常,MinIO随之中止分片上传,不留下不完整的对象
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self.aborted = False
+
+    def read(self, size: int = -1) -> bytes:
+        if self.aborted:
+            raise OSError("流式上传已取消")
+        data = self._stream.read(size)
+        if self.aborted:
+            raise OSError("流式上传已取消")
+        return data
+
 
 class MovieVideoService(BaseService):
     """
@@ -52,6 +89,16 @@ class MovieVideoService(BaseService):
         self.storage_client = None
         logger.debug("MovieVideoService 初始化完成")
 
+    @staticmethod
+    def _get_transition_cache() -> Optional[LocalFileCache]:
+        """获取过渡视频本地缓存,未启用时返回None"""
+        if settings.MOVIE_TRANSITION_CACHE_SIZE_GB <= 0:
+            return None
+        cache_dir = settings.MOVIE_TRANSITION_CACHE_DIR or os.path.join(
+            tempfile.gettempdir(), "aicg-transition-cache"
+        )
+        return LocalFileCache(cache_dir, int(settings.MOVIE_TRANSITION_CACHE_SIZE_GB * 1024 ** 3))
+
     async def _get_storage_client(self):
         """获取存储客户端"""
         if self.storage_client is None:
@@ -66,31 +113,38 @@ class MovieVideoService(BaseService):
             chapter_id: 章节ID
             
         Returns:
-            过渡视频列表(按order_index排序)
+            过渡视频列表(按order_index排序),每行仅包含 id/order_index/video_url
         """
-        from src.models.movie import MovieShotTransition
-        
+        # 合成流程只用到这几列,直接按列查询,不加载ORM实体及其关系
         result = await self.db_session.execute(
-            select(MovieShotTransition)
+            select(
+                MovieShotTransition.id,
+                MovieShotTransition.order_index,
+                MovieShotTransition.video_url,
+            )
             .join(MovieScript)
             .where(MovieScript.chapter_id == chapter_id)
             .where(MovieShotTransition.video_url.isnot(None))
             .order_by(MovieShotTransition.order_index)
         )
         
-        transitions = result.scalars().all()
+        transitions = result.all()
         logger.info(f"章节 {chapter_id} 共有 {len(transitions)} 个过渡视频")
         return transitions
 
-    async def _validate_transition_videos(self, transitions: List) -> None:
+    async def _validate_transition_videos(self, transitions: List) -> Dict[str, int]:
         """
-        验证所有过渡视频都已生成
+        验证所有过渡视频都已生成,并确认对象存储中确实存在
         
         Args:
             transitions: 过渡视频列表
             
+        Returns:
+            视频对象键到文件大小(字节)的映射
+            
         Raises:
             BusinessLogicError: 如果有过渡视频缺失或状态不正确
+            StorageError: 查询对象存储失败(非对象不存在)
         """
         missing_videos = []
         
@@ -104,18 +158,32 @@ class MovieVideoService(BaseService):
             #         f"过渡{transition.order_index}: 状态={transition.status}"
             #     )
         
+        # 批量检查对象是否存在,在下载前尽早失败
+        sizes = {}
+        if not missing_videos:
+            storage_client = await self._get_storage_client()
+            sizes = await storage_client.stat_objects([t.video_url for t in transitions])
+            for transition in transitions:
+                if sizes.get(transition.video_url) is None:
+                    missing_videos.append(
+                        f"过渡{transition.order_index}: 存储中不存在视频文件"
+                    )
+        
         if missing_videos:
             error_msg = f"过渡视频不完整,共{len(missing_videos)}个问题:\n" + "\n".join(missing_videos[:10])
             if len(missing_videos) > 10:
                 error_msg += f"\n... 还有{len(missing_videos) - 10}个问题"
             raise BusinessLogicError(error_msg)
         
-        logger.info(f"✅ 所有 {len(transitions)} 个过渡视频验证通过")
+        logger.info(f"✅ 所有 {len(transitions)} 个过渡视频验证通过, 总大小: {sum(sizes.values())} bytes")
+        return sizes
 
     async def _download_transition_videos(
         self,
         transitions: List,
-        temp_dir: Path
+        temp_dir: Path,
+        sizes: Optional[Dict[str, int]] = None,
+        on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None
     ) -> List[Path]:
         """
         并发下载所有过渡视频
@@ -123,164 +191,206 @@ class MovieVideoService(BaseService):
         Args:
             transitions: 过渡视频列表
             temp_dir: 临时目录
+            sizes: 视频对象键到文件大小的映射(来自验证阶段),用于检查磁盘空间和选择分块大小
+            on_progress: 进度回调 (已完成数, 总数),每完成一个下载调用一次
             
         Returns:
             下载后的本地视频路径列表(按顺序)
         """
         storage_client = await self._get_storage_client()
+        cache = self._get_transition_cache()
+        sizes = sizes or {}
+        
+        # 已知总大小时,提前检查临时目录所在磁盘的剩余空间
+        total_size = sum(sizes.values())
+        free_space = shutil.disk_usage(temp_dir).free
+        if total_size > free_space:
+            raise BusinessLogicError(
+                f"临时目录磁盘空间不足: 需要{total_size} bytes, 可用{free_space} bytes"
+            )
         
         async def download_one(transition, index: int) -> Path:
             """下载单个过渡视频"""
             video_path = temp_dir / f"transition_{index:03d}.mp4"
             
             try:
-                logger.info(f"📥 下载过渡视频 {index + 1}/{len(transitions)}: {transition.video_url}")
-                content = await storage_client.download_file(transition.video_url)
+                # 对象键唯一且内容不变,重新合成时可直接复用本地缓存
+                if cache and await asyncio.to_thread(cache.get, transition.video_url, video_path):
+                    logger.info(f"♻️ 过渡视频 {index + 1} 命中本地缓存: {transition.video_url}")
+                    return video_path
                 
-                with open(video_path, 'wb') as f:
-                    f.write(content)
+                logger.info(f"📥 下载过渡视频 {index + 1}/{len(transitions)}: {transition.video_url}")
+                # 流式写入磁盘,避免将整个视频缓存在内存中
+                # 大文件使用更大的分块,减少读写次数
+                chunk_size = max(DOWNLOAD_MIN_CHUNK_SIZE, sizes.get(transition.video_url, 0) // 8)
+                await storage_client.download_file_to_path(
+                    transition.video_url, str(video_path), chunk_size=chunk_size
+                )
                 
-                logger.info(f"✅ 过渡视频 {index + 1} 下载完成: {len(content)} bytes")
+                logger.info(f"✅ 过渡视频 {index + 1} 下载完成: {video_path.stat().st_size} bytes")
+                if cache:
+                    await asyncio.to_thread(cache.put, transition.video_url, video_path)
                 return video_path
                 
             except Exception as e:
                 logger.error(f"❌ 过渡视频 {index + 1} 下载失败: {e}")
                 raise BusinessLogicError(f"下载过渡视频失败: 过渡{transition.order_index}")
         
-        # 并发下载,限制并发数为5
-        semaphore = asyncio.Semaphore(5)
+        # 并发下载,并发数由配置决定(不超过过渡视频数量)
+        concurrency = max(1, min(settings.MOVIE_DOWNLOAD_CONCURRENCY, len(transitions)))
+        semaphore = asyncio.Semaphore(concurrency)
         
         async def download_with_limit(transition, idx: int) -> Path:
             async with semaphore:
                 return await download_one(transition, idx)
         
         tasks = [
-            download_with_limit(transition, idx)
+            asyncio.create_task(download_with_limit(transition, idx))
             for idx, transition in enumerate(transitions)
         ]
         
-        logger.info(f"🚀 开始并发下载 {len(transitions)} 个过渡视频(并发数:5)")
-        video_paths = await asyncio.gather(*tasks)
+        logger.info(f"🚀 开始并发下载 {len(transitions)} 个过渡视频(并发数:{concurrency})")
+        try:
+            # 按完成顺序汇报进度,任一下载失败立即取消其余下载
+            for completed, finished in enumerate(asyncio.as_completed(tasks), start=1):
+                await finished
+                if on_progress:
+                    await on_progress(completed, len(tasks))
+        except BaseException:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        
         logger.info(f"✅ 所有过渡视频下载完成")
         
-        return video_paths
+        if cache:
+            await asyncio.to_thread(cache.evict)
+        
+        # 结果按过渡顺序返回
+        return [t.result() for t in tasks]
 
     async def _concatenate_videos(
         self,
         video_paths: List[Path],
-        temp_dir: Path
-    ) -> Path:
+        temp_dir: Path,
+        bgm: Optional[Tuple[Path, float]] = None
+    ) -> Tuple[Path, Optional[float]]:
         """
-        拼接分镜视频
+        拼接分镜视频(如提供BGM则在同一次FFmpeg调用中混合)
         
         Args:
             video_paths: 视频文件路径列表
             temp_dir: 临时目录
+            bgm: 可选的 (BGM本地路径, BGM音量)
             
         Returns:
-            拼接后的视频路径
+            (拼接后的视频路径, 视频时长), 时长从FFmpeg输出解析,解析失败时为None
         """
         final_video_path = temp_dir / "movie_final.mp4"
         concat_file_path = temp_dir / "concat.txt"
         
+        if bgm:
+            bgm_path, bgm_volume = bgm
+            logger.info(f"🎬 开始拼接 {len(video_paths)} 个分镜视频并混合BGM")
+            success, duration = concat_and_mix_bgm(
+                video_paths,
+                bgm_path,
+                final_video_path,
+                concat_file_path,
+                bgm_volume=bgm_volume,
+                loop_bgm=True
+            )
+            if success:
+                logger.info(f"✅ 视频拼接及BGM混合完成: {final_video_path}")
+                return final_video_path, duration
+            logger.warning("⚠️ BGM混合失败,使用无BGM拼接")
+        
         logger.info(f"🎬 开始拼接 {len(video_paths)} 个分镜视频")
         
-        # 使用crossfade模式,提供专业级的视频过渡效果
-        # mode="crossfade": 使用交叉淡化过渡,视觉效果最自然
-        # transition_type="fade": 淡入淡出效果,适合大多数场景
-        # transition_duration=0.5: 0.5秒过渡时长,平衡流畅度和处理速度
-        success = concatenate_videos(
+        # 使用快速模式(-c copy)拼接,同时从FFmpeg进度输出获取时长
+        success, duration = concatenate_videos_fast(
             video_paths,
             final_video_path,
-            concat_file_path,
-            mode="fast",
-            # transition_type="fade",
-            # transition_duration=0.5
+            concat_file_path
         )
         
         if not success:
             raise BusinessLogicError("分镜视频拼接失败")
         
         logger.info(f"✅ 视频拼接完成: {final_video_path}")
-        return final_video_path
+        return final_video_path, duration
 
-    async def _mix_bgm(
-        self,
-        video_path: Path,
-        task: VideoTask,
-        temp_dir: Path
-    ) -> Path:
+    async def _load_bgm(self, task: VideoTask) -> Optional[BGM]:
         """
-        混合BGM到视频
+        加载任务配置的BGM信息
         
         Args:
-            video_path: 视频文件路径
             task: 视频任务对象
-            temp_dir: 临时目录
             
         Returns:
-            混合BGM后的视频路径
+            BGM对象,不存在或不可用时返回None
         """
         try:
-            logger.info(f"🎵 开始混合BGM: background_id={task.background_id}")
-            
-            # 1. 加载BGM信息
-            from src.services.bgm_service import BGMService
+            logger.info(f"🎵 加载BGM信息: background_id={task.background_id}")
             bgm_service = BGMService(self.db_session)
             bgm = await bgm_service.get_bgm_by_id(
                 str(task.background_id),
                 str(task.user_id)
             )
+        except Exception as e:
+            logger.error(f"加载BGM信息出错: {e}", exc_info=True)
+            logger.warning("BGM不可用,继续合成无BGM视频")
+            return None
+        
+        if not bgm or not bgm.file_key:
+            logger.warning("BGM不存在或无file_key,跳过BGM混合")
+            return None
+        return bgm
+
+    async def _prefetch_bgm(
+        self,
+        bgm: BGM,
+        task: VideoTask,
+        temp_dir: Path
+    ) -> Optional[Tuple[Path, float]]:
+        """
+        下载BGM并读取音量配置(不访问数据库,可与过渡视频下载并发执行)
+        
+        Args:
+            bgm: BGM对象
+            task: 视频任务对象
+            temp_dir: 临时目录
             
-            if not bgm or not bgm.file_key:
-                logger.warning("BGM不存在或无file_key,跳过BGM混合")
-                return video_path
-            
-            # 2. 下载BGM文件
+        Returns:
+            (BGM本地路径, BGM音量),下载失败时返回None
+        """
+        try:
+            # 流式下载BGM到临时文件(-stream_loop需要可seek的输入,不能走管道)
             storage = await self._get_storage_client()
-            bgm_content = await storage.download_file(bgm.file_key)
-            
-            # 保存到临时文件
-            import os
             bgm_ext = os.path.splitext(bgm.file_name)[1] or ".mp3"
             bgm_temp_path = temp_dir / f"bgm{bgm_ext}"
-            with open(bgm_temp_path, 'wb') as f:
-                f.write(bgm_content)
+            bgm_size = await storage.download_file_to_path(bgm.file_key, str(bgm_temp_path))
             
-            logger.info(f"BGM下载成功: {bgm.name}, 大小={len(bgm_content)} bytes")
+            logger.info(f"BGM下载成功: {bgm.name}, 大小={bgm_size} bytes")
             
-            # 3. 获取BGM音量配置
+            # 获取BGM音量配置
             gen_setting = task.get_gen_setting()
             bgm_volume = gen_setting.get("bgm_volume", 0.15)
             logger.info(f"BGM音量配置: {bgm_volume}")
             
-            # 4. 混合BGM
-            final_video_with_bgm_path = temp_dir / "movie_final_with_bgm.mp4"
-            
-            mix_success = mix_bgm_with_video(
-                str(video_path),
-                str(bgm_temp_path),
-                str(final_video_with_bgm_path),
-                bgm_volume=bgm_volume,
-                loop_bgm=True
-            )
-            
-            if mix_success:
-                logger.info("✅ BGM混合成功")
-                return final_video_with_bgm_path
-            else:
-                logger.warning("⚠️ BGM混合失败,使用原视频")
-                return video_path
+            return bgm_temp_path, bgm_volume
                 
         except Exception as e:
-            logger.error(f"BGM混合过程出错: {e}", exc_info=True)
-            logger.warning("BGM混合失败,继续使用原视频")
-            return video_path
+            logger.error(f"BGM下载过程出错: {e}", exc_info=True)
+            logger.warning("BGM不可用,继续合成无BGM视频")
+            return None
 
     async def _upload_video(
         self,
         video_path: Path,
-        task: VideoTask
+        task: VideoTask,
+        duration: Optional[float] = None
     ) -> tuple[str, int]:
         """
         上传视频到MinIO
@@ -288,6 +398,7 @@ class MovieVideoService(BaseService):
         Args:
             video_path: 本地视频文件路径
             task: 视频任务对象
+            duration: 已知的视频时长(秒),为None时通过ffprobe获取
             
         Returns:
             (video_key, duration) 元组
@@ -303,27 +414,108 @@ class MovieVideoService(BaseService):
         
         logger.info(f"📤 开始上传视频到MinIO: {video_key}")
         
-        # 读取文件并上传
-        from fastapi import UploadFile
-        with open(video_path, 'rb') as f:
-            upload_file = UploadFile(
-                filename=f"chapter_{task.chapter_id}_movie.mp4",
-                file=f
-            )
-            result = await storage.upload_file(
-                str(task.user_id),
-                upload_file,
-                object_key=video_key
+        upload_coro = storage.upload_file_from_path(
+            str(task.user_id),
+            str(video_path),
+            f"chapter_{task.chapter_id}_movie.mp4",
+            object_key=video_key,
+            content_type="video/mp4"
+        )
+        
+        if duration is None:
+            # 拼接阶段未能解析出时长,回退到ffprobe(与上传并行执行)
+            result, duration = await asyncio.gather(
+                upload_coro,
+                asyncio.to_thread(get_audio_duration, str(video_path))
             )
+        else:
+            result = await upload_coro
         
         video_key = result["object_key"]
-        
-        # 获取视频时长
-        duration = int(get_audio_duration(str(video_path)) or 0)
+        duration = int(duration or 0)
         
         logger.info(f"✅ 视频上传完成: {video_key}, 时长: {duration}秒")
         return video_key, duration
 
+    async def _concatenate_and_stream_upload(
+        self,
+        video_paths: List[Path],
+        temp_dir: Path,
+        task: VideoTask,
+        bgm: Optional[Tuple[Path, float]] = None
+    ) -> Optional[Tuple[str, int]]:
+        """
+        拼接视频并将FFmpeg输出直接管道上传到MinIO(输出分片MP4,不落盘)
+        
+        Args:
+            video_paths: 视频文件路径列表
+            temp_dir: 临时目录
+            task: 视频任务对象
+            bgm: 可选的 (BGM本地路径, BGM音量)
+            
+        Returns:
+            (video_key, duration) 元组,失败时返回None(调用方回退到落盘流程)
+        """
+        storage = await self._get_storage_client()
+        filename = f"chapter_{task.chapter_id}_movie.mp4"
+        video_key = storage.generate_object_key(str(task.user_id), filename, prefix="videos")
+        
+        concat_file_path = temp_dir / "concat.txt"
+        create_concat_file(video_paths, concat_file_path)
+        bgm_path, bgm_volume = bgm if bgm else (None, 0.15)
+        command = build_concat_command(
+            concat_file_path,
+            "pipe:1",
+            bgm_path=bgm_path,
+            bgm_volume=bgm_volume,
+            output_args=FRAGMENTED_MP4_OUTPUT_ARGS
+        )
+        
+        logger.info(f"🎬 拼接 {len(video_paths)} 个分镜视频并流式上传: {video_key}")
+        process, stderr_file = start_ffmpeg_stream(command)
+        stream = _AbortableStream(process.stdout)
+        try:
+            await storage.upload_stream(
+                str(task.user_id),
+                stream,
+                filename,
+                object_key=video_key,
+                content_type="video/mp4"
+            )
+        except Exception as e:
+            logger.error(f"流式上传失败: {e}")
+            process.kill()
+            await asyncio.to_thread(finish_ffmpeg_stream, process, stderr_file)
+            return None
+        except BaseException:
+            # 任务被取消: 上传线程仍在运行,先标记中止再结束FFmpeg,使分片上传失败而不是提交截断的对象
+            stream.aborted = True
+            process.kill()
+            try:
+                # 回收FFmpeg进程并关闭stdout/stderr文件
+                await asyncio.to_thread(finish_ffmpeg_stream, process, stderr_file)
+            finally:
+                # 取消前上传可能恰好已完成,删除对象避免留下无效结果
+                await storage.delete_file(video_key)
+            raise
+        
+        success, stderr = await asyncio.to_thread(finish_ffmpeg_stream, process, stderr_file)
+        if not success:
+            # FFmpeg中途失败时已上传的对象不完整,删除后回退
+            await storage.delete_file(video_key)
+            return None
+        
+        duration = parse_ffmpeg_output_duration(stderr)
+        if duration is None:
+            # 通过内部endpoint探测,公开域名在worker中可能不可达
+            duration = await asyncio.to_thread(
+                get_audio_duration, storage.get_presigned_url(video_key, public=False)
+            )
+        duration = int(duration or 0)
+        
+        logger.info(f"✅ 视频拼接并流式上传完成: {video_key}, 时长: {duration}秒")
+        return video_key, duration
+
     async def _update_chapter_video(
         self,
         chapter_id: str,
@@ -358,6 +550,7 @@ class MovieVideoService(BaseService):
             统计信息字典
         """
         temp_dir = None
+        bgm_task = None
         
         try:
             # 检查FFmpeg
@@ -383,50 +576,74 @@ class MovieVideoService(BaseService):
             if not transitions:
                 raise BusinessLogicError("章节没有过渡视频")
             
-            # 5. 验证过渡视频完整性
-            await self._validate_transition_videos(transitions)
+            # 5. 验证过渡视频完整性(同时获取文件大小)
+            video_sizes = await self._validate_transition_videos(transitions)
             
             # 6. 创建临时目录
             temp_dir = Path(tempfile.mkdtemp(prefix="movie_composition_"))
             logger.info(f"创建临时目录: {temp_dir}")
             
-            # 7. 更新状态为下载素材
-            await task_service.update_task_status(task.id, VideoTaskStatus.DOWNLOADING_MATERIALS)
+            # 7. 预取BGM(如果有): 先查询BGM信息,下载与过渡视频下载并发进行
+            if task.background_id:
+                bgm_record = await self._load_bgm(task)
+                if bgm_record:
+                    bgm_task = asyncio.create_task(self._prefetch_bgm(bgm_record, task, temp_dir))
+            
+            # 8. 更新状态为下载素材(进度随状态一起提交)
             task.update_progress(20)
-            await self.db_session.flush()
+            await task_service.update_task_status(task.id, VideoTaskStatus.DOWNLOADING_MATERIALS)
             
-            # 8. 并发下载所有过渡视频
-            video_paths = await self._download_transition_videos(transitions, temp_dir)
+            # 9. 并发下载所有过渡视频(下载进度映射到20%-60%,限频提交)
+            last_progress_commit = time.monotonic()
             
-            # 9. 更新状态为拼接中
-            await task_service.update_task_status(task.id, VideoTaskStatus.CONCATENATING)
-            task.update_progress(60)
-            await self.db_session.flush()
+            async def on_download_progress(completed: int, total: int) -> None:
+                nonlocal last_progress_commit
+                task.update_progress(20 + int(40 * completed / total))
+                now = time.monotonic()
+                if now - last_progress_commit >= PROGRESS_COMMIT_INTERVAL:
+                    last_progress_commit = now
+                    await task_service.commit()
             
-            # 10. 拼接视频
-            final_video_path = await self._concatenate_videos(video_paths, temp_dir)
+            video_paths = await self._download_transition_videos(
+                transitions, temp_dir, sizes=video_sizes, on_progress=on_download_progress
+            )
             
-            # 11. 混合BGM(如果有)
-            if task.background_id:
-                task.update_progress(75)
-                await self.db_session.flush()
-                final_video_path = await self._mix_bgm(final_video_path, task, temp_dir)
+            # 10. 更新状态为拼接中
+            task.update_progress(60)
+            await task_service.update_task_status(task.id, VideoTaskStatus.CONCATENATING)
             
-            # 12. 更新状态为上传中
-            await task_service.update_task_status(task.id, VideoTaskStatus.UPLOADING)
-            task.update_progress(85)
-            await self.db_session.flush()
+            # 11. 等待BGM预取完成
+            bgm = await bgm_task if bgm_task else None
             
-            # 13. 上传到MinIO
-            video_key, duration = await self._upload_video(final_video_path, task)
+            # 12. 已启用流式上传时,拼接输出直接管道上传,不落盘
+            uploaded = None
+            if settings.MOVIE_STREAM_UPLOAD:
+                uploaded = await self._concatenate_and_stream_upload(
+                    video_paths, temp_dir, task, bgm=bgm
+                )
+                if not uploaded:
+                    logger.warning("⚠️ 流式上传失败,回退到先拼接再上传")
             
-            # 14. 更新章节视频信息
+            if uploaded:
+                video_key, duration = uploaded
+            else:
+                # 13. 拼接视频,BGM在同一次FFmpeg调用中混合
+                final_video_path, video_duration = await self._concatenate_videos(
+                    video_paths, temp_dir, bgm=bgm
+                )
+                
+                # 14. 更新状态为上传中
+                task.update_progress(85)
+                await task_service.update_task_status(task.id, VideoTaskStatus.UPLOADING)
+                
+                # 15. 上传到MinIO
+                video_key, duration = await self._upload_video(final_video_path, task, video_duration)
+            
+            # 16. 更新章节视频信息
             await self._update_chapter_video(task.chapter_id, video_key, duration)
             
-            # 15. 标记任务完成
+            # 17. 标记任务完成(进度置为100%)
             await task_service.mark_task_completed(task.id, video_key, duration)
-            task.update_progress(100)
-            await self.db_session.flush()
             
             logger.info(f"🎉 电影合成完成: video_key={video_key}, duration={duration}s")
             
@@ -449,6 +666,11 @@ class MovieVideoService(BaseService):
             raise
             
         finally:
+            # 取消未完成的BGM预取,避免在清理临时目录时仍在写入
+            if bgm_task and not bgm_task.done():
+                bgm_task.cancel()
+                await asyncio.gather(bgm_task, return_exceptions=True)
+            
             # 清理临时目录
             if temp_dir and temp_dir.exists():
                 try:
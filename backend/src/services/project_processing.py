@@ -17,11 +17,14 @@
 - 统一的文件处理接口
 """
 
+import asyncio
+import os
 import tempfile
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+from sqlalchemy import text
 from src.core.database import get_async_db
 from src.core.exceptions import NotFoundError
 from src.core.logging import get_logger
@@ -36,6 +39,9 @@ from src.utils.storage import get_storage_client
 
 logger = get_logger(__name__)
 
+# 流式解析时累计到该行数（段落+句子）就写入一批，兼顾COPY效率和内存占用
+SAVE_BATCH_ROWS = 5000
+
 
 class ProjectProcessingService(BaseService):
     """
@@ -107,40 +113,31 @@ class ProjectProcessingService(BaseService):
             # 2. 清理已有的数据（避免重复处理）
             await self._clean_existing_data(project_id)
 
-            # 3. 更新项目状态为处理中（10%进度）
-            await self._update_project_status(project, ProjectStatus.PARSING, 10)
+            # 3. 更新项目状态为处理中（10%进度），提交使轮询方可见
+            self._update_project_status(project, ProjectStatus.PARSING, 10)
+            await self._persist_status(project)
 
-            # 4. 解析文本内容
+            # 4. 逐章节解析文本内容并分批保存到数据库
             logger.info(f"开始解析项目 {project_id} 的文本内容，长度: {len(file_content)} 字符")
-            chapters_data, paragraphs_data, sentences_data = await self._parse_text_content(
+            chapters_count, paragraphs_count, sentences_count = await self._parse_and_save_content(
                 project_id, file_content
             )
 
-            # 5. 更新进度到30%（解析完成）
-            await self._update_project_status(project, ProjectStatus.PARSING, 30)
-
-            # 6. 批量保存到数据库
-            await self._save_parsed_content(
-                project_id, chapters_data, paragraphs_data, sentences_data
-            )
-
-            # 7. 更新项目统计信息
+            # 5. 更新项目统计信息
             await self._update_project_statistics(project)
 
-            # 8. 标记项目为已解析（100%完成）
-            await self._update_project_status(project, ProjectStatus.PARSED, 100)
-
-            # 提交所有更改
-            await self.commit()
+            # 6. 标记项目为已解析（100%完成），并提交所有更改
+            self._update_project_status(project, ProjectStatus.PARSED, 100)
+            await self._persist_status(project)
 
             logger.info(f"项目 {project_id} 文件处理完成")
 
             return {
                 'success': True,
                 'project_id': project_id,
-                'chapters_count': len(chapters_data),
-                'paragraphs_count': len(paragraphs_data),
-                'sentences_count': len(sentences_data),
+                'chapters_count': chapters_count,
+                'paragraphs_count': paragraphs_count,
+                'sentences_count': sentences_count,
                 'message': '文件处理完成'
             }
 
@@ -205,13 +202,13 @@ class ProjectProcessingService(BaseService):
 
         logger.info(f"项目 {project_id} 数据清理完成")
 
-    async def _update_project_status(self, project: Project, status: ProjectStatus,
-                                     progress: int, error_message: Optional[str] = None) -> None:
+    def _update_project_status(self, project: Project, status: ProjectStatus,
+                               progress: int, error_message: Optional[str] = None) -> None:
         """
         更新项目状态和进度
 
-        更新项目的处理状态、进度百分比，可选择设置错误信息。
-        完成时自动设置完成时间。
+        只修改项目对象的处理状态、进度百分比，可选择设置错误信息，
+        不访问数据库；需要落库时调用_persist_status。
 
         Args:
             project: 项目对象
@@ -226,20 +223,29 @@ class ProjectProcessingService(BaseService):
         elif status == ProjectStatus.PARSED:
             project.error_message = None
 
+    async def _persist_status(self, project: Project) -> None:
+        """
+        提交当前事务，使项目状态和进度对其他会话可见
+
+        Args:
+            project: 项目对象
+        """
         await self.commit()
-        await self.refresh(project)
-        logger.debug(f"更新项目状态: ID={project.id}, 状态={status.value}, 进度={progress}%")
+        logger.debug(f"更新项目状态: ID={project.id}, 状态={project.status}, 进度={project.processing_progress}%")
 
-    async def _parse_text_content(self, project_id: str, file_content: str) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+    async def _parse_and_save_content(self, project_id: str, file_content: str) -> Tuple[int, int, int]:
         """
-        解析文本内容
+        逐章节解析文本内容并分批保存
+
+        解析服务每产出一个章节就放入缓冲区，累计到SAVE_BATCH_ROWS行后写入数据库并清空，
+        内存中只保留一个批次的数据，而不是整本书的三层列表。
 
         Args:
             project_id: 项目ID
             file_content: 文件内容
 
         Returns:
-            (chapters_data, paragraphs_data, sentences_data)
+            (chapters_count, paragraphs_count, sentences_count)
         """
         text_parser_service = await self._get_text_parser_service()
 
@@ -248,7 +254,36 @@ class ProjectProcessingService(BaseService):
             'min_chapter_length': 1000,  # 最小章节长度
         }
 
-        return await text_parser_service.parse_to_models(project_id, file_content, parse_options)
+        # 本事务只写入可由源文件重新解析得到的数据：关闭同步提交，提交时不等待WAL落盘。
+        # 数据库崩溃最多丢失最近一次提交，项目停留在PARSING状态，可重新处理
+        if self.db_session.bind.dialect.name == "postgresql":
+            await self.execute(text("SET LOCAL synchronous_commit = off"))
+
+        chapters_count = paragraphs_count = sentences_count = 0
+        chapters_data, paragraphs_data, sentences_data = [], [], []
+
+        async for chapter_data, chapter_paragraphs, chapter_sentences in text_parser_service.iter_parse_to_models(
+                project_id, file_content, parse_options
+        ):
+            chapters_data.append(chapter_data)
+            paragraphs_data.extend(chapter_paragraphs)
+            sentences_data.extend(chapter_sentences)
+
+            if len(paragraphs_data) + len(sentences_data) >= SAVE_BATCH_ROWS:
+                await self._save_parsed_content(project_id, chapters_data, paragraphs_data, sentences_data)
+                chapters_count += len(chapters_data)
+                paragraphs_count += len(paragraphs_data)
+                sentences_count += len(sentences_data)
+                chapters_data, paragraphs_data, sentences_data = [], [], []
+
+        if chapters_data:
+            await self._save_parsed_content(project_id, chapters_data, paragraphs_data, sentences_data)
+            chapters_count += len(chapters_data)
+            paragraphs_count += len(paragraphs_data)
+            sentences_count += len(sentences_data)
+
+        logger.info(f"项目 {project_id} 解析保存完成: {chapters_count} 章节, {paragraphs_count} 段落, {sentences_count} 句子")
+        return chapters_count, paragraphs_count, sentences_count
 
     async def _save_parsed_content(self, project_id: str, chapters_data: List[Dict],
                                    paragraphs_data: List[Dict], sentences_data: List[Dict]) -> None:
@@ -256,7 +291,7 @@ class ProjectProcessingService(BaseService):
         保存解析的内容到数据库
 
         将文本解析的结果保存到数据库，包含章节、段落、句子三层结构。
-        使用批量操作提高性能，并维护数据间的关联关系。
+        解析结果已预分配主键并填好上级外键，按层级顺序直接批量写入。
 
         Args:
             project_id: 项目ID
@@ -270,52 +305,12 @@ class ProjectProcessingService(BaseService):
         chapter_ids = await Chapter.batch_create(self.db_session, chapters_data)
         logger.info(f"成功保存 {len(chapter_ids)} 个章节")
 
-        # 2. 更新段落数据中的chapter_id，并批量保存段落
-        current_para_index = 0
-        para_chapter_mapping = []
-
-        for chapter_idx, chapter_data in enumerate(chapters_data):
-            # 计算当前章节的段落数量
-            chapter_paragraph_count = chapter_data['paragraph_count']
-            if current_para_index + chapter_paragraph_count > len(paragraphs_data):
-                # 数据不一致，使用实际可用的数量
-                chapter_paragraph_count = len(paragraphs_data) - current_para_index
-
-            # 更新段落的chapter_id
-            for i in range(chapter_paragraph_count):
-                para_index = current_para_index + i
-                if para_index < len(paragraphs_data):
-                    paragraphs_data[para_index]['chapter_id'] = chapter_ids[chapter_idx]
-                    para_chapter_mapping.append(chapter_ids[chapter_idx])
-
-            current_para_index += chapter_paragraph_count
-
-        # 批量保存段落
-        paragraph_ids = await Paragraph.batch_create(self.db_session, paragraphs_data[:current_para_index], para_chapter_mapping)
+        # 2. 批量保存段落（chapter_id已由解析阶段填好）
+        paragraph_ids = await Paragraph.batch_create(self.db_session, paragraphs_data)
         logger.info(f"成功保存 {len(paragraph_ids)} 个段落")
 
-        # 3. 更新句子数据中的paragraph_id，并批量保存句子
-        current_sent_index = 0
-        sent_para_mapping = []
-
-        for para_idx, paragraph_data in enumerate(paragraphs_data[:current_para_index]):
-            # 计算当前段落的句子数量
-            para_sentence_count = paragraph_data.get('sentence_count', 0)
-            if current_sent_index + para_sentence_count > len(sentences_data):
-                # 数据不一致，使用实际可用的数量
-                para_sentence_count = len(sentences_data) - current_sent_index
-
-            # 更新句子的paragraph_id
-            for i in range(para_sentence_count):
-                sent_index = current_sent_index + i
-                if sent_index < len(sentences_data):
-                    sentences_data[sent_index]['paragraph_id'] = paragraph_ids[para_idx]
-                    sent_para_mapping.append(paragraph_ids[para_idx])
-
-            current_sent_index += para_sentence_count
-
-        # 批量保存句子
-        sentence_ids = await Sentence.batch_create(self.db_session, sentences_data[:current_sent_index], sent_para_mapping)
+        # 3. 批量保存句子（paragraph_id已由解析阶段填好）
+        sentence_ids = await Sentence.batch_create(self.db_session, sentences_data)
         logger.info(f"成功保存 {len(sentence_ids)} 个句子")
 
     async def _update_project_statistics(self, project: Project) -> None:
@@ -324,37 +319,30 @@ class ProjectProcessingService(BaseService):
 
         重新计算并更新项目的各项统计数据，包括章节数、段落数、
         句子数和总字数。这些数据用于显示和统计分析。
+        统计均在数据库端通过聚合查询完成，不加载行数据。
 
         Args:
             project: 项目对象
         """
-        # 统计章节数量
-        chapter_count = await Chapter.count_by_project_id(self.db_session, project.id)
-        project.chapter_count = chapter_count
-
-        # 统计段落数量
-        paragraphs = await Paragraph.get_by_project_id(self.db_session, project.id)
-        project.paragraph_count = len(paragraphs)
-
-        # 统计句子数量
-        sentences = await Sentence.get_by_project_id(self.db_session, project.id)
-        project.sentence_count = len(sentences)
-
-        # 统计总字数
-        total_word_count = 0
-        for paragraph in paragraphs:
-            total_word_count += paragraph.word_count or 0
-        project.word_count = total_word_count
+        # 同一会话不支持并发查询，依次执行聚合
+        project.chapter_count = await Chapter.count_by_project_id(self.db_session, project.id)
+        project.paragraph_count = await Paragraph.count_by_project_id(self.db_session, project.id)
+        project.sentence_count = await Sentence.count_by_project_id(self.db_session, project.id)
+        project.word_count = await Paragraph.sum_word_count_by_project_id(self.db_session, project.id)
 
         await self.flush()
-        logger.info(f"项目 {project.id} 统计信息更新完成: {chapter_count}章节, {len(paragraphs)}段落, {len(sentences)}句子, {total_word_count}字")
+        logger.info(
+            f"项目 {project.id} 统计信息更新完成: {project.chapter_count}章节, {project.paragraph_count}段落, "
+            f"{project.sentence_count}句子, {project.word_count}字"
+        )
 
     async def get_file_content(self, project_id: str) -> str:
         """
         获取项目文件内容
 
         从存储中下载文件并提取文本内容，支持多种文件格式。
-        使用临时文件处理大型文件，确保内存安全。
+        文件流式下载到临时文件，内存中不保留原始字节副本，
+        只有文件处理器失败需要自动检测编码时才读入字节。
 
         Args:
             project_id: 项目ID
@@ -371,23 +359,21 @@ class ProjectProcessingService(BaseService):
         if not project or not project.file_path:
             raise ValueError(f"项目或文件路径无效: {project_id}")
 
-        # 从存储下载文件
         storage = await self._get_storage_client()
-        data = await storage.download_file(project.file_path)
 
         file_type = project.file_type
         handler = get_file_handler(file_type)
 
-        # 创建临时文件并写入数据
+        # 创建临时文件
         suffix = Path(project.file_path).suffix
         temp_path = None
         
         try:
-            # 使用 with 语句确保文件正确关闭
-            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as fp:
-                fp.write(data)
-                temp_path = fp.name
-            # 文件在这里已经关闭,可以安全读取
+            fd, temp_path = tempfile.mkstemp(suffix=suffix)
+            os.close(fd)
+
+            # 从存储流式下载到临时文件
+            await storage.download_file_to_path(project.file_path, temp_path)
 
             try:
                 # 尝试使用文件处理器读取
@@ -397,6 +383,7 @@ class ProjectProcessingService(BaseService):
             except Exception as e:
                 # 如果文件处理器失败，尝试直接解码
                 logger.warning(f"文件处理器读取失败，尝试直接解码: {e}")
+                data = await asyncio.to_thread(Path(temp_path).read_bytes)
                 content = decode_file_content(data, project.file_path)
                 logger.info(f"成功解码文件 {project.file_path}，内容长度: {len(content)}")
                 return content
@@ -408,7 +395,6 @@ class ProjectProcessingService(BaseService):
             # 清理临时文件
             if temp_path:
                 try:
-                    import os
                     if os.path.exists(temp_path):
                         os.unlink(temp_path)
                         logger.debug(f"清理临时文件: {temp_path}")
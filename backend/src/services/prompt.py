@@ -9,7 +9,7 @@ AI导演引擎 - 提示词生成服务（优化版，含完整注释）
 """
 
 import asyncio
-from typing import List
+from typing import Dict, List
 
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
@@ -17,7 +17,6 @@ from sqlalchemy.orm import selectinload
 from src.core.exceptions import NotFoundError
 from src.core.logging import get_logger
 from src.models import Sentence, APIKey, ChapterStatus, SentenceStatus, Paragraph, Chapter
-from src.services import ChapterService
 from src.services.api_key import APIKeyService
 from src.services.base import BaseService
 from src.services.provider.base import BaseLLMProvider
@@ -95,6 +94,23 @@ async def process_sentence(
             raise
 
 
+def _build_style_system_prompts(base_prompt: str, style_templates: Dict[str, str]) -> Dict[str, str]:
+    """
+    将基础系统提示语与各风格预设拼接为完整系统提示词。
+
+    Args:
+        base_prompt (str): 基础系统提示语
+        style_templates (Dict[str, str]): 风格名称 -> 风格描述
+
+    Returns:
+        Dict[str, str]: 风格名称 -> 完整系统提示词
+    """
+    return {
+        style: base_prompt + f"\n风格要求：{style_suffix}"
+        for style, style_suffix in style_templates.items()
+    }
+
+
 # ============================================================
 # 主业务服务类
 # ============================================================
@@ -129,12 +145,15 @@ class PromptService(BaseService):
 5. 如果句子没有明确画面（如心理描写），请生成符合氛围的意象画面。
 """
 
+    # 各风格的完整系统提示词，类加载时预先拼接
+    SYSTEM_PROMPTS = _build_style_system_prompts(BASE_SYSTEM_PROMPT, STYLE_TEMPLATES)
+
     # ------------------------------------------------------------
     # 工具方法：系统提示词构建
     # ------------------------------------------------------------
     def _build_system_prompt(self, style: str) -> str:
         """
-        组合系统提示词与风格预设。
+        获取风格对应的系统提示词（预先拼接，未知风格回退到 cinematic）。
 
         Args:
             style (str): 风格名称
@@ -142,8 +161,7 @@ class PromptService(BaseService):
         Returns:
             str: 完整系统提示语
         """
-        style_suffix = self.STYLE_TEMPLATES.get(style, self.STYLE_TEMPLATES["cinematic"])
-        return self.BASE_SYSTEM_PROMPT + f"\n风格要求：{style_suffix}"
+        return self.SYSTEM_PROMPTS.get(style, self.SYSTEM_PROMPTS["cinematic"])
 
     # ------------------------------------------------------------
     # 工具方法：加载并校验 API Key
@@ -202,9 +220,12 @@ class PromptService(BaseService):
         # 建立并发信号量（限制同一时刻的 LLM 请求数量）
         semaphore = asyncio.Semaphore(20)
 
+        # 未提供自定义提示词时使用风格预设，避免发送内容为空的系统消息
+        system_prompt = custom_prompt or self._build_system_prompt(style)
+
         # 构建所有句子的任务列表
         tasks = [
-            process_sentence(sentence, api_key, llm_provider, custom_prompt, semaphore, model)
+            process_sentence(sentence, api_key, llm_provider, system_prompt, semaphore, model)
             for sentence in sentences
         ]
 
@@ -263,6 +284,9 @@ class PromptService(BaseService):
         """
         批量生成提示词（按章节 ID 获取所有待处理句子）
         """
+        # 仅此处使用，按需导入，避免模块加载时经由 src.services 包导入全部服务
+        from src.services.chapter import ChapterService
+
         # 查询章节句子
         chapter_service = ChapterService(self.db_session)
         sentences = await chapter_service.get_sentences(chapter_id)
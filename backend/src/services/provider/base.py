@@ -1,14 +1,55 @@
 # src/services/providers/base.py
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 from functools import wraps
+import asyncio
 import json
+import logging
 import time
+import weakref
+
+import httpx
+from openai import AsyncOpenAI
+
 from src.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+# 事件循环 -> {(base_url, api_key, timeout): AsyncOpenAI 客户端}
+# Provider 按请求创建，共享客户端才能复用其 httpx 连接池（避免每次请求重新进行 TCP/TLS 握手）；
+# 连接绑定事件循环，因此按循环分开保存
+_openai_clients: "weakref.WeakKeyDictionary[Any, Dict[Tuple[Optional[str], str, Optional[float]], AsyncOpenAI]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_shared_openai_client(
+        api_key: str,
+        base_url: Optional[str] = None,
+        timeout: Optional[float] = None,
+) -> AsyncOpenAI:
+    """
+    获取当前事件循环中指定端点、密钥和超时共享的 AsyncOpenAI 客户端
+
+    Args:
+        api_key: API 密钥
+        base_url: API 地址，None 时使用 SDK 默认地址
+        timeout: 读取超时（秒），None 时使用 SDK 默认超时；连接超时固定为5秒
+
+    Returns:
+        AsyncOpenAI 客户端
+    """
+    loop_clients = _openai_clients.setdefault(asyncio.get_running_loop(), {})
+    key = (base_url, api_key, timeout)
+    client = loop_clients.get(key)
+    if client is None:
+        options: Dict[str, Any] = {"api_key": api_key, "base_url": base_url}
+        if timeout is not None:
+            options["timeout"] = httpx.Timeout(timeout, connect=5.0)
+        client = loop_clients[key] = AsyncOpenAI(**options)
+    return client
+
 
 def log_provider_call(method_name: str):
     """
@@ -23,17 +64,18 @@ def log_provider_call(method_name: str):
             base_url = self.base_url
             provider_name = self.__class__.__name__
             
-            # 构建请求日志
-            request_info = {
-                "provider": provider_name,
-                "method": method_name,
-                "args": _sanitize_for_log(args),
-                "kwargs": _sanitize_for_log(kwargs),
-                "base_url": base_url
-            }
-            
             logger.info(f"[{provider_name}] {method_name} 请求开始")
-            logger.info(f"[{provider_name}] {method_name} 请求参数: {json.dumps(request_info, ensure_ascii=False, indent=2)}")
+
+            # 请求参数可能包含整段消息或base64图片，仅在DEBUG级别下构建和序列化
+            if logger.isEnabledFor(logging.DEBUG):
+                request_info = {
+                    "provider": provider_name,
+                    "method": method_name,
+                    "args": _sanitize_for_log(args),
+                    "kwargs": _sanitize_for_log(kwargs),
+                    "base_url": base_url
+                }
+                logger.debug(f"[{provider_name}] {method_name} 请求参数: {json.dumps(request_info, ensure_ascii=False, indent=2)}")
             
             try:
                 # 执行实际方法
@@ -135,3 +177,21 @@ class BaseLLMProvider(ABC):
         生成音频的调用（纯粹透传）
         """
         pass
+
+    async def aclose(self) -> None:
+        """
+        释放 Provider 持有的连接等资源（默认无需释放）
+        """
+
+    async def __aenter__(self) -> "BaseLLMProvider":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+
+
+__all__ = [
+    "BaseLLMProvider",
+    "get_shared_openai_client",
+    "log_provider_call",
+]
@@ -1,15 +1,123 @@
 # src/services/providers/custom_provider.py
 import asyncio
 import aiohttp
+import base64
+import hashlib
 import json
-from typing import Any, Dict, List
-from openai import AsyncOpenAI
+import re
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+from openai import APIStatusError, AsyncOpenAI
 
+from src.core.config import settings
 from src.core.logging import get_logger
-from src.services.provider.base import BaseLLMProvider, log_provider_call
+from src.services.provider.base import (
+    BaseLLMProvider,
+    _sanitize_for_log,
+    get_shared_openai_client,
+    log_provider_call,
+)
+from src.utils.concurrency import RedisConcurrencyLimiter
+from src.utils.json_utils import json_dumps_bytes, json_loads
 
 logger = get_logger(__name__)
 
+# Gemini 最多支持的参考图数量
+MAX_REFERENCE_IMAGES = 5
+
+# 进程内缓存的已编码参考图数量（每项为base64后的整张图片，需控制总量）
+REFERENCE_CACHE_SIZE = 16
+
+# 进程内缓存的已编码参考图总字节数上限，超出时淘汰最久未使用的条目
+REFERENCE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# 根据限流响应头主动暂停的最长时间（秒），防止异常响应头导致长时间挂起
+RATE_LIMIT_MAX_PAUSE = 60.0
+
+# OpenAI 风格的重置时长，如 "1s"、"6m0s"、"20ms"
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def _parse_seconds(value: Optional[str]) -> Optional[float]:
+    """解析秒数或 OpenAI 风格的时长字符串，无法解析时返回 None"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    matches = _DURATION_RE.findall(value)
+    if not matches:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in matches)
+
+
+def _rate_limit_pause(headers: Mapping[str, str]) -> Optional[float]:
+    """
+    根据限流响应头计算下一次调用前需要暂停的秒数
+
+    剩余请求数不超过 2 个或低于上限的 10% 时，按 retry-after 或
+    x-ratelimit-reset-requests 暂停；只有 retry-after（如 429 响应）时直接使用它
+
+    Args:
+        headers: 响应头（大小写不敏感）
+
+    Returns:
+        暂停秒数，无需暂停时返回 None
+    """
+    retry_after = _parse_seconds(headers.get("retry-after"))
+    remaining = _parse_seconds(headers.get("x-ratelimit-remaining-requests"))
+    if remaining is None:
+        pause = retry_after
+    else:
+        limit = _parse_seconds(headers.get("x-ratelimit-limit-requests"))
+        if remaining > 2 and (not limit or remaining >= limit * 0.1):
+            return None
+        pause = retry_after or _parse_seconds(headers.get("x-ratelimit-reset-requests")) or 1.0
+
+    return min(pause, RATE_LIMIT_MAX_PAUSE) if pause is not None else None
+
+
+def _sniff_image_mime(data: bytes, content_type: Optional[str] = None) -> str:
+    """
+    识别图片 MIME 类型
+
+    优先使用响应头中的 image/* 类型，否则根据文件头判断，无法识别时按 JPEG 处理
+
+    Args:
+        data: 图片字节
+        content_type: HTTP 响应的 Content-Type（可选）
+
+    Returns:
+        MIME 类型
+    """
+    if content_type:
+        mime = content_type.split(";", 1)[0].strip().lower()
+        if mime.startswith("image/"):
+            return mime
+    from src.utils.image_utils import detect_image_mime
+
+    return detect_image_mime(data)
+
+
+@dataclass(slots=True)
+class GeminiImageData:
+    """Gemini 图片数据，字段与 OpenAI images 响应的单项兼容"""
+    b64_json: str  # base64 图片数据
+    mime: str
+    url: Optional[str] = None  # Gemini 不返回 URL
+
+
+@dataclass(slots=True)
+class GeminiImageResponse:
+    """Gemini 图片响应，兼容 OpenAI images 响应的 data 列表"""
+    data: List[GeminiImageData]
+
 
 class CustomProvider(BaseLLMProvider):
     """
@@ -23,16 +131,140 @@ class CustomProvider(BaseLLMProvider):
     只提供 completions() 和 generate_image() 接口 → 等同于一个可并发的 SiliconFlow SDK wrapper
     """
 
+    # 参考图 URL/对象键 -> 已编码的 inline_data part，所有实例共享的 LRU 缓存
+    # 同一批次的多个分镜往往共用少数几个角色参考图，命中后跳过下载和 base64 编码
+    _reference_part_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    # 缓存中 base64 数据的总字节数
+    _reference_part_cache_bytes: int = 0
+
+    # 事件循环 -> {(base_url, api_key, max_concurrency): 信号量}
+    # 同一端点和密钥的多个实例共享一个并发池；信号量绑定事件循环，因此按循环分开保存
+    _semaphores: "weakref.WeakKeyDictionary[Any, Dict[Tuple[str, str, int], asyncio.BoundedSemaphore]]" = (
+        weakref.WeakKeyDictionary()
+    )
+
+    # (base_url, api_key) -> 允许发起下一次调用的时间（time.monotonic），由限流响应头更新
+    _rate_limit_resume_at: Dict[Tuple[str, str], float] = {}
+
     def __init__(
         self,
         api_key: str,
         max_concurrency: int = 5,
         base_url: str = "https://api.siliconflow.cn/v1",
     ):
-        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url)
         self.base_url = base_url
         self.api_key = api_key
-        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        # 仅在 async with 上下文内存在的共享 HTTP 会话
+        self._http_session: Optional[aiohttp.ClientSession] = None
+        # 多个 API/Worker 进程共享同一密钥的并发上限（键中只保存密钥摘要）
+        key_digest = hashlib.sha256(f"{base_url}|{api_key}".encode("utf-8")).hexdigest()[:32]
+        self._distributed_limiter = RedisConcurrencyLimiter(
+            key=f"provider_concurrency:{key_digest}",
+            limit=max_concurrency,
+            lease_seconds=settings.PROVIDER_CONCURRENCY_LEASE_SECONDS,
+        )
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """当前事件循环中该端点和密钥共享的 AsyncOpenAI 客户端"""
+        return get_shared_openai_client(self.api_key, self.base_url)
+
+    @property
+    def semaphore(self) -> asyncio.BoundedSemaphore:
+        """
+        当前事件循环中该端点和密钥共享的并发信号量
+
+        使用 BoundedSemaphore，异常路径中多余的 release 会直接报错，而不是悄悄抬高并发上限
+        """
+        loop_semaphores = self._semaphores.setdefault(asyncio.get_running_loop(), {})
+        key = (self.base_url, self.api_key, self.max_concurrency)
+        semaphore = loop_semaphores.get(key)
+        if semaphore is None:
+            semaphore = loop_semaphores[key] = asyncio.BoundedSemaphore(self.max_concurrency)
+        return semaphore
+
+    @asynccontextmanager
+    async def _concurrency_slot(self) -> AsyncIterator[None]:
+        """
+        占用一个调用名额：先占进程内信号量，再占 Redis 中所有进程共享的名额
+        """
+        async with self.semaphore:
+            if not settings.PROVIDER_DISTRIBUTED_CONCURRENCY:
+                await self._wait_for_rate_limit()
+                yield
+                return
+            async with self._distributed_limiter.acquire():
+                await self._wait_for_rate_limit()
+                yield
+
+    async def _wait_for_rate_limit(self) -> None:
+        """上游提示额度即将耗尽时，等到额度重置后再发起调用"""
+        resume_at = self._rate_limit_resume_at.get((self.base_url, self.api_key))
+        if resume_at is not None:
+            delay = resume_at - time.monotonic()
+            if delay > 0:
+                logger.info(f"上游限流额度即将耗尽，暂停 {delay:.2f} 秒")
+                await asyncio.sleep(delay)
+
+    def _record_rate_limit(self, headers: Mapping[str, str]) -> None:
+        """根据响应头更新该端点和密钥的暂停时间"""
+        pause = _rate_limit_pause(headers)
+        if pause:
+            key = (self.base_url, self.api_key)
+            resume_at = time.monotonic() + pause
+            self._rate_limit_resume_at[key] = max(self._rate_limit_resume_at.get(key, 0.0), resume_at)
+
+    async def _call_with_rate_limit(self, method: Callable[..., Awaitable[Any]], **kwargs: Any) -> Any:
+        """
+        通过 SDK 的 with_raw_response 方法调用，记录限流响应头后返回解析结果
+
+        Args:
+            method: with_raw_response 下的 SDK 方法
+            **kwargs: 透传给 SDK 的参数
+        """
+        try:
+            response = await method(**kwargs)
+        except APIStatusError as e:
+            # 429 等错误响应同样带有 retry-after
+            self._record_rate_limit(e.response.headers)
+            raise
+        self._record_rate_limit(response.headers)
+        return await response.parse()
+
+    async def __aenter__(self) -> "CustomProvider":
+        """
+        进入上下文后，Gemini 相关请求共用同一个 aiohttp 会话，复用 keep-alive 连接
+        """
+        if self._http_session is None:
+            connector = aiohttp.TCPConnector(
+                # 每个生成请求最多附带 MAX_REFERENCE_IMAGES 个参考图下载
+                limit=self.max_concurrency * (MAX_REFERENCE_IMAGES + 1),
+                # 参考图多来自同一个对象存储主机，单主机上限避免挤占生成请求的连接
+                limit_per_host=self.max_concurrency * MAX_REFERENCE_IMAGES,
+                ttl_dns_cache=300,
+                # 批次内请求间隔可能较长（图像生成耗时），延长空闲连接保活时间
+                keepalive_timeout=30,
+            )
+            self._http_session = aiohttp.ClientSession(connector=connector)
+        return self
+
+    async def aclose(self) -> None:
+        """关闭共享 HTTP 会话"""
+        if self._http_session is not None:
+            await self._http_session.close()
+            self._http_session = None
+
+    @asynccontextmanager
+    async def _http_session_scope(self) -> AsyncIterator[aiohttp.ClientSession]:
+        """
+        获取 HTTP 会话：在上下文中使用共享会话，否则为本次调用创建临时会话
+        """
+        if self._http_session is not None:
+            yield self._http_session
+        else:
+            async with aiohttp.ClientSession() as session:
+                yield session
 
     @log_provider_call("completions")
     async def completions(
@@ -42,9 +274,10 @@ class CustomProvider(BaseLLMProvider):
         调用 SiliconFlow chat.completions.create（纯粹透传）
         """
 
-        # 用 semaphore 限制并发
-        async with self.semaphore:
-            return await self.client.chat.completions.create(
+        # 限制并发（进程内及跨进程）
+        async with self._concurrency_slot():
+            return await self._call_with_rate_limit(
+                self.client.chat.completions.with_raw_response.create,
                 model=model, messages=messages, **kwargs
             )
 
@@ -63,9 +296,10 @@ class CustomProvider(BaseLLMProvider):
             # 将 Gemini 响应包装成兼容格式
             return self._wrap_gemini_response(gemini_response)
 
-        # 用 semaphore 限制并发
-        async with self.semaphore:
-            return await self.client.images.generate(
+        # 限制并发（进程内及跨进程）
+        async with self._concurrency_slot():
+            return await self._call_with_rate_limit(
+                self.client.images.with_raw_response.generate,
                 model=model or "Kwai-Kolors/Kolors", prompt=prompt, **kwargs
             )
 
@@ -77,9 +311,10 @@ class CustomProvider(BaseLLMProvider):
         调用 OpenAI audio.speech.create（纯粹透传）
         """
 
-        # 用 semaphore 限制并发
-        async with self.semaphore:
-            return await self.client.audio.speech.create(
+        # 限制并发（进程内及跨进程）
+        async with self._concurrency_slot():
+            return await self._call_with_rate_limit(
+                self.client.audio.speech.with_raw_response.create,
                 model=model, voice=voice, input=input_text, **kwargs
             )
 
@@ -131,7 +366,8 @@ class CustomProvider(BaseLLMProvider):
 
             if not base64_data:
                 logger.error("Gemini 响应中未找到图片数据")
-                logger.error(f"响应结构: {json.dumps(gemini_response, indent=2, ensure_ascii=False)[:500]}...")
+                # 先截断长字段（如base64数据）再序列化，避免整段响应转成字符串
+                logger.error(f"响应结构: {json.dumps(_sanitize_for_log(gemini_response), indent=2, ensure_ascii=False)[:500]}...")
                 # 打印parts的详细信息
                 for i, part in enumerate(parts):
                     logger.error(f"Part {i}: keys={list(part.keys())}")
@@ -139,95 +375,142 @@ class CustomProvider(BaseLLMProvider):
                     "响应中未找到图片数据 (inlineData 或 thoughtSignature)"
                 )
 
-            # 创建兼容对象
-            class GeminiImageResponse:
-                def __init__(self, base64_data, mime):
-                    self.data = [GeminiImageData(base64_data, mime)]
-
-            class GeminiImageData:
-                def __init__(self, base64_data, mime):
-                    self.url = None  # Gemini 不返回 URL
-                    self.b64_json = base64_data  # 存储 base64 数据
-                    self.mime = mime
-
-            return GeminiImageResponse(base64_data, mime)
+            return GeminiImageResponse(data=[GeminiImageData(b64_json=base64_data, mime=mime)])
         except (KeyError, IndexError) as e:
             raise ValueError(f"无法从 Gemini 响应中提取图像数据: {e}")
 
+    async def _download_reference_image(
+        self, session: aiohttp.ClientSession, img_url: str
+    ) -> Optional[Tuple[bytes, str]]:
+        """
+        下载单张参考图
+
+        Args:
+            session: 共享的 aiohttp 会话
+            img_url: 参考图 URL 或 uploads/ 开头的 MinIO 对象键
+
+        Returns:
+            (图片字节, MIME 类型)，失败时返回 None
+        """
+        try:
+            # 优先检查是否是 MinIO key (如果刚才没转换成功或者还是key形式)
+            if img_url.startswith("uploads/"):
+                from src.utils.storage import get_storage_client
+
+                storage_client = await get_storage_client()
+                img_data = await storage_client.download_file(img_url)
+                logger.info(f"从存储直接读取参考图: {img_url[:30]}...")
+                return img_data, _sniff_image_mime(img_data)
+
+            async with session.get(img_url, timeout=aiohttp.ClientTimeout(total=10)) as resp:
+                if resp.status == 200:
+                    img_data = await resp.read()
+                    return img_data, _sniff_image_mime(img_data, resp.headers.get("Content-Type"))
+                logger.warning(f"下载参考图失败 HTTP {resp.status}: {img_url[:50]}...")
+        except Exception as e:
+            logger.warning(f"处理参考图失败 {img_url[:50]}...: {e}")
+        return None
+
+    async def _load_reference_part(
+        self, session: aiohttp.ClientSession, img_url: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        获取参考图对应的 inline_data part，优先使用缓存
+
+        Args:
+            session: 共享的 aiohttp 会话
+            img_url: 参考图 URL 或 uploads/ 开头的 MinIO 对象键
+
+        Returns:
+            inline_data part，下载失败时返回 None
+        """
+        cache = self._reference_part_cache
+        part = cache.get(img_url)
+        if part is not None:
+            cache.move_to_end(img_url)
+            return part
+
+        downloaded = await self._download_reference_image(session, img_url)
+        if not downloaded or not downloaded[0]:
+            return None
+        img_data, mime_type = downloaded
+
+        # 多MB图片的base64编码放到线程池中执行，避免阻塞事件循环
+        b64_img = await asyncio.to_thread(base64.b64encode, img_data)
+        part = {
+            "inline_data": {
+                "mime_type": mime_type,
+                "data": b64_img.decode('ascii')
+            }
+        }
+
+        # 单张超过总上限的图片不进入缓存，避免挤掉其它条目后仍然超限
+        size = len(part["inline_data"]["data"])
+        if size > REFERENCE_CACHE_MAX_BYTES or img_url in cache:
+            return part
+
+        cls = CustomProvider
+        cache[img_url] = part
+        cls._reference_part_cache_bytes += size
+        while len(cache) > REFERENCE_CACHE_SIZE or cls._reference_part_cache_bytes > REFERENCE_CACHE_MAX_BYTES:
+            _, evicted = cache.popitem(last=False)
+            cls._reference_part_cache_bytes -= len(evicted["inline_data"]["data"])
+        return part
+
     async def generate_image_gemini(self, prompt: str,aspectRatio: str="16:9",imageSize: str="1K", **kwargs: Any):
         """
         Gemini 生成图像（携程异步版本）
         支持 reference_images 参数 (Persona)
         """
         base_url = self.base_url.replace("/v1", "")
-        url = f"{base_url}/v1beta/models/gemini-3-pro-image-preview:generateContent?key={self.api_key}"
-        logger.info(f"Gemini 生成图像 URL: {url}")
+        endpoint = f"{base_url}/v1beta/models/gemini-3-pro-image-preview:generateContent"
+        url = f"{endpoint}?key={self.api_key}"
+        logger.info(f"Gemini 生成图像 URL: {endpoint}")
         # 构造 prompt 部分
         parts = [{"text": prompt}]
         
-        # 处理参考图 (Persona)
-        reference_images = kwargs.get("reference_images")
-        if reference_images:
-            import base64
-            from datetime import timedelta
-            from src.utils.storage import get_storage_client
-            
-            logger.info(f"处理 {len(reference_images)} 张参考图")
-            
-            # 直接使用参考图列表，后续下载逻辑会处理 uploads/ 开头的 Key
-            logger.info(f"开启角色一致性参考图处理，共 {len(reference_images)} 张")
-            
-            # 最大支持 5 张参考图
-            for img_url in reference_images[:5]:
-                try:
-                    img_data = None
-                    # 优先检查是否是 MinIO key (如果刚才没转换成功或者还是key形式)
-                    if img_url.startswith("uploads/"):
-                        storage_client = await get_storage_client()
-                        img_data = await storage_client.download_file(img_url)
-                        logger.info(f"从存储直接读取参考图: {img_url[:30]}...")
-                    else:
-                        # 下载参考图并转 Base64
-                        async with aiohttp.ClientSession() as session:
-                            async with session.get(img_url, timeout=10) as resp:
-                                if resp.status == 200:
-                                    img_data = await resp.read()
-                                else:
-                                    logger.warning(f"下载参考图失败 HTTP {resp.status}: {img_url[:50]}...")
-                    
-                    if img_data:
-                        b64_img = base64.b64encode(img_data).decode('utf-8')
-                        
-                        # 检测MIME类型
-                        mime_type = "image/jpeg"
-                        if img_data[:4] == b'\x89PNG':
-                            mime_type = "image/png"
-                        
-                        parts.append({
-                            "inline_data": {
-                                "mime_type": mime_type,
-                                "data": b64_img
-                            }
-                        })
-                        logger.info("成功添加参考图数据")
-                except Exception as e:
-                    logger.warning(f"处理参考图失败 {img_url[:50]}...: {e}")
+        # 参考图下载与生成请求共用一个会话，复用连接
+        async with self._http_session_scope() as session:
+            # 处理参考图 (Persona)
+            reference_images = kwargs.get("reference_images")
+            if reference_images:
+                # 直接使用参考图列表，下载逻辑会处理 uploads/ 开头的 Key
+                logger.info(f"开启角色一致性参考图处理，共 {len(reference_images)} 张")
 
-        payload = {
-            "contents": [{"role": "user", "parts": parts}],
-            "generationConfig": {"responseModalities": ["IMAGE"], "imageConfig": {"aspectRatio": aspectRatio,"imageSize": imageSize}},
-        }   
+                # 最大支持 5 张参考图，并发下载
+                results = await asyncio.gather(*[
+                    self._load_reference_part(session, img_url)
+                    for img_url in reference_images[:MAX_REFERENCE_IMAGES]
+                ], return_exceptions=True)
 
-        async with self.semaphore:  # 控制最大并发
-            async with aiohttp.ClientSession() as session:
+                # 单张参考图失败不影响生成，按原顺序保留成功的部分
+                reference_parts = []
+                for img_url, result in zip(reference_images, results):
+                    if isinstance(result, Exception):
+                        logger.warning(f"处理参考图失败 {img_url[:50]}...: {result}")
+                    elif result:
+                        reference_parts.append(result)
+
+                parts.extend(reference_parts)
+                logger.info(f"成功添加 {len(reference_parts)} 张参考图数据")
+
+            payload = {
+                "contents": [{"role": "user", "parts": parts}],
+                "generationConfig": {"responseModalities": ["IMAGE"], "imageConfig": {"aspectRatio": aspectRatio,"imageSize": imageSize}},
+            }
+
+            async with self._concurrency_slot():  # 控制最大并发
                 async with session.post(
-                    url, json=payload, headers={"Content-Type": "application/json"}
+                    url, data=json_dumps_bytes(payload), headers={"Content-Type": "application/json"}
                 ) as resp:
+                    self._record_rate_limit(resp.headers)
+                    raw = await resp.read()
                     if resp.status != 200:
-                        error_text = await resp.text()
+                        # 错误响应也可能很大，只保留前 1000 字节
+                        error_text = raw[:1000].decode("utf-8", errors="replace")
                         logger.error(f"Gemini API Error: {error_text}")
                         raise ValueError(f"Gemini API 请求失败: {resp.status} - {error_text}")
                         
-                    result = await resp.text()
-                    return json.loads(result)
+                    # 直接解析响应字节，省去文本解码与编码探测
+                    return json_loads(raw)
 
@@ -5,7 +5,7 @@ from typing import Any, Dict, List
 from openai import AsyncOpenAI
 
 from src.core.logging import get_logger
-from .base import BaseLLMProvider, log_provider_call
+from .base import BaseLLMProvider, get_shared_openai_client, log_provider_call
 
 logger = get_logger(__name__)
 
@@ -16,13 +16,15 @@ class DeepSeekProvider(BaseLLMProvider):
     """
 
     def __init__(self, api_key: str, max_concurrency: int = 5):
-        self.client = AsyncOpenAI(
-            api_key=api_key,
-            base_url="https://api.deepseek.com",
-            timeout=300.0  # 5分钟超时
-        )
+        self.api_key = api_key
+        self.base_url = "https://api.deepseek.com"
         self.semaphore = asyncio.Semaphore(max_concurrency)
 
+    @property
+    def client(self) -> AsyncOpenAI:
+        """当前事件循环中共享的 AsyncOpenAI 客户端"""
+        return get_shared_openai_client(self.api_key, self.base_url, timeout=300.0)  # 5分钟超时
+
     @log_provider_call("completions")
     async def completions(
             self,
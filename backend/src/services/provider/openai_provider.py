@@ -5,7 +5,7 @@ from typing import Any, Dict, List
 from openai import AsyncOpenAI
 
 from src.core.logging import get_logger
-from src.services.provider.base import BaseLLMProvider, log_provider_call
+from src.services.provider.base import BaseLLMProvider, get_shared_openai_client, log_provider_call
 
 logger = get_logger(__name__)
 
@@ -23,9 +23,15 @@ class OpenAIProvider(BaseLLMProvider):
     """
 
     def __init__(self, api_key: str, max_concurrency: int = 5):
-        self.client = AsyncOpenAI(api_key=api_key)
+        self.api_key = api_key
+        self.base_url = None
         self.semaphore = asyncio.Semaphore(max_concurrency)
 
+    @property
+    def client(self) -> AsyncOpenAI:
+        """当前事件循环中共享的 AsyncOpenAI 客户端"""
+        return get_shared_openai_client(self.api_key, self.base_url)
+
     @log_provider_call("completions")
     async def completions(
             self,
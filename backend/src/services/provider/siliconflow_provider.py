@@ -5,7 +5,7 @@ from typing import Any, Dict, List
 from openai import AsyncOpenAI
 
 from src.core.logging import get_logger
-from src.services.provider.base import BaseLLMProvider, log_provider_call
+from src.services.provider.base import BaseLLMProvider, get_shared_openai_client, log_provider_call
 
 logger = get_logger(__name__)
 
@@ -27,13 +27,15 @@ class SiliconFlowProvider(BaseLLMProvider):
         if not base_url.endswith('/'):
             base_url = base_url + '/'
         
-        self.client = AsyncOpenAI(
-            api_key=api_key,
-            base_url=base_url,
-            timeout=300.0  # 5分钟超时
-        )
+        self.api_key = api_key
+        self.base_url = base_url
         self.semaphore = asyncio.Semaphore(max_concurrency)
 
+    @property
+    def client(self) -> AsyncOpenAI:
+        """当前事件循环中共享的 AsyncOpenAI 客户端"""
+        return get_shared_openai_client(self.api_key, self.base_url, timeout=300.0)  # 5分钟超时
+
     @log_provider_call("completions")
     async def completions(
             self,
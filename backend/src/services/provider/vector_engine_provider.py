@@ -1,3 +1,6 @@
+import asyncio
+import importlib.util
+import weakref
 import httpx
 from typing import List, Optional, Dict, Any
 from src.core.logging import get_logger
@@ -5,12 +8,20 @@ from src.services.provider.base import log_provider_call
 
 logger = get_logger(__name__)
 
+# httpx 的 HTTP/2 支持依赖可选的 h2 包（httpx[http2]），安装后自动启用多路复用
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
 class VectorEngineProvider:
     """
     Vector Engine API 提供商 (api.vectorengine.ai)
     专门用于视频生成任务
     """
 
+    # 同一事件循环内的所有实例共用一个 httpx 客户端，复用 keep-alive 连接
+    # （Provider 按请求创建且不会被关闭，按事件循环共享也避免了跨循环使用连接）
+    _clients: "weakref.WeakKeyDictionary[Any, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+    _limits = httpx.Limits(max_connections=200, max_keepalive_connections=50)
+
     def __init__(self, api_key: str, base_url: str = "https://api.vectorengine.ai/v1"):
         self.api_key = api_key
         self.base_url = base_url
@@ -20,6 +31,19 @@ class VectorEngineProvider:
         }
         self.timeout = httpx.Timeout(60.0, connect=20.0)
 
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """当前事件循环共享的 httpx 客户端"""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = self._clients[loop] = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self._limits,
+                http2=HTTP2_AVAILABLE,
+            )
+        return client
+
     @log_provider_call("create_video")
     async def create_video(
         self, 
@@ -45,17 +69,16 @@ class VectorEngineProvider:
         }
         payload.update(kwargs)
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.post(url, headers=self.headers, json=payload)
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPStatusError as e:
-                logger.error(f"Vector Engine Create Failed: {e.response.text}")
-                raise
-            except Exception as e:
-                logger.error(f"Vector Engine Create Error: {e}")
-                raise
+        try:
+            response = await self.client.post(url, headers=self.headers, json=payload)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            logger.error(f"Vector Engine Create Failed: {e.response.text}")
+            raise
+        except Exception as e:
+            logger.error(f"Vector Engine Create Error: {e}")
+            raise
 
     @log_provider_call("get_task_status")
     async def get_task_status(self, task_id: str) -> Dict[str, Any]:
@@ -63,14 +86,13 @@ class VectorEngineProvider:
         查询任务状态
         """
         url = f"{self.base_url}/videos/{task_id}"
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.get(url, headers=self.headers)
-                response.raise_for_status()
-                return response.json()
-            except Exception as e:
-                logger.error(f"Vector Engine Query Status Failed: {e}")
-                raise
+        try:
+            response = await self.client.get(url, headers=self.headers)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"Vector Engine Query Status Failed: {e}")
+            raise
 
     @log_provider_call("get_video_content")
     async def get_video_content(self, task_id: str) -> Dict[str, Any]:
@@ -78,11 +100,10 @@ class VectorEngineProvider:
         获取视频内容（包含下载链接）
         """
         url = f"{self.base_url}/videos/{task_id}/content"
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.get(url, headers=self.headers)
-                response.raise_for_status()
-                return response.json()
-            except Exception as e:
-                logger.error(f"Vector Engine Get Content Failed: {e}")
-                raise
+        try:
+            response = await self.client.get(url, headers=self.headers)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"Vector Engine Get Content Failed: {e}")
+            raise
@@ -5,7 +5,7 @@ from typing import Any, Dict, List
 from openai import AsyncOpenAI
 
 from src.core.logging import get_logger
-from .base import BaseLLMProvider, log_provider_call
+from .base import BaseLLMProvider, get_shared_openai_client, log_provider_call
 
 logger = get_logger(__name__)
 
@@ -22,13 +22,15 @@ class VolcengineProvider(BaseLLMProvider):
 
     def __init__(self, api_key: str, max_concurrency: int = 5):
         # 关键：使用 OpenAI SDK，设置 base_url
-        self.client = AsyncOpenAI(
-            api_key=api_key,
-            base_url="https://ark.cn-beijing.volces.com/api/v3",
-            timeout=300.0  # 5分钟超时
-        )
+        self.api_key = api_key
+        self.base_url = "https://ark.cn-beijing.volces.com/api/v3"
         self.semaphore = asyncio.Semaphore(max_concurrency)
 
+    @property
+    def client(self) -> AsyncOpenAI:
+        """当前事件循环中共享的 AsyncOpenAI 客户端"""
+        return get_shared_openai_client(self.api_key, self.base_url, timeout=300.0)  # 5分钟超时
+
     @log_provider_call("completions")
     async def completions(
             self,
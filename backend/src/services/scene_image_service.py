@@ -2,7 +2,9 @@
 场景图生成服务 - 为每个场景生成无人物的环境参考图
 """
 import asyncio
-from typing import Optional, Dict, Any
+from contextlib import nullcontext
+from operator import itemgetter
+from typing import Optional, Dict, Any, Union
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload, joinedload
 
@@ -14,6 +16,7 @@ from src.services.provider.factory import ProviderFactory
 from src.services.api_key import APIKeyService
 from src.services.image import retry_with_backoff
 from src.services.movie_prompts import MoviePromptTemplates
+from src.utils.concurrency import AimdLimiter
 
 logger = get_logger(__name__)
 
@@ -23,7 +26,7 @@ async def _generate_scene_image_worker(
     user_id: str,
     api_key,
     model: str,
-    semaphore: asyncio.Semaphore
+    semaphore: Optional[Union[asyncio.Semaphore, AimdLimiter]] = None
 ) -> bool:
     """
     Worker协程 - 为单个场景生成场景图
@@ -34,7 +37,7 @@ async def _generate_scene_image_worker(
         user_id: 用户ID
         api_key: API密钥对象
         model: 模型名称
-        semaphore: 并发控制信号量
+        semaphore: 并发控制信号量或自适应限制器，单个场景直接调用时可不传
     
     Returns:
         是否成功
@@ -43,10 +46,10 @@ async def _generate_scene_image_worker(
     from src.services.generation_history_service import GenerationHistoryService
     from src.models.movie import GenerationType, MediaType
     
-    async with semaphore:
-        # 为每个worker创建独立的数据库会话
-        async with get_async_db() as db_session:
-            try:
+    try:
+        async with semaphore or nullcontext():
+            # 为每个worker创建独立的数据库会话
+            async with get_async_db() as db_session:
                 # 重新加载场景对象（使用新会话）
                 scene = await db_session.get(MovieScene, scene_data['id'])
                 if not scene:
@@ -59,10 +62,10 @@ async def _generate_scene_image_worker(
                 
                 # 生成场景图prompt
                 if shots_description:
-                    shots_desc = "\n\n".join([
+                    shots_desc = "\n\n".join(
                         f"Shot {i+1}: {shot}"
                         for i, shot in enumerate(shots_description)
-                    ])
+                    )
                     prompt = MoviePromptTemplates.get_scene_image_prompt_from_shots(shots_desc)
                 else:
                     prompt = MoviePromptTemplates.get_scene_image_prompt(scene_data['scene'])
@@ -111,11 +114,11 @@ async def _generate_scene_image_worker(
                 
                 logger.info(f"✅ 场景图生成成功: scene_id={scene.id}, url={image_url}")
                 return True
-                
-            except Exception as e:
-                await db_session.rollback()
-                logger.error(f"Worker 生成场景图失败 [scene_id={scene_data['id']}]: {e}", exc_info=True)
-                return False
+
+    except Exception as e:
+        # get_async_db 已回滚会话；异常先穿过限制器，使其按失败收缩并发
+        logger.error(f"Worker 生成场景图失败 [scene_id={scene_data['id']}]: {e}", exc_info=True)
+        return False
 
 
 class SceneImageService(BaseService):
@@ -131,10 +134,10 @@ class SceneImageService(BaseService):
             return MoviePromptTemplates.get_scene_image_prompt("一个空旷的场景") # Fallback for empty shots
         
         # 组合所有分镜描述
-        shots_desc = "\n\n".join([
+        shots_desc = "\n\n".join(
             f"Shot {shot['order_index']}: {shot['shot']}"
-            for shot in sorted(shots_data, key=lambda x: x['order_index'])
-        ])
+            for shot in sorted(shots_data, key=itemgetter('order_index'))
+        )
         return MoviePromptTemplates.get_scene_image_prompt_from_shots(shots_desc)
 
     async def generate_scene_image(
@@ -193,9 +196,8 @@ class SceneImageService(BaseService):
         }
         
         # 4. 生成场景图（使用独立会话的worker）
-        semaphore = asyncio.Semaphore(1)
         success = await _generate_scene_image_worker(
-            scene_data, user_id, api_key, model, semaphore
+            scene_data, user_id, api_key, model
         )
         
         if success:
@@ -238,7 +240,8 @@ class SceneImageService(BaseService):
         
         # 3. 筛选待处理任务 - 只生成缺少场景图的场景
         tasks = []
-        semaphore = asyncio.Semaphore(20)
+        # 根据生成耗时和失败情况自适应调整并发，而不是固定并发数
+        limiter = AimdLimiter(initial=8, min_limit=2, max_limit=32, target_latency=30.0)
         
         for scene in script.scenes:
             # 检查是否需要生成场景图
@@ -252,15 +255,17 @@ class SceneImageService(BaseService):
                     'shots': [shot.shot for shot in scene.shots if shot.shot]
                 }
                 tasks.append(
-                    _generate_scene_image_worker(scene_data, user_id, api_key, model, semaphore)
+                    _generate_scene_image_worker(scene_data, user_id, api_key, model, limiter)
                 )
         
         # 4. 无任务则返回
         if not tasks:
             return {"total": 0, "success": 0, "failed": 0, "message": "所有场景已有场景图"}
 
-        # 5. 执行并发
-        results = await asyncio.gather(*tasks)
+        # 5. 执行并发（worker自行处理业务异常；出现未处理的异常时TaskGroup会取消其余worker，不留下孤儿任务）
+        async with asyncio.TaskGroup() as tg:
+            running = [tg.create_task(task) for task in tasks]
+        results = [t.result() for t in running]
         
         success_count = sum(1 for r in results if r)
         failed_count = len(results) - success_count
@@ -2,16 +2,28 @@
 场景提取服务 - 从章节内容提取电影场景
 """
 
-import json
 from typing import List, Dict, Any, Optional, Callable
+from sqlalchemy import and_, delete, insert, or_, select
 from sqlalchemy.orm import selectinload
 
+from src.core.config import settings
 from src.core.logging import get_logger
-from src.models.movie import MovieScript, MovieScene, ScriptStatus, MovieCharacter
+from src.models.movie import (
+    GenerationType,
+    MovieCharacter,
+    MovieGenerationHistory,
+    MovieScene,
+    MovieScript,
+    MovieShot,
+    ScriptStatus,
+)
 from src.models.chapter import Chapter
 from src.services.base import BaseService
 from src.services.provider.factory import ProviderFactory
 from src.services.api_key import APIKeyService
+from src.services.movie_prompts import MoviePromptTemplates
+from src.utils.json_utils import json_dumps, json_loads
+from src.utils.text_utils import strip_code_fence
 
 logger = get_logger(__name__)
 
@@ -21,6 +33,44 @@ class SceneService(BaseService):
     从章节内容提取场景，每个场景关联角色列表
     """
 
+    async def _delete_chapter_scripts(self, chapter_id) -> int:
+        """
+        删除章节下的所有剧本及其场景、分镜和生成历史
+
+        按子表到父表的顺序执行批量DELETE，与ORM级联删除的范围一致，
+        但不需要把剧本、场景、分镜逐个加载到会话中
+
+        Args:
+            chapter_id: 章节ID
+
+        Returns:
+            删除的剧本数量
+        """
+        script_ids = select(MovieScript.id).where(MovieScript.chapter_id == chapter_id)
+        scene_ids = select(MovieScene.id).where(MovieScene.script_id.in_(script_ids))
+        shot_ids = select(MovieShot.id).where(MovieShot.scene_id.in_(scene_ids))
+
+        statements = [
+            delete(MovieGenerationHistory).where(or_(
+                and_(
+                    MovieGenerationHistory.resource_type == GenerationType.SCENE_IMAGE.value,
+                    MovieGenerationHistory.resource_id.in_(scene_ids),
+                ),
+                and_(
+                    MovieGenerationHistory.resource_type == GenerationType.SHOT_KEYFRAME.value,
+                    MovieGenerationHistory.resource_id.in_(shot_ids),
+                ),
+            )),
+            delete(MovieShot).where(MovieShot.scene_id.in_(scene_ids)),
+            delete(MovieScene).where(MovieScene.script_id.in_(script_ids)),
+            delete(MovieScript).where(MovieScript.chapter_id == chapter_id),
+        ]
+        result = None
+        for stmt in statements:
+            # 会话中没有加载这些对象，无需同步会话状态
+            result = await self.db_session.execute(stmt.execution_options(synchronize_session=False))
+        return result.rowcount
+
     async def extract_scenes_from_chapter(
         self, 
         chapter_id: str, 
@@ -45,8 +95,15 @@ class SceneService(BaseService):
         if not chapter:
             raise ValueError(f"未找到章节: {chapter_id}")
 
+        # 调用LLM前检查章节内容,避免空内容或超长内容白白消耗一次调用(也不会删除已有剧本)
+        content_length = len((chapter.content or "").strip())
+        if not content_length:
+            raise ValueError(f"章节内容为空: {chapter_id}")
+        max_chars = settings.MOVIE_SCENE_EXTRACTION_MAX_CHARS
+        if max_chars and content_length > max_chars:
+            raise ValueError(f"章节内容过长({content_length}字),超过单次场景提取上限{max_chars}字,请拆分章节")
+
         # 2. 加载项目角色
-        from sqlalchemy import select
         stmt = select(MovieCharacter).where(MovieCharacter.project_id == chapter.project_id)
         result = await self.db_session.execute(stmt)
         characters = result.scalars().all()
@@ -64,22 +121,11 @@ class SceneService(BaseService):
             base_url=api_key.base_url
         )
 
-        # 4. 使用统一的Prompt模板管理器
-        from src.services.movie_prompts import MoviePromptTemplates
-
         # 5. 删除已存在的剧本（如果有），创建全新的
-        from sqlalchemy import select
-        stmt = select(MovieScript).where(MovieScript.chapter_id == chapter.id)
-        result = await self.db_session.execute(stmt)
-        existing_scripts = result.scalars().all()
-        
-        if existing_scripts:
-            logger.info(f"检测到章节 {chapter_id} 已有 {len(existing_scripts)} 个剧本，将全部删除")
-            for old_script in existing_scripts:
-                logger.info(f"删除旧剧本: {old_script.id}")
-                await self.db_session.delete(old_script)  # 级联删除所有scenes和shots
-            await self.db_session.flush()
-        
+        deleted_count = await self._delete_chapter_scripts(chapter.id)
+        if deleted_count:
+            logger.info(f"已删除章节 {chapter_id} 的 {deleted_count} 个旧剧本及其场景和分镜")
+
         # 创建全新剧本
         script = MovieScript(chapter_id=chapter.id, status=ScriptStatus.GENERATING)
         self.db_session.add(script)
@@ -93,7 +139,7 @@ class SceneService(BaseService):
 
             # 使用模板管理器生成prompt
             prompt = MoviePromptTemplates.get_scene_extraction_prompt(
-                characters=json.dumps(character_list, ensure_ascii=False),
+                characters=json_dumps(character_list),
                 text=chapter.content
             )
 
@@ -104,32 +150,34 @@ class SceneService(BaseService):
                     {"role": "system", "content": "你是一个专业的电影场景提取专家。只输出JSON。"},
                     {"role": "user", "content": prompt},
                 ],
-                response_format={"type": "json_object"}
+                response_format=MoviePromptTemplates.json_response_format(
+                    api_key.provider, "scenes", MoviePromptTemplates.SCENE_EXTRACTION_SCHEMA
+                )
             )
 
             content = response.choices[0].message.content.strip()
             
             # 清理可能的代码块标记
-            if content.startswith("```json"):
-                content = content[7:-3].strip()
-            elif content.startswith("```"):
-                content = content[3:-3].strip()
+            content = strip_code_fence(content)
 
-            scene_data = json.loads(content)
+            scene_data = json_loads(content)
             logger.info(f"提取到 {len(scene_data.get('scenes', []))} 个场景")
 
             if on_progress:
                 await on_progress(0.6, f"解析场景数据...")
 
-            # 6. 保存新场景
-            for scene_item in scene_data.get("scenes", []):
-                scene = MovieScene(
-                    script_id=script.id,
-                    order_index=scene_item.get("order_index"),
-                    scene=scene_item.get("scene"),
-                    characters=scene_item.get("characters", [])
-                )
-                self.db_session.add(scene)
+            # 6. 保存新场景（单条 executemany INSERT，避免逐行 flush）
+            scene_rows = [
+                {
+                    "script_id": script.id,
+                    "order_index": scene_item.get("order_index"),
+                    "scene": scene_item.get("scene"),
+                    "characters": scene_item.get("characters", []),
+                }
+                for scene_item in scene_data.get("scenes", [])
+            ]
+            if scene_rows:
+                await self.db_session.execute(insert(MovieScene), scene_rows)
 
             script.status = ScriptStatus.COMPLETED
             
@@ -2,17 +2,22 @@
 分镜提取服务 - 从场景提取分镜头
 """
 
-import json
 import asyncio
-from typing import List, Dict, Any, Optional
-from sqlalchemy.orm import selectinload
-from sqlalchemy import select
+from typing import List, Dict, Any, Optional, Callable, Awaitable
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy import insert, select
 
 from src.core.logging import get_logger
+from src.models.chapter import Chapter
 from src.models.movie import MovieScript, MovieScene, MovieShot, MovieCharacter
 from src.services.base import BaseService
+from src.services.movie_prompts import MoviePromptTemplates
 from src.services.provider.factory import ProviderFactory
 from src.services.api_key import APIKeyService
+from src.services.image import retry_with_backoff
+from src.utils.json_utils import json_dumps, json_loads
+from src.utils.text_utils import strip_code_fence
+from src.utils.concurrency import AimdLimiter
 
 logger = get_logger(__name__)
 
@@ -39,23 +44,18 @@ class StoryboardService(BaseService):
         Returns:
             List[MovieShot]: 生成的分镜列表
         """
-        # 1. 加载场景
-        scene = await self.db_session.get(MovieScene, scene_id, options=[
-            selectinload(MovieScene.script)
-        ])
+        # 1. 加载场景,剧本、章节和项目在同一条查询中JOIN加载
+        stmt = select(MovieScene).where(MovieScene.id == scene_id).options(
+            joinedload(MovieScene.script).joinedload(MovieScript.chapter).joinedload(Chapter.project)
+        )
+        scene = (await self.db_session.execute(stmt)).scalar_one_or_none()
         if not scene:
             raise ValueError(f"未找到场景: {scene_id}")
+        chapter = scene.script.chapter
 
-        # 2. 加载项目角色
-        from src.models.chapter import Chapter
-        chapter = await self.db_session.get(Chapter, scene.script.chapter_id, options=[
-            selectinload(Chapter.project)
-        ])
-        
-        stmt = select(MovieCharacter).where(MovieCharacter.project_id == chapter.project_id)
-        result = await self.db_session.execute(stmt)
-        characters = result.scalars().all()
-        character_list = [char.name for char in characters]
+        # 2. 加载项目角色(只需要名称)
+        stmt = select(MovieCharacter.name).where(MovieCharacter.project_id == chapter.project_id)
+        character_list = list((await self.db_session.execute(stmt)).scalars())
 
         # 3. 加载API Key
         api_key_service = APIKeyService(self.db_session)
@@ -67,37 +67,33 @@ class StoryboardService(BaseService):
             base_url=api_key.base_url
         )
 
-        # 4. 使用统一的Prompt模板管理器
-        from src.services.movie_prompts import MoviePromptTemplates
-
-        # 5. 使用模板管理器生成prompt
+        # 4. 使用统一的Prompt模板管理器生成prompt
         prompt = MoviePromptTemplates.get_shot_extraction_prompt(
-            characters=json.dumps(character_list, ensure_ascii=False),
+            characters=json_dumps(character_list),
             scene=scene.scene
         )
 
-        # 6. 调用LLM
+        # 5. 调用LLM
         response = await llm_provider.completions(
             model=model,
             messages=[
                 {"role": "system", "content": "你是一个专业的电影分镜提取专家。只输出JSON。"},
                 {"role": "user", "content": prompt},
             ],
-            response_format={"type": "json_object"}
+            response_format=MoviePromptTemplates.json_response_format(
+                api_key.provider, "shots", MoviePromptTemplates.SHOT_EXTRACTION_SCHEMA
+            )
         )
 
         content = response.choices[0].message.content.strip()
         
         # 清理代码块标记
-        if content.startswith("```json"):
-            content = content[7:-3].strip()
-        elif content.startswith("```"):
-            content = content[3:-3].strip()
+        content = strip_code_fence(content)
 
-        shot_data = json.loads(content)
+        shot_data = json_loads(content)
         logger.info(f"场景 {scene_id} 提取到 {len(shot_data.get('shots', []))} 个分镜")
 
-        # 7. 保存分镜
+        # 6. 保存分镜
         created_shots = []
         for idx, shot_item in enumerate(shot_data.get("shots", [])): # 创建分镜
             shot = MovieShot(
@@ -158,7 +154,8 @@ class StoryboardService(BaseService):
         script_id: str,
         api_key_id: str,
         model: str = None,
-        max_concurrent: int = 3
+        max_concurrent: int = 3,
+        on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None
     ) -> Dict[str, Any]:
         """
         批量从剧本的所有场景提取分镜
@@ -167,14 +164,16 @@ class StoryboardService(BaseService):
             script_id: 剧本ID
             api_key_id: API Key ID
             model: 模型名称
-            max_concurrent: 最大并发数
+            max_concurrent: 初始并发数(根据调用结果自适应调整)
+            on_progress: 进度回调 (已完成数, 总数),每完成一个场景调用一次
             
         Returns:
             Dict: 统计信息 {success: int, failed: int, total: int}
         """
-        # 1. 加载剧本和所有场景（深度加载）
+        # 1. 加载剧本和所有场景（深度加载），章节和项目在剧本查询中JOIN加载
         script = await self.db_session.get(MovieScript, script_id, options=[
-            selectinload(MovieScript.scenes).selectinload(MovieScene.shots)
+            selectinload(MovieScript.scenes).selectinload(MovieScene.shots),
+            joinedload(MovieScript.chapter).joinedload(Chapter.project)
         ])
         if not script:
             raise ValueError(f"未找到剧本: {script_id}")
@@ -198,30 +197,35 @@ class StoryboardService(BaseService):
         await self.db_session.commit()
         logger.info(f"已删除所有现有分镜和场景图")
         
-        # 4. 获取项目角色列表（所有场景共用）
-        from src.models.chapter import Chapter
-        chapter = await self.db_session.get(Chapter, script.chapter_id, options=[
-            selectinload(Chapter.project)
-        ])
+        # 4. 获取项目角色列表（所有场景共用，只需要名称）
+        chapter = script.chapter
+        stmt = select(MovieCharacter.name).where(MovieCharacter.project_id == chapter.project_id)
+        character_list = list((await self.db_session.execute(stmt)).scalars())
         
-        stmt = select(MovieCharacter).where(MovieCharacter.project_id == chapter.project_id)
-        result = await self.db_session.execute(stmt)
-        characters = result.scalars().all()
-        character_list = [char.name for char in characters]
+        # 角色列表在所有场景中相同,prompt前缀只构建一次
+        shot_prompt_prefix = MoviePromptTemplates.get_shot_extraction_prefix(
+            json_dumps(character_list)
+        )
         
         # 5. 获取API Key
         api_key_service = APIKeyService(self.db_session)
         api_key = await api_key_service.get_api_key_by_id(api_key_id, str(chapter.project.owner_id))
         
         logger.info(f"开始批量提取分镜: {len(scene_data)} 个场景")
+        shot_response_format = MoviePromptTemplates.json_response_format(
+            api_key.provider, "shots", MoviePromptTemplates.SHOT_EXTRACTION_SCHEMA
+        )
 
-        # 6. 使用信号量控制并发
-        semaphore = asyncio.Semaphore(max_concurrent)
+        # 6. 使用AIMD自适应限制器控制并发:调用顺利时逐步提高并发,限流或失败时减半
+        limiter = AimdLimiter(
+            initial=max_concurrent, min_limit=1, max_limit=max_concurrent * 4, target_latency=60.0
+        )
         
-        # Worker函数 - 每个worker独立处理一个场景，不需要数据库查询
+        # Worker函数 - 每个worker独立处理一个场景，不访问数据库会话
         async def _extract_shot_worker(scene_id: str, scene_description: str):
-            async with semaphore:
-                try:
+            # 异常需穿过限制器的上下文,限制器才能据此降低并发
+            try:
+                async with limiter:
                     # 直接调用LLM生成分镜，不需要数据库查询
                     llm_provider = ProviderFactory.create(
                         provider=api_key.provider,
@@ -229,28 +233,27 @@ class StoryboardService(BaseService):
                         base_url=api_key.base_url
                     )
 
-                    # 使用统一的Prompt模板管理器
-                    from src.services.movie_prompts import MoviePromptTemplates
-
-                    # 生成prompt
-                    prompt = MoviePromptTemplates.get_shot_extraction_prompt(
-                        characters=json.dumps(character_list, ensure_ascii=False),
-                        scene=scene_description
+                    # 生成prompt(复用共享前缀,只拼接场景部分)
+                    prompt = shot_prompt_prefix + MoviePromptTemplates.get_shot_extraction_suffix(
+                        scene_description
                     )
 
-                    # 调用LLM
-                    response = await llm_provider.completions(
-                        model=model,
-                        messages=[
-                            {"role": "system", "content": "你是一个专业的电影分镜提取专家。只输出JSON。"},
-                            {"role": "user", "content": prompt}
-                        ],
-                        response_format={"type": "json_object"}
+                    # 调用LLM（限流等临时错误退避重试）
+                    response = await retry_with_backoff(
+                        lambda: llm_provider.completions(
+                            model=model,
+                            messages=[
+                                {"role": "system", "content": "你是一个专业的电影分镜提取专家。只输出JSON。"},
+                                {"role": "user", "content": prompt}
+                            ],
+                            response_format=shot_response_format
+                        ),
+                        max_retries=4
                     )
 
                     # 解析结果
                     content = response.choices[0].message.content
-                    data = json.loads(content)
+                    data = json_loads(content)
                     shots_data = data.get("shots", [])
                     
                     if not shots_data:
@@ -259,35 +262,50 @@ class StoryboardService(BaseService):
 
                     logger.info(f"场景 {scene_id} 提取到 {len(shots_data)} 个分镜")
 
-                    # 创建分镜对象并添加到session
-                    for idx, shot_info in enumerate(shots_data, 1):
-                        shot = MovieShot(
-                            scene_id=scene_id,
-                            order_index=idx,
-                            shot=shot_info.get("shot", ""),
-                            dialogue=shot_info.get("dialogue", ""),
-                            characters=shot_info.get("characters", [])
-                        )
-                        self.db_session.add(shot)
+                    # 返回分镜数据,由主循环统一写入数据库(会话不能被多个协程同时使用)
+                    return {"success": True, "scene_id": scene_id, "shots": shots_data}
                     
-                    # 返回成功和分镜数量
-                    return {"success": True, "scene_id": scene_id, "shot_count": len(shots_data)}
-                    
-                except Exception as e:
-                    logger.error(f"场景 {scene_id} 分镜提取失败: {e}")
-                    return {"success": False, "scene_id": scene_id, "error": str(e)}
+            except Exception as e:
+                logger.error(f"场景 {scene_id} 分镜提取失败: {e}")
+                return {"success": False, "scene_id": scene_id, "error": str(e)}
 
         # 7. 创建并发任务
-        tasks = [_extract_shot_worker(scene_id, scene_desc) for scene_id, scene_desc in scene_data]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-
-        # 8. 统计结果（shots已在worker中添加到session）
-        success_count = sum(1 for r in results if isinstance(r, dict) and r.get("success"))
+        tasks = [
+            asyncio.create_task(_extract_shot_worker(scene_id, scene_desc))
+            for scene_id, scene_desc in scene_data
+        ]
+
+        # 8. 按完成顺序逐个场景写入数据库,中途失败时已完成的场景不会丢失
+        results = []
+        try:
+            for completed, finished in enumerate(asyncio.as_completed(tasks), start=1):
+                result = await finished
+                shots_data = result.pop("shots", None)
+                if shots_data:
+                    # 单条 executemany INSERT 写入该场景的全部分镜，不构建ORM对象
+                    await self.db_session.execute(insert(MovieShot), [
+                        {
+                            "scene_id": result["scene_id"],
+                            "order_index": idx,
+                            "shot": shot_info.get("shot", ""),
+                            "dialogue": shot_info.get("dialogue", ""),
+                            "characters": shot_info.get("characters", []),
+                        }
+                        for idx, shot_info in enumerate(shots_data, 1)
+                    ])
+                    await self.db_session.commit()
+                    result["shot_count"] = len(shots_data)
+                results.append(result)
+                if on_progress:
+                    await on_progress(completed, len(tasks))
+        except BaseException:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        success_count = sum(1 for r in results if r.get("success"))
         failed_count = len(results) - success_count
-        
-        # 9. 一次性提交所有更改
-        if success_count > 0:
-            await self.db_session.commit()
 
         logger.info(f"批量分镜提取完成: 成功 {success_count}, 失败 {failed_count}")
 
@@ -24,9 +24,10 @@
 """
 import asyncio
 import re
+import uuid
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 try:
     from src.core.exceptions import ValidationError
@@ -392,6 +393,7 @@ class TextParserService:
         解析文本并转换为数据库模型格式
 
         直接从章节开始解析，逐层构建段落和句子，避免重复解析。
+        各层数据预先分配UUID主键并填好上级外键，可直接批量写入。
 
         Args:
             project_id: 项目ID
@@ -401,6 +403,37 @@ class TextParserService:
         Returns:
             (chapters_data, paragraphs_data, sentences_data): 三层数据结构
         """
+        chapters_data = []
+        paragraphs_data = []
+        sentences_data = []
+
+        async for chapter_data, chapter_paragraphs, chapter_sentences in self.iter_parse_to_models(
+                project_id, text, options
+        ):
+            chapters_data.append(chapter_data)
+            paragraphs_data.extend(chapter_paragraphs)
+            sentences_data.extend(chapter_sentences)
+
+        logger.info(f"解析完成: {len(chapters_data)} 章节, {len(paragraphs_data)} 段落, {len(sentences_data)} 句子")
+
+        return chapters_data, paragraphs_data, sentences_data
+
+    async def iter_parse_to_models(self, project_id: str, text: str, options: Optional[Dict[str, Any]] = None
+                                   ) -> AsyncIterator[Tuple[Dict, List[Dict], List[Dict]]]:
+        """
+        逐章节解析文本并转换为数据库模型格式
+
+        与parse_to_models相同的解析逻辑，但每处理完一个章节就产出该章节的数据，
+        调用方可边解析边保存，内存占用与单个章节大小相关而非整本书。
+
+        Args:
+            project_id: 项目ID
+            text: 待解析文本
+            options: 解析选项
+
+        Yields:
+            (chapter_data, paragraphs_data, sentences_data): 单个章节的三层数据
+        """
         if not text or not text.strip():
             raise ValidationError("文本内容不能为空")
 
@@ -425,21 +458,22 @@ class TextParserService:
             logger.info("单个章节过长，尝试智能分割")
             chapters = self._split_long_chapter(cleaned_text)
 
+        # 标准化后的全文不再需要，尽早释放
+        del cleaned_text
+
         # 3. 导入文本分割工具
         from src.utils.text_utils import paragraph_splitter, sentence_splitter
 
-        chapters_data = []
-        paragraphs_data = []
-        sentences_data = []
-
         # 4. 逐个章节处理，建立正确的层次关系
-        for chapter_idx, chapter_detection in enumerate(chapters):
+        for chapter_detection in chapters:
             # 清理章节标题和内容
             cleaned_title = chapter_detection.title.replace('\r\n', '\n').replace('\r', '\n').strip()
             cleaned_content = chapter_detection.content.replace('\r\n', '\n').replace('\r', '\n').strip()
 
             # 构建章节数据
+            chapter_id = uuid.uuid4()
             chapter_data = {
+                'id': chapter_id,
                 'project_id': project_id,
                 'title': cleaned_title,
                 'content': cleaned_content,
@@ -449,21 +483,22 @@ class TextParserService:
                 'sentence_count': 0,  # 稍后更新
                 'status': ChapterStatus.PENDING.value,
             }
-            chapters_data.append(chapter_data)
+            paragraphs_data = []
+            sentences_data = []
 
             # 分割当前章节的段落
             chapter_paragraphs = paragraph_splitter.split_into_paragraphs(chapter_detection.content)
 
-            chapter_sentence_count = 0
-
             # 5. 处理当前章节的段落
             for para_idx, paragraph_text in enumerate(chapter_paragraphs):
                 # 清理段落文本
                 cleaned_paragraph = paragraph_text.replace('\r\n', '\n').replace('\r', '\n').strip()
 
                 # 构建段落数据
+                paragraph_id = uuid.uuid4()
                 paragraph_data = {
-                    'chapter_id': None,  # 保存数据库后设置
+                    'id': paragraph_id,
+                    'chapter_id': chapter_id,
                     'content': cleaned_paragraph,
                     'order_index': para_idx + 1,
                     'word_count': len(cleaned_paragraph),
@@ -474,7 +509,6 @@ class TextParserService:
 
                 # 分割当前段落的句子
                 paragraph_sentences = sentence_splitter.split_text(cleaned_paragraph)
-                chapter_sentence_count += len(paragraph_sentences)
                 paragraph_data['sentence_count'] = len(paragraph_sentences)
 
                 # 6. 处理当前段落的句子
@@ -484,7 +518,8 @@ class TextParserService:
 
                     # 构建句子数据
                     sentence_data = {
-                        'paragraph_id': None,  # 保存数据库后设置
+                        'id': uuid.uuid4(),
+                        'paragraph_id': paragraph_id,
                         'content': cleaned_sentence,
                         'order_index': sent_idx + 1,
                         'word_count': len(cleaned_sentence),
@@ -494,16 +529,14 @@ class TextParserService:
                     sentences_data.append(sentence_data)
 
             # 7. 更新章节数据的统计信息
-            chapters_data[chapter_idx]['paragraph_count'] = len(chapter_paragraphs)
-            chapters_data[chapter_idx]['sentence_count'] = chapter_sentence_count
+            chapter_data['paragraph_count'] = len(paragraphs_data)
+            chapter_data['sentence_count'] = len(sentences_data)
+
+            yield chapter_data, paragraphs_data, sentences_data
 
         # 8. 更新统计信息
         self._update_stats(len(chapters))
 
-        logger.info(f"解析完成: {len(chapters_data)} 章节, {len(paragraphs_data)} 段落, {len(sentences_data)} 句子")
-
-        return chapters_data, paragraphs_data, sentences_data
-
     def get_detection_stats(self) -> Dict[str, Any]:
         """获取检测统计信息"""
         return self.stats.copy()
@@ -4,18 +4,39 @@
 
 import json
 import asyncio
-from typing import List, Dict, Any, Optional
+import aiohttp
+from typing import List, Dict, Any, Optional, Callable, Awaitable
+from uuid import UUID
 from sqlalchemy.orm import selectinload
-from sqlalchemy import select
+from sqlalchemy import insert, select
 
+from src.core.config import settings
 from src.core.logging import get_logger
+from src.models.api_key import APIKey
+from src.models.chapter import Chapter
 from src.models.movie import MovieScript, MovieScene, MovieShot, MovieShotTransition
+from src.models.project import Project
 from src.services.base import BaseService
 from src.services.provider.factory import ProviderFactory
+from src.services.provider.vector_engine_provider import VectorEngineProvider
 from src.services.api_key import APIKeyService
+from src.services.image import retry_with_backoff
+from src.services.movie_prompts import MoviePromptTemplates
+from src.utils.concurrency import AimdLimiter, get_token_bucket
+from src.utils.prompt_cache import PromptResultCache
+from src.utils.text_utils import clip_text
 
 logger = get_logger(__name__)
 
+# 前一个分镜仅作连续性参考,描述只保留开头部分,减少每次调用的输入长度
+PREVIOUS_SHOT_CONTEXT_MAX_CHARS = 300
+
+# 同步过渡视频状态时同时进行的查询/转存数量，避免触发视频服务的限流
+SYNC_STATUS_CONCURRENCY = 10
+
+# 转存过渡视频时每次从HTTP响应读取的字节数
+VIDEO_DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
 class TransitionService(BaseService):
     """
     过渡视频服务
@@ -23,6 +44,44 @@ class TransitionService(BaseService):
     2. 调用视频API生成过渡视频
     """
 
+    # 过渡提示词缓存: 键包含模型和完整prompt,模板修改后旧结果自然失效
+    _prompt_cache = PromptResultCache("transition_prompt", settings.MOVIE_TRANSITION_PROMPT_CACHE_TTL)
+
+    def __init__(self, db_session):
+        """
+        初始化过渡视频服务
+
+        Args:
+            db_session: 异步数据库会话
+        """
+        super().__init__(db_session)
+        # script_id -> 项目所有者ID，同一服务实例内的多次调用只查询一次
+        self._owner_cache: Dict[str, UUID] = {}
+
+    async def _resolve_owner_id(self, script_id: str) -> Optional[UUID]:
+        """
+        一次联表查询剧本所属项目的所有者ID（结果按script_id缓存）
+        
+        Args:
+            script_id: 剧本ID
+            
+        Returns:
+            项目所有者ID，剧本不存在时返回None
+        """
+        key = str(script_id)
+        if key not in self._owner_cache:
+            result = await self.db_session.execute(
+                select(Project.owner_id)
+                .join(Chapter, Chapter.project_id == Project.id)
+                .join(MovieScript, MovieScript.chapter_id == Chapter.id)
+                .where(MovieScript.id == script_id)
+            )
+            owner_id = result.scalar_one_or_none()
+            if owner_id is None:
+                return None
+            self._owner_cache[key] = owner_id
+        return self._owner_cache[key]
+
     async def _generate_transition_prompt(
         self,
         from_shot_description: str,
@@ -32,7 +91,8 @@ class TransitionService(BaseService):
         to_shot_dialogue: str,
         to_shot_characters: list,
         api_key,
-        model: str = None
+        model: str = None,
+        read_cache: bool = True
     ) -> str:
         """
         生成过渡视频提示词（内部方法，可复用）
@@ -46,6 +106,8 @@ class TransitionService(BaseService):
             to_shot_characters: 结束分镜角色列表
             api_key: API Key对象
             model: 模型名称
+            read_cache: 分镜内容和模型完全相同时是否直接复用缓存的结果;
+                重新生成时传False,新结果会覆盖缓存
             
         Returns:
             str: 生成的视频提示词
@@ -55,17 +117,9 @@ class TransitionService(BaseService):
             1. 过渡视频基于首尾关键帧，视觉一致性由视频模型保证
             2. 只需要角色名称，不需要详细外貌描述
         """
-        llm_provider = ProviderFactory.create(
-            provider=api_key.provider,
-            api_key=api_key.get_api_key(),
-            base_url=api_key.base_url
-        )
-
-        from src.services.movie_prompts import MoviePromptTemplates
-
         # 格式化前一个分镜描述（仅作上下文参考）
         previous_shot = f"""**分镜描述：**
-{from_shot_description}
+{clip_text(from_shot_description or "", PREVIOUS_SHOT_CONTEXT_MAX_CHARS)}
 
 **对话：** {from_shot_dialogue}
 
@@ -83,16 +137,50 @@ class TransitionService(BaseService):
 
         prompt = MoviePromptTemplates.get_transition_video_prompt(previous_shot, current_shot)
 
-        response = await llm_provider.completions(
-            model=model,
-            messages=[
-                {"role": "system", "content": "你是一个专业的电影视频提示词生成专家。"},
-                {"role": "user", "content": prompt},
-            ]
+        cache_key = self._prompt_cache.make_key(model, prompt)
+        if read_cache:
+            cached_prompt = await self._prompt_cache.get(cache_key)
+            if cached_prompt:
+                logger.info(f"复用缓存的视频提示词: {cached_prompt[:100]}...")
+                return cached_prompt
+
+        llm_provider = ProviderFactory.create(
+            provider=api_key.provider,
+            api_key=api_key.get_api_key(),
+            base_url=api_key.base_url
         )
 
+        # 同一服务商和API Key的调用共用令牌桶，按RPM限速（包括重试）
+        bucket = get_token_bucket((api_key.provider, str(api_key.id)), settings.MOVIE_TRANSITION_LLM_RPM)
+
+        async def _call_llm():
+            await bucket.acquire()
+            return await llm_provider.completions(
+                model=model,
+                messages=[
+                    {"role": "system", "content": "你是一个专业的电影视频提示词生成专家。"},
+                    {"role": "user", "content": prompt},
+                ]
+            )
+
+        # 限流等临时错误退避重试，避免整批过渡因短暂的 429 失败
+        response = await retry_with_backoff(_call_llm, max_retries=4)
+
         video_prompt = response.choices[0].message.content.strip()
         logger.info(f"生成视频提示词: {video_prompt[:100]}...")
+
+        # 模板说明部分是所有调用共享的前缀,记录服务商前缀缓存命中的token数便于确认缓存生效
+        # (OpenAI: prompt_tokens_details.cached_tokens, DeepSeek: prompt_cache_hit_tokens)
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            cached_tokens = (
+                getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)
+                or getattr(usage, "prompt_cache_hit_tokens", None)
+            )
+            logger.debug(f"过渡提示词输入token: {usage.prompt_tokens}, 命中前缀缓存: {cached_tokens or 0}")
+
+        if video_prompt:
+            await self._prompt_cache.set(cache_key, video_prompt)
         
         return video_prompt
 
@@ -101,7 +189,8 @@ class TransitionService(BaseService):
         from_shot: MovieShot,
         to_shot: MovieShot,
         api_key_id: str,
-        model: str = None
+        model: str = None,
+        read_cache: bool = True
     ) -> str:
         """
         生成两个分镜之间的视频提示词
@@ -111,22 +200,17 @@ class TransitionService(BaseService):
             to_shot: 结束分镜
             api_key_id: API Key ID
             model: 模型名称
+            read_cache: 是否复用相同分镜内容的缓存结果,重新生成时传False
             
         Returns:
             str: 生成的视频提示词（英文）
         """
-        # 加载API Key
-        from src.models.chapter import Chapter
-        
-        scene = await self.db_session.get(MovieScene, from_shot.scene_id, options=[
-            selectinload(MovieScene.script)
-        ])
-        chapter = await self.db_session.get(Chapter, scene.script.chapter_id, options=[
-            selectinload(Chapter.project)
-        ])
+        # 加载API Key（场景通常已在会话的identity map中，不产生查询）
+        scene = await self.db_session.get(MovieScene, from_shot.scene_id)
+        owner_id = await self._resolve_owner_id(scene.script_id)
         
         api_key_service = APIKeyService(self.db_session)
-        api_key = await api_key_service.get_api_key_by_id(api_key_id, str(chapter.project.owner_id))
+        api_key = await api_key_service.get_api_key_by_id(api_key_id, str(owner_id))
         
         return await self._generate_transition_prompt(
             from_shot_description=from_shot.shot,
@@ -136,7 +220,8 @@ class TransitionService(BaseService):
             to_shot_dialogue=to_shot.dialogue or '无',
             to_shot_characters=to_shot.characters or [],
             api_key=api_key,
-            model=model
+            model=model,
+            read_cache=read_cache
         )
 
     async def create_transition(
@@ -192,7 +277,8 @@ class TransitionService(BaseService):
         script_id: str,
         api_key_id: str,
         model: str = None,
-        max_concurrent: int = 5
+        max_concurrent: int = 5,
+        on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None
     ) -> Dict[str, Any]:
         """
         批量创建剧本所有分镜的过渡视频（并发处理）
@@ -201,7 +287,8 @@ class TransitionService(BaseService):
             script_id: 剧本ID
             api_key_id: API Key ID
             model: 模型名称
-            max_concurrent: 最大并发数
+            max_concurrent: 初始并发数(根据调用结果自适应调整)
+            on_progress: 进度回调 (已完成数, 总数),每生成完一个过渡提示词调用一次
             
         Returns:
             Dict: 统计信息
@@ -236,17 +323,10 @@ class TransitionService(BaseService):
         logger.info(f"已存在 {len(existing_transitions)} 个过渡")
 
         # 4. 预加载API Key和项目信息（避免在协程中访问数据库）
-        from src.models.chapter import Chapter
-        
-        scene = await self.db_session.get(MovieScene, all_shots[0].scene_id, options=[
-            selectinload(MovieScene.script)
-        ])
-        chapter = await self.db_session.get(Chapter, scene.script.chapter_id, options=[
-            selectinload(Chapter.project)
-        ])
+        owner_id = await self._resolve_owner_id(script_id)
         
         api_key_service = APIKeyService(self.db_session)
-        api_key = await api_key_service.get_api_key_by_id(api_key_id, str(chapter.project.owner_id))
+        api_key = await api_key_service.get_api_key_by_id(api_key_id, str(owner_id))
 
         # 5. 准备需要创建的过渡任务（提取所有需要的数据）
         transition_tasks = []
@@ -294,15 +374,31 @@ class TransitionService(BaseService):
 
         logger.info(f"准备并发创建 {len(transition_tasks)} 个过渡")
 
-        # 测试只生成一个
-        # transition_tasks = transition_tasks[:1]
-
-        # 6. 并发worker函数
-        semaphore = asyncio.Semaphore(max_concurrent)
+        # 6. 并发worker函数,使用AIMD自适应限制器:调用顺利时逐步提高并发,限流或失败时减半
+        limiter = AimdLimiter(
+            initial=max_concurrent, min_limit=1, max_limit=max_concurrent * 4, target_latency=60.0
+        )
         
-        async def _create_transition_worker(task_data: Dict[str, Any]):
-            async with semaphore:
-                try:
+        # 相同分镜内容(描述、对话、角色都相同)的过渡只调用一次LLM,结果共享给组内所有过渡
+        task_groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for task_data in transition_tasks:
+            content_key = (
+                task_data['from_shot_description'],
+                task_data['from_shot_dialogue'],
+                tuple(task_data['from_shot_characters']),
+                task_data['to_shot_description'],
+                task_data['to_shot_dialogue'],
+                tuple(task_data['to_shot_characters']),
+            )
+            task_groups.setdefault(content_key, []).append(task_data)
+        if len(task_groups) < len(transition_tasks):
+            logger.info(f"{len(transition_tasks)} 个过渡中有 {len(task_groups)} 组不同的分镜内容")
+        
+        async def _create_transition_worker(group: List[Dict[str, Any]]):
+            task_data = group[0]
+            # 异常需穿过限制器的上下文,限制器才能据此降低并发
+            try:
+                async with limiter:
                     # 生成LLM提示词（使用提取的方法）
                     video_prompt = await self._generate_transition_prompt(
                         from_shot_description=task_data['from_shot_description'],
@@ -314,40 +410,47 @@ class TransitionService(BaseService):
                         api_key=api_key,
                         model=model
                     )
-                    
-                    # 创建过渡对象（不立即提交）
-                    transition = MovieShotTransition(
-                        script_id=script_id,
-                        from_shot_id=task_data['from_shot_id'],
-                        to_shot_id=task_data['to_shot_id'],
-                        order_index=task_data['order_index'],
-                        video_prompt=video_prompt,
-                        status="pending"
-                    )
-                    
-                    logger.info(f"生成过渡提示词: {task_data['from_shot_id']} -> {task_data['to_shot_id']}")
-                    return {"success": True, "transition": transition}
-                    
-                except Exception as e:
-                    logger.error(f"创建过渡失败 {task_data['from_shot_id']} -> {task_data['to_shot_id']}: {e}")
-                    return {"success": False, "error": str(e)}
+            except Exception as e:
+                logger.error(f"创建过渡失败 {task_data['from_shot_id']} -> {task_data['to_shot_id']}: {e}")
+                return [{"success": False, "error": str(e)}] * len(group)
 
-        # 7. 并发执行
-        results = await asyncio.gather(*[_create_transition_worker(task) for task in transition_tasks])
+            # 准备过渡行数据（不构建ORM对象，最后统一插入）
+            results = []
+            for item in group:
+                row = {
+                    "script_id": script_id,
+                    "from_shot_id": item['from_shot_id'],
+                    "to_shot_id": item['to_shot_id'],
+                    "order_index": item['order_index'],
+                    "video_prompt": video_prompt,
+                    "status": "pending",
+                }
+                logger.info(f"生成过渡提示词: {item['from_shot_id']} -> {item['to_shot_id']}")
+                results.append({"success": True, "row": row})
+            return results
 
-        # 8. 批量保存成功的过渡
-        success_count = 0
-        failed_count = 0
-        
-        for result in results:
-            if result.get("success") and result.get("transition"):
-                self.db_session.add(result["transition"])
-                success_count += 1
-            else:
-                failed_count += 1
+        # 7. 并发执行,按完成顺序汇报进度
+        tasks = [asyncio.create_task(_create_transition_worker(group)) for group in task_groups.values()]
+        results = []
+        try:
+            for finished in asyncio.as_completed(tasks):
+                results.extend(await finished)
+                if on_progress:
+                    await on_progress(len(results), len(transition_tasks))
+        except BaseException:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        # 8. 批量保存成功的过渡（单条 executemany INSERT）
+        rows = [result["row"] for result in results if result.get("success") and result.get("row")]
+        success_count = len(rows)
+        failed_count = len(results) - success_count
 
         # 9. 一次性提交
-        if success_count > 0:
+        if rows:
+            await self.db_session.execute(insert(MovieShotTransition), rows)
             await self.db_session.commit()
 
         total_possible = len(all_shots) - 1
@@ -361,65 +464,111 @@ class TransitionService(BaseService):
             "message": f"创建完成: 新建 {success_count}, 跳过 {skipped_count}"
         }
 
-    async def _load_keyframes_as_base64(self, from_shot_id: str, to_shot_id: str) -> list:
+    async def _load_keyframe_urls(self, shot_ids: List[str]) -> Dict[str, Optional[str]]:
+        """
+        一次查询加载多个分镜的关键帧URL
+        
+        Args:
+            shot_ids: 分镜ID列表
+            
+        Returns:
+            dict: {分镜ID: 关键帧URL}
+        """
+        result = await self.db_session.execute(
+            select(MovieShot.id, MovieShot.keyframe_url).where(MovieShot.id.in_(set(shot_ids)))
+        )
+        return {shot_id: keyframe_url for shot_id, keyframe_url in result.all()}
+
+    async def _load_keyframes_as_base64(
+        self,
+        from_shot_id: str,
+        to_shot_id: str,
+        http_session: Optional[aiohttp.ClientSession] = None,
+        keyframe_urls: Optional[Dict[str, Optional[str]]] = None
+    ) -> list:
         """
         加载前后分镜的关键帧并转换为base64 data URL
         
         Args:
             from_shot_id: 起始分镜ID
             to_shot_id: 结束分镜ID
+            http_session: 共享的aiohttp会话（批量生成时复用连接），未提供时为本次调用创建临时会话
+            keyframe_urls: 预先批量查询的 {分镜ID: 关键帧URL}，未提供时查询这两个分镜
             
         Returns:
             list: base64 data URL列表
         """
         import base64
-        import aiohttp
-        from datetime import timedelta
+        from src.utils.image_utils import detect_image_mime
         from src.utils.storage import get_storage_client
         
-        # 加载分镜
-        from_shot = await self.db_session.get(MovieShot, from_shot_id)
-        to_shot = await self.db_session.get(MovieShot, to_shot_id)
+        if keyframe_urls is None:
+            # 一次查询加载前后两个分镜的关键帧URL
+            keyframe_urls = await self._load_keyframe_urls([from_shot_id, to_shot_id])
         
-        keyframe_images = []
+        keyframes = [
+            (keyframe_url, shot_name)
+            for keyframe_url, shot_name in [
+                (keyframe_urls.get(from_shot_id), "from"),
+                (keyframe_urls.get(to_shot_id), "to"),
+            ]
+            if keyframe_url
+        ]
+        if not keyframes:
+            return []
         
-        for shot, shot_name in [(from_shot, "from"), (to_shot, "to")]:
-            if not shot or not shot.keyframe_url:
-                continue
-            
+        # 存储客户端只获取一次，两张关键帧共用
+        storage_client = None
+        if any(keyframe_url.startswith("uploads/") for keyframe_url, _ in keyframes):
+            storage_client = await get_storage_client()
+        
+        async def _fetch(session: Optional[aiohttp.ClientSession], keyframe_url: str, shot_name: str) -> Optional[str]:
             try:
                 # 如果是MinIO key，直接从内部存储获取，避免 localhost 访问失败
-                keyframe_url = shot.keyframe_url
                 img_data = None
+                # 文件头无法识别时的MIME类型：优先使用响应头声明的图片类型
+                fallback_mime = "image/jpeg"
                 
                 if keyframe_url.startswith("uploads/"):
-                    storage_client = await get_storage_client()
                     img_data = await storage_client.download_file(keyframe_url)
                     logger.info(f"成功从内部存储直接加载{shot_name}关键帧数据")
                 else:
                     # 下载关键帧并转base64
-                    async with aiohttp.ClientSession() as session:
-                        async with session.get(keyframe_url, timeout=10) as resp:
-                            if resp.status == 200:
-                                img_data = await resp.read()
-                                logger.info(f"成功通过URL加载{shot_name}关键帧")
-                            else:
-                                logger.warning(f"下载{shot_name}关键帧失败: HTTP {resp.status}")
+                    async with session.get(keyframe_url, timeout=aiohttp.ClientTimeout(total=10)) as resp:
+                        if resp.status == 200:
+                            img_data = await resp.read()
+                            content_type = resp.headers.get("Content-Type", "").split(";", 1)[0].strip().lower()
+                            if content_type.startswith("image/"):
+                                fallback_mime = content_type
+                            logger.info(f"成功通过URL加载{shot_name}关键帧")
+                        else:
+                            logger.warning(f"下载{shot_name}关键帧失败: HTTP {resp.status}")
                 
                 if img_data:
-                    b64_img = base64.b64encode(img_data).decode('utf-8')
+                    # 多MB关键帧的base64编码放到线程池中执行，避免阻塞事件循环
+                    b64_img = (await asyncio.to_thread(base64.b64encode, img_data)).decode('ascii')
                     
-                    # 检测MIME类型
-                    mime_type = "image/jpeg"
-                    if img_data[:4] == b'\x89PNG':
-                        mime_type = "image/png"
+                    # 按文件头检测MIME类型（PNG/JPEG/GIF/WEBP/AVIF），避免把非JPEG关键帧标成image/jpeg
+                    mime_type = detect_image_mime(img_data, default=fallback_mime)
                     
                     # VectorEngine使用data URL格式
-                    keyframe_images.append(f"data:{mime_type};base64,{b64_img}")
+                    return f"data:{mime_type};base64,{b64_img}"
             except Exception as e:
                 logger.warning(f"处理{shot_name}关键帧失败: {e}")
+            return None
+        
+        async def _fetch_all(session: Optional[aiohttp.ClientSession]) -> list:
+            # 前后关键帧并发下载，gather保持from/to顺序
+            return await asyncio.gather(*(_fetch(session, url, shot_name) for url, shot_name in keyframes))
+        
+        needs_http = any(not keyframe_url.startswith("uploads/") for keyframe_url, _ in keyframes)
+        if http_session is not None or not needs_http:
+            images = await _fetch_all(http_session)
+        else:
+            async with aiohttp.ClientSession() as session:
+                images = await _fetch_all(session)
         
-        return keyframe_images
+        return [image for image in images if image]
 
     async def _generate_single_transition_video(
         self,
@@ -427,7 +576,9 @@ class TransitionService(BaseService):
         api_key_id: str,
         user_id: str,
         video_model: str,
-        provider
+        provider,
+        http_session: Optional[aiohttp.ClientSession] = None,
+        keyframe_urls: Optional[Dict[str, Optional[str]]] = None
     ) -> dict:
         """
         生成单个过渡视频的通用逻辑（内部方法）
@@ -438,6 +589,8 @@ class TransitionService(BaseService):
             user_id: 用户ID
             video_model: 视频模型
             provider: VectorEngine provider实例
+            http_session: 下载关键帧使用的共享aiohttp会话（可选）
+            keyframe_urls: 预先批量查询的 {分镜ID: 关键帧URL}（可选）
             
         Returns:
             dict: {"success": bool, "transition_id": str, "task_id": str} 或 {"success": bool, "error": str}
@@ -446,10 +599,13 @@ class TransitionService(BaseService):
             # 加载关键帧
             keyframe_images = await self._load_keyframes_as_base64(
                 transition.from_shot_id, 
-                transition.to_shot_id
+                transition.to_shot_id,
+                http_session=http_session,
+                keyframe_urls=keyframe_urls
             )
             
-            # 调用视频生成（传递关键帧）
+            # 调用视频生成（传递关键帧），与状态同步共用同一API Key的令牌桶
+            await get_token_bucket(("vectorengine", str(api_key_id)), settings.MOVIE_VIDEO_API_RPM).acquire()
             result = await provider.create_video(
                 prompt=transition.video_prompt,
                 model=video_model,
@@ -499,21 +655,13 @@ class TransitionService(BaseService):
             raise ValueError(f"过渡 {transition_id} 没有视频提示词")
         
         # 获取user_id（从script关联获取）
-        from src.models.chapter import Chapter
-        from sqlalchemy.orm import joinedload
-        
-        script = await self.db_session.get(MovieScript, transition.script_id, options=[
-            joinedload(MovieScript.chapter).joinedload(Chapter.project)
-        ])
-        user_id = script.chapter.project.owner_id
+        user_id = await self._resolve_owner_id(transition.script_id)
         
         # 加载API Key
         api_key_service = APIKeyService(self.db_session)
         api_key = await api_key_service.get_api_key_by_id(api_key_id, str(user_id))
         
         # 使用VectorEngineProvider生成视频
-        from src.services.provider.vector_engine_provider import VectorEngineProvider
-        
         video_provider = VectorEngineProvider(
             api_key=api_key.get_api_key(),
             base_url=api_key.base_url
@@ -552,22 +700,15 @@ class TransitionService(BaseService):
         Returns:
             dict: 生成统计信息
         """
-        from src.models.chapter import Chapter
-        from sqlalchemy.orm import joinedload
         from src.core.database import get_async_db
         
         logger.info(f"开始批量生成过渡视频: script_id={script_id}")
         
-        # 1. 加载script和user信息（在主会话中）
-        script = await self.db_session.get(MovieScript, script_id, options=[
-            selectinload(MovieScript.scenes).selectinload(MovieScene.shots),
-            joinedload(MovieScript.chapter).joinedload(Chapter.project)
-        ])
-        if not script:
+        # 1. 加载user信息（在主会话中）
+        user_id = await self._resolve_owner_id(script_id)
+        if user_id is None:
             raise ValueError("剧本不存在")
         
-        user_id = script.chapter.project.owner_id
-        
         # 2. 加载API Key（在主会话中）
         api_key_service = APIKeyService(self.db_session)
         api_key = await api_key_service.get_api_key_by_id(api_key_id, str(user_id))
@@ -598,14 +739,18 @@ class TransitionService(BaseService):
                 'script_id': t.script_id
             })
         
-        # 5. 创建VectorEngine provider（可以共享）
-        from src.services.provider.vector_engine_provider import VectorEngineProvider
+        # 5. 一次查询预取所有过渡涉及分镜的关键帧URL，worker中不再逐个查询分镜
+        keyframe_urls = await self._load_keyframe_urls(
+            [td['from_shot_id'] for td in transition_data_list] + [td['to_shot_id'] for td in transition_data_list]
+        )
+        
+        # 6. 创建VectorEngine provider（可以共享）
         provider = VectorEngineProvider(
             api_key=api_key.get_api_key(),
             base_url=api_key.base_url
         )
         
-        # 6. 定义worker函数（使用独立会话）
+        # 7. 定义worker函数（使用独立会话）
         max_concurrent = 5
         semaphore = asyncio.Semaphore(max_concurrent)
         
@@ -626,7 +771,9 @@ class TransitionService(BaseService):
                         # 生成视频（使用worker会话的service实例）
                         worker_service = TransitionService(worker_session)
                         result = await worker_service._generate_single_transition_video(
-                            transition, api_key_id, str(user_id), video_model, provider
+                            transition, api_key_id, str(user_id), video_model, provider,
+                            http_session=http_session,
+                            keyframe_urls=keyframe_urls
                         )
                         
                         # 提交worker会话
@@ -639,11 +786,14 @@ class TransitionService(BaseService):
                         logger.error(f"Worker生成过渡视频失败 [{transition_data['id']}]: {e}", exc_info=True)
                         return {"success": False, "error": str(e)}
         
-        # 7. 执行并发任务
-        tasks = [_generate_worker_with_session(td) for td in transition_data_list]
-        results = await asyncio.gather(*tasks)
+        # 8. 执行并发任务（worker自行处理业务异常；出现未处理的异常时TaskGroup会取消其余worker，不留下孤儿任务）
+        # 所有worker共用一个HTTP会话下载关键帧，复用连接而不是每个过渡新建连接池
+        async with aiohttp.ClientSession() as http_session:
+            async with asyncio.TaskGroup() as tg:
+                tasks = [tg.create_task(_generate_worker_with_session(td)) for td in transition_data_list]
+        results = [t.result() for t in tasks]
         
-        # 8. 统计结果（不需要在这里commit，每个worker已经独立commit了）
+        # 9. 统计结果（不需要在这里commit，每个worker已经独立commit了）
         success_count = sum(1 for r in results if r["success"])
         failed_count = len(results) - success_count
         
@@ -666,8 +816,6 @@ class TransitionService(BaseService):
             dict: 同步统计信息
         """
         import httpx
-        from fastapi import UploadFile
-        import io
         import uuid
         from src.utils.storage import get_storage_client
         
@@ -691,142 +839,172 @@ class TransitionService(BaseService):
         completed_count = 0
         failed_count = 0
         
+        def _mark_failed(transition: MovieShotTransition, error_msg: str) -> None:
+            nonlocal failed_count
+            transition.status = "failed"
+            transition.error_message = error_msg[:500]  # 限制长度避免过长
+            failed_count += 1
+        
+        # 按API Key分组：每个Key只加载一次并创建一个provider，同组过渡共用
+        transitions_by_key: Dict[str, List[MovieShotTransition]] = {}
         for transition in transitions:
-            try:
-                # 从记录中获取API Key ID
-                transition_api_key_id = str(transition.api_key_id) if transition.api_key_id else api_key_id
-                if not transition_api_key_id:
-                    logger.warning(f"过渡 {transition.id} 缺少api_key_id，跳过")
-                    continue
-                
-                # 加载API Key
-                api_key_service = APIKeyService(self.db_session)
-                api_key = await api_key_service.get_api_key_by_id(transition_api_key_id)
-                
-                # 创建provider
-                from src.services.provider.vector_engine_provider import VectorEngineProvider
-                provider = VectorEngineProvider(
+            # 从记录中获取API Key ID
+            transition_api_key_id = str(transition.api_key_id) if transition.api_key_id else api_key_id
+            if not transition_api_key_id:
+                logger.warning(f"过渡 {transition.id} 缺少api_key_id，跳过")
+                continue
+            transitions_by_key.setdefault(transition_api_key_id, []).append(transition)
+        
+        # 一次查询加载所有涉及的API Key，预先为每个Key创建provider
+        providers_by_key: Dict[str, VectorEngineProvider] = {}
+        if transitions_by_key:
+            key_result = await self.db_session.execute(
+                select(APIKey).where(APIKey.id.in_(list(transitions_by_key)))
+            )
+            for api_key in key_result.scalars():
+                providers_by_key[str(api_key.id)] = VectorEngineProvider(
                     api_key=api_key.get_api_key(),
                     base_url=api_key.base_url
                 )
-                
-                # 查询任务状态
-                status_data = await provider.get_task_status(transition.video_task_id)
-                
-                # VectorEngine API返回格式: {"id": "...", "status": "...", "detail": {...}}
-                # 状态可能在顶层或detail中
-                status = status_data.get("status")
-                detail = status_data.get("detail", {})
-                
-                logger.debug(f"任务 {transition.video_task_id} 状态: {status}, detail状态: {detail.get('status')}")
-                
-                # 如果顶层状态是video_generating或processing，使用detail中的状态
-                if status in ["video_generating", "processing", "pending"]:
-                    # 仍在处理中，不更新
-                    logger.debug(f"过渡视频仍在处理中: {transition.id}, 状态: {status}")
-                    continue
-                
-                if status == "completed":
-                    # VectorEngine API在完成时，video_url在顶层
-                    video_url = status_data.get("video_url")
+        
+        jobs = []
+        for transition_api_key_id, key_transitions in transitions_by_key.items():
+            provider = providers_by_key.get(transition_api_key_id)
+            if provider is None:
+                logger.error(f"加载API Key {transition_api_key_id} 失败: 未找到API Key")
+                for transition in key_transitions:
+                    _mark_failed(transition, "同步失败: 未找到到APIKEY")
+                continue
+            bucket = get_token_bucket(("vectorengine", transition_api_key_id), settings.MOVIE_VIDEO_API_RPM)
+            jobs.extend((transition, provider, bucket) for transition in key_transitions)
+        
+        semaphore = asyncio.Semaphore(SYNC_STATUS_CONCURRENCY)
+        
+        async def _sync_one(transition: MovieShotTransition, provider, bucket, client: httpx.AsyncClient):
+            """
+            查询单个过渡的任务状态，完成时把视频转存到MinIO（只做网络IO，不访问数据库会话）
+            
+            Returns:
+                tuple | None: ("completed", object_key) / ("failed", 错误信息) / ("error", 异常信息)，无需更新时返回None
+            """
+            async with semaphore:
+                try:
+                    # 查询任务状态（按API Key的RPM限速）
+                    await bucket.acquire()
+                    status_data = await provider.get_task_status(transition.video_task_id)
+                    
+                    # VectorEngine API返回格式: {"id": "...", "status": "...", "detail": {...}}
+                    # 状态可能在顶层或detail中
+                    status = status_data.get("status")
+                    detail = status_data.get("detail", {})
                     
-                    # 如果顶层没有，尝试从detail中获取
-                    if not video_url:
-                        detail = status_data.get("detail", {})
-                        video_url = detail.get("video_url")
+                    logger.debug(f"任务 {transition.video_task_id} 状态: {status}, detail状态: {detail.get('status')}")
                     
-                    if video_url:
+                    # 如果顶层状态是video_generating或processing，使用detail中的状态
+                    if status in ["video_generating", "processing", "pending"]:
+                        # 仍在处理中，不更新
+                        logger.debug(f"过渡视频仍在处理中: {transition.id}, 状态: {status}")
+                        return None
+                    
+                    if status == "completed":
+                        # VectorEngine API在完成时，video_url在顶层
+                        video_url = status_data.get("video_url")
+                        
+                        # 如果顶层没有，尝试从detail中获取
+                        if not video_url:
+                            video_url = detail.get("video_url")
+                        
+                        if not video_url:
+                            # 没有视频URL，标记为失败
+                            logger.error(f"过渡视频失败: {transition.id} - 未返回视频URL")
+                            return "failed", "视频生成完成但未返回视频URL"
+                        
                         # 获取user_id
                         user_id = str(transition.user_id) if transition.user_id else "system"
                         
-                        # 下载视频 (增加超时设置: 连接30s, 读取300s)
-                        async with httpx.AsyncClient(timeout=httpx.Timeout(timeout=300.0, connect=30.0)) as client:
-                            response = await client.get(video_url)
-                            response.raise_for_status()
-                            video_content = response.content
-                        
-                        # 上传到MinIO（使用通用方法）
+                        # 边下载边分片上传到MinIO，内存中只保留一个分片，不缓存整个视频
                         storage_client = await get_storage_client()
                         file_id = str(uuid.uuid4())
-                        upload_file = UploadFile(
-                            filename=f"{file_id}.mp4",
-                            file=io.BytesIO(video_content)
-                        )
-                        
-                        storage_result = await storage_client.upload_file(
-                            user_id=user_id,
-                            file=upload_file,
-                            metadata={"transition_id": str(transition.id)}
-                        )
-                        
-                        transition.video_url = storage_result["object_key"]
-                        transition.status = "completed"
-                        transition.error_message = None  # 清除之前的错误信息
-                        
-                        # 创建生成历史记录
-                        from src.services.generation_history_service import GenerationHistoryService
-                        from src.models.movie import GenerationType, MediaType
+                        async with client.stream("GET", video_url) as response:
+                            response.raise_for_status()
+                            storage_result = await storage_client.upload_async_stream(
+                                user_id,
+                                response.aiter_bytes(VIDEO_DOWNLOAD_CHUNK_SIZE),
+                                f"{file_id}.mp4",
+                                content_type="video/mp4",
+                                metadata={"transition_id": str(transition.id)}
+                            )
+                        return "completed", storage_result["object_key"]
+                    
+                    if status == "failed":
+                        # 获取失败原因
+                        error_data = status_data.get("error", "视频生成失败")
                         
-                        history_service = GenerationHistoryService(self.db_session)
-                        await history_service.create_history(
-                            resource_type=GenerationType.TRANSITION_VIDEO,
-                            resource_id=str(transition.id),
-                            result_url=storage_result["object_key"],
-                            prompt=transition.video_prompt or "",
-                            media_type=MediaType.VIDEO,
-                            model=None,
-                            api_key_id=str(transition.api_key_id) if transition.api_key_id else None
-                        )
+                        # 如果error是字典，转换为字符串
+                        if isinstance(error_data, dict):
+                            error_msg = json.dumps(error_data, ensure_ascii=False)
+                        else:
+                            error_msg = str(error_data)
                         
-                        completed_count += 1
-                        logger.info(f"过渡视频完成: {transition.id}, 已保存到MinIO")
-                    else:
-                        # 没有视频URL，标记为失败
-                        transition.status = "failed"
-                        transition.error_message = "视频生成完成但未返回视频URL"
-                        failed_count += 1
-                        logger.error(f"过渡视频失败: {transition.id} - 未返回视频URL")
-                    
-                elif status == "failed":
-                    # 获取失败原因
-                    error_data = status_data.get("error", "视频生成失败")
-                    
-                    # 如果error是字典，转换为字符串
-                    if isinstance(error_data, dict):
-                        import json
-                        error_msg = json.dumps(error_data, ensure_ascii=False)
-                    else:
-                        error_msg = str(error_data)
+                        logger.error(f"过渡视频失败: {transition.id} - {error_msg}")
+                        return "failed", error_msg
                     
-                    transition.status = "failed"
-                    transition.error_message = error_msg
-                    failed_count += 1
-                    logger.error(f"过渡视频失败: {transition.id} - {error_msg}")
-                
-                elif status == "processing":
-                    # 仍在处理中，不更新
-                    logger.debug(f"过渡视频仍在处理中: {transition.id}")
-                    continue
-                
-                else:
                     # 未知状态
                     logger.warning(f"过渡视频未知状态: {transition.id} - {status}")
-                    continue
-                
-                synced_count += 1
-                
-            except (httpx.TimeoutException, httpx.ConnectError) as e:
-                # 网络超时或连接错误，不标记失败，允许下一次重试
-                logger.warning(f"同步过渡 {transition.id} 遭遇网络异常(超时/连接), 将在下次循环重试: {e}")
+                    return None
+                    
+                except (httpx.TimeoutException, httpx.ConnectError) as e:
+                    # 网络超时或连接错误，不标记失败，允许下一次重试
+                    logger.warning(f"同步过渡 {transition.id} 遭遇网络异常(超时/连接), 将在下次循环重试: {e}")
+                    return None
+                except Exception as e:
+                    logger.error(f"同步过渡 {transition.id} 遭遇不可恢复失败: {e}", exc_info=True)
+                    return "error", f"同步失败: {str(e)}"
+        
+        # 并发查询状态和转存视频，所有过渡共用一个HTTP客户端 (超时设置: 连接30s, 读取300s)
+        async with httpx.AsyncClient(timeout=httpx.Timeout(timeout=300.0, connect=30.0)) as client:
+            outcomes = await asyncio.gather(*(_sync_one(t, provider, bucket, client) for t, provider, bucket in jobs))
+        
+        # 数据库会话不能并发使用，状态更新和历史记录在网络IO全部结束后依次写入
+        from src.services.generation_history_service import GenerationHistoryService
+        from src.models.movie import GenerationType, MediaType
+        
+        history_service = GenerationHistoryService(self.db_session)
+        for (transition, _, _), outcome in zip(jobs, outcomes):
+            if outcome is None:
                 continue
+            
+            state, value = outcome
+            try:
+                if state == "completed":
+                    transition.video_url = value
+                    transition.status = "completed"
+                    transition.error_message = None  # 清除之前的错误信息
+                    
+                    # 创建生成历史记录
+                    await history_service.create_history(
+                        resource_type=GenerationType.TRANSITION_VIDEO,
+                        resource_id=str(transition.id),
+                        result_url=value,
+                        prompt=transition.video_prompt or "",
+                        media_type=MediaType.VIDEO,
+                        model=None,
+                        api_key_id=str(transition.api_key_id) if transition.api_key_id else None
+                    )
+                    
+                    completed_count += 1
+                    logger.info(f"过渡视频完成: {transition.id}, 已保存到MinIO")
+                else:
+                    _mark_failed(transition, value)
+                    if state == "error":
+                        # 同步过程异常只计入失败，不计入已同步
+                        continue
             except Exception as e:
-                error_msg = f"同步失败: {str(e)}"
                 logger.error(f"同步过渡 {transition.id} 遭遇不可恢复失败: {e}", exc_info=True)
-                
-                # 记录错误信息（确保是字符串）
-                transition.status = "failed"
-                transition.error_message = error_msg[:500]  # 限制长度避免过长
-                failed_count += 1
+                _mark_failed(transition, f"同步失败: {str(e)}")
+                continue
+            
+            synced_count += 1
         
         await self.db_session.commit()
         
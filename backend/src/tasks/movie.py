@@ -40,8 +40,14 @@ async def movie_extract_shots(db_session: AsyncSession, self, script_id: str, ap
     from src.services.storyboard_service import StoryboardService
     logger.info(f"Celery任务开始: movie_extract_shots (script_id={script_id})")
     
+    async def on_progress(completed, total):
+        self.update_state(
+            state='PROGRESS',
+            meta={'percent': completed / total, 'message': f"已完成 {completed}/{total} 个场景"}
+        )
+    
     service = StoryboardService(db_session)
-    result = await service.batch_extract_shots_from_script(script_id, api_key_id, model)
+    result = await service.batch_extract_shots_from_script(script_id, api_key_id, model, on_progress=on_progress)
     
     logger.info(f"Celery任务完成: movie_extract_shots, 成功 {result['success']}, 失败 {result['failed']}")
     return result
@@ -75,8 +81,14 @@ async def movie_create_transitions(db_session: AsyncSession, self, script_id: st
     from src.services.transition_service import TransitionService
     logger.info(f"Celery任务开始: movie_create_transitions (script_id={script_id})")
     
+    async def on_progress(completed, total):
+        self.update_state(
+            state='PROGRESS',
+            meta={'percent': completed / total, 'message': f"已完成 {completed}/{total} 个过渡"}
+        )
+    
     service = TransitionService(db_session)
-    result = await service.batch_create_transitions(script_id, api_key_id, model)
+    result = await service.batch_create_transitions(script_id, api_key_id, model, on_progress=on_progress)
     
     logger.info(f"Celery任务完成: movie_create_transitions, 成功 {result['success']}")
     return result
@@ -304,7 +316,8 @@ async def movie_regenerate_transition_prompt(
         transition.from_shot,
         transition.to_shot,
         api_key_id,
-        model
+        model,
+        read_cache=False
     )
     
     # 更新提示词
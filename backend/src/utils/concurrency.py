@@ -0,0 +1,300 @@
+"""
+并发控制工具 - 自适应并发限制与基于Redis的跨进程并发限制
+"""
+
+import asyncio
+import random
+import secrets
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Hashable, Optional
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from src.core.config import settings
+from src.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# 事件循环 -> Redis客户端(连接池绑定事件循环,按循环分开保存)
+_redis_clients: "weakref.WeakKeyDictionary[Any, redis.Redis]" = weakref.WeakKeyDictionary()
+
+# 事件循环 -> {键: 令牌桶}(令牌桶内的锁绑定事件循环,按循环分开保存)
+_token_buckets: "weakref.WeakKeyDictionary[Any, Dict[Hashable, TokenBucket]]" = weakref.WeakKeyDictionary()
+
+
+def get_redis_client() -> redis.Redis:
+    """获取当前事件循环共享的Redis客户端
+
+    供并发限制、提示词缓存等短小操作复用,连接与读写超时较短
+
+    Returns:
+        redis.Redis: 绑定当前事件循环的Redis客户端
+    """
+    loop = asyncio.get_running_loop()
+    client = _redis_clients.get(loop)
+    if client is None:
+        # 超时较短:Redis不可用时尽快退化为进程内限制,而不是阻塞生成请求
+        client = _redis_clients[loop] = redis.from_url(
+            settings.REDIS_URL, socket_connect_timeout=1, socket_timeout=2
+        )
+    return client
+
+
+class AimdLimiter:
+    """
+    AIMD(加性增、乘性减)自适应并发限制器
+
+    - 调用成功且耗时不超过目标延迟时,并发上限加 increase_step
+    - 调用失败(限流、超时、服务端错误等)时,并发上限乘以 decrease_factor
+    - 同一批并发中的多次失败只减半一次,避免上限瞬间跌到最小值
+
+    用法与 asyncio.Semaphore 相同: async with limiter: ...,
+    异常穿过上下文时视为失败
+    """
+
+    def __init__(
+            self,
+            initial: int = 8,
+            min_limit: int = 2,
+            max_limit: int = 32,
+            target_latency: float = 5.0,
+            increase_step: float = 0.5,
+            decrease_factor: float = 0.5,
+    ):
+        """
+        初始化限制器
+
+        Args:
+            initial: 初始并发上限
+            min_limit: 并发上限的下界
+            max_limit: 并发上限的上界
+            target_latency: 目标延迟(秒),超过时不再增加并发
+            increase_step: 每次成功增加的并发上限
+            decrease_factor: 失败时并发上限的缩减系数
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self._limit = float(min(max(initial, min_limit), max_limit))
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._started: Dict[Optional[asyncio.Task], float] = {}
+        self._condition = asyncio.Condition()
+
+    @property
+    def limit(self) -> int:
+        """当前并发上限"""
+        return int(self._limit)
+
+    async def __aenter__(self) -> "AimdLimiter":
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+        self._started[asyncio.current_task()] = time.monotonic()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        started = self._started.pop(asyncio.current_task())
+        latency = time.monotonic() - started
+
+        async with self._condition:
+            self._in_flight -= 1
+            if exc_type is not None and issubclass(exc_type, Exception):
+                # 只有在上次减半之后发起的调用失败才减半
+                if started >= self._last_decrease:
+                    self._limit = max(self.min_limit, self._limit * self.decrease_factor)
+                    self._last_decrease = time.monotonic()
+                    logger.info(f"调用失败,并发上限降为 {self.limit}")
+            elif exc_type is None and latency <= self.target_latency:
+                self._limit = min(self.max_limit, self._limit + self.increase_step)
+            self._condition.notify_all()
+
+
+class TokenBucket:
+    """
+    令牌桶限速器 - 限制每分钟的调用次数
+
+    并发限制只约束同时进行的调用数,耗时短的调用仍可能在一分钟内超过服务商的RPM限制;
+    令牌桶按固定速率补充令牌,每次调用前取走一个:
+    - 令牌按 rate_per_min / 60 个每秒补充,最多积攒 burst 个
+    - 没有令牌时按先来先到等待下一个令牌
+    - rate_per_min 不大于0时不做限制
+    """
+
+    def __init__(self, rate_per_min: float, burst: Optional[int] = None):
+        """
+        初始化令牌桶
+
+        Args:
+            rate_per_min: 每分钟允许的调用次数
+            burst: 最多积攒的令牌数(允许的突发调用数),默认为10秒内补充的令牌数
+        """
+        self.rate_per_min = rate_per_min
+        self.burst = max(1, burst if burst is not None else int(rate_per_min / 6))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """取走一个令牌,没有令牌时等待"""
+        if self.rate_per_min <= 0:
+            return
+        rate = self.rate_per_min / 60.0
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            # 持锁等待:后来者排在后面,保证先来先到
+            await asyncio.sleep((1 - self._tokens) / rate)
+            self._tokens = 0.0
+            self._updated = time.monotonic()
+
+
+def get_token_bucket(key: Hashable, rate_per_min: float, burst: Optional[int] = None) -> TokenBucket:
+    """
+    获取当前事件循环中按键共享的令牌桶
+
+    同一服务商和API Key的所有调用应使用同一个键,才能共同受RPM限制
+
+    Args:
+        key: 令牌桶键,如 (服务商, API Key ID)
+        rate_per_min: 每分钟允许的调用次数(仅在首次创建时使用)
+        burst: 最多积攒的令牌数(仅在首次创建时使用)
+
+    Returns:
+        令牌桶
+    """
+    buckets = _token_buckets.setdefault(asyncio.get_running_loop(), {})
+    bucket = buckets.get(key)
+    if bucket is None:
+        bucket = buckets[key] = TokenBucket(rate_per_min, burst)
+    return bucket
+
+
+class RedisConcurrencyLimiter:
+    """
+    基于Redis有序集合的跨进程并发限制器
+
+    每个名额是有序集合中的一个成员,分值为最近一次获取/续租时的Redis服务器时间:
+    - 获取: Lua脚本原子地清理过期成员,数量未达上限时加入新成员
+    - 续租: 持有期间每隔三分之一租期刷新分值,租期因此可以远短于单次调用耗时
+    - 释放: 删除自己的成员(获取被取消时也会删除,避免脚本已授予但未收到结果时泄漏名额)
+    - 持有进程异常退出时不再续租,成员在租期到期后被下一次获取清理
+
+    Redis不可用时不做限制(由调用方的进程内信号量兜底),避免阻塞业务
+    """
+
+    # KEYS[1]: 有序集合键; ARGV: 上限, 租期(秒), 成员ID
+    _ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - tonumber(ARGV[2]))
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[1]) then
+    redis.call('ZADD', KEYS[1], now, ARGV[3])
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+    # KEYS[1]: 有序集合键; ARGV: 租期(秒), 成员ID
+    _RENEW_SCRIPT = """
+if not redis.call('ZSCORE', KEYS[1], ARGV[2]) then
+    return 0
+end
+local t = redis.call('TIME')
+redis.call('ZADD', KEYS[1], tonumber(t[1]) + tonumber(t[2]) / 1000000, ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+    def __init__(
+            self,
+            key: str,
+            limit: int,
+            lease_seconds: int = 30,
+            poll_interval: float = 0.2,
+            redis_client: Optional[redis.Redis] = None,
+    ):
+        """
+        初始化限制器
+
+        Args:
+            key: Redis有序集合键
+            limit: 所有进程共享的并发上限
+            lease_seconds: 名额租期(秒),持有期间自动续租
+            poll_interval: 名额已满时的轮询间隔(秒)
+            redis_client: Redis客户端,默认使用当前事件循环共享的客户端
+        """
+        self.key = key
+        self.limit = limit
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._redis = redis_client
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[None]:
+        """等待并占用一个名额,退出上下文时释放"""
+        client = self._redis or get_redis_client()
+        member = secrets.token_hex(8)
+        acquired = False
+        try:
+            while not await client.eval(
+                    self._ACQUIRE_SCRIPT, 1, self.key, self.limit, self.lease_seconds, member
+            ):
+                # 加随机抖动,避免多个等待者同时轮询
+                await asyncio.sleep(self.poll_interval * (1 + random.random()))
+            acquired = True
+        except RedisError as e:
+            logger.warning(f"Redis并发限制不可用,仅使用进程内限制: {e}")
+        except BaseException:
+            # 取消可能发生在脚本已授予名额之后、收到结果之前;未授予时删除是空操作
+            await self._release(client, member)
+            raise
+
+        heartbeat = asyncio.create_task(self._heartbeat(client, member)) if acquired else None
+        try:
+            yield
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+                await asyncio.gather(heartbeat, return_exceptions=True)
+            if acquired:
+                await self._release(client, member)
+
+    async def _heartbeat(self, client: redis.Redis, member: str) -> None:
+        """持有名额期间定期续租"""
+        interval = max(self.lease_seconds / 3, 0.1)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await client.eval(self._RENEW_SCRIPT, 1, self.key, self.lease_seconds, member):
+                    # 续租间隔内未能续上(如进程长时间阻塞),名额已被回收
+                    logger.warning(f"Redis并发名额已过期,停止续租: {self.key}")
+                    return
+            except RedisError as e:
+                logger.warning(f"续租Redis并发名额失败: {e}")
+
+    async def _release(self, client: redis.Redis, member: str) -> None:
+        """删除自己的成员"""
+        try:
+            await client.zrem(self.key, member)
+        except RedisError as e:
+            # 释放失败时名额在租期到期后自动回收
+            logger.warning(f"释放Redis并发名额失败: {e}")
+
+
+__all__ = [
+    "AimdLimiter",
+    "RedisConcurrencyLimiter",
+    "TokenBucket",
+    "get_token_bucket",
+]
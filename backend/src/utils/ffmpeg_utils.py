@@ -3,8 +3,9 @@ FFmpeg工具函数 - 视频处理相关的FFmpeg操作
 """
 
 import subprocess
+import tempfile
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import IO, List, Optional, Tuple
 
 from src.core.logging import get_logger
 
@@ -214,6 +215,26 @@ def run_ffmpeg_command(command: List[str], timeout: int = 300) -> Tuple[bool, st
         return False, "", error_msg
 
 
+def parse_ffmpeg_output_duration(stderr: str) -> Optional[float]:
+    """
+    从FFmpeg的 -progress 输出中解析已写出的媒体时长
+
+    Args:
+        stderr: FFmpeg标准错误输出(需使用 -progress pipe:2)
+
+    Returns:
+        输出时长（秒），无法解析时返回None
+    """
+    duration = None
+    for line in stderr.splitlines():
+        # 注意: FFmpeg的out_time_ms实际单位也是微秒,这里使用含义明确的out_time_us
+        if line.startswith("out_time_us="):
+            value = line.split("=", 1)[1].strip()
+            if value.isdigit():
+                duration = int(value) / 1_000_000
+    return duration
+
+
 def build_sentence_video_command(
         image_path: str,
         audio_path: str,
@@ -621,9 +642,153 @@ def _concatenate_with_trim(
         return False
 
 
+# 输出可流式写出的分片MP4(moov在文件头,无需回写),用于直接管道上传
+FRAGMENTED_MP4_OUTPUT_ARGS = [
+    "-movflags", "frag_keyframe+empty_moov+default_base_moof",
+    "-f", "mp4",
+]
+
+
+def build_concat_command(
+        concat_file_path: Path,
+        output: str,
+        bgm_path: Optional[Path] = None,
+        bgm_volume: float = 0.15,
+        loop_bgm: bool = True,
+        output_args: Optional[List[str]] = None
+) -> List[str]:
+    """
+    构建基于concat demuxer的快速拼接命令(可选混合BGM)
+
+    视频流直接复制(-c:v copy);混合BGM时只有音频重新编码。
+    命令带 -progress pipe:2,可用parse_ffmpeg_output_duration解析输出时长
+
+    Args:
+        concat_file_path: concat文件路径
+        output: 输出路径,或 "pipe:1" 输出到标准输出
+        bgm_path: BGM音频路径(可选)
+        bgm_volume: BGM音量（0.0-1.0）
+        loop_bgm: 是否循环BGM以匹配视频长度
+        output_args: 额外的输出参数(如输出格式)
+
+    Returns:
+        FFmpeg命令列表
+    """
+    command = [
+        "ffmpeg",
+        "-y",
+        "-nostats",
+        "-progress", "pipe:2",  # 输出进度信息,用于解析最终时长
+        "-f", "concat",
+        "-safe", "0",
+        "-i", str(concat_file_path),
+    ]
+
+    if bgm_path is None:
+        command.extend(["-c", "copy"])  # 直接复制流，不重新编码
+    else:
+        # BGM循环交给输入端 -stream_loop,无需预先探测视频和BGM时长
+        if loop_bgm:
+            command.extend(["-stream_loop", "-1"])
+        filter_complex = (
+            f"[1:a]volume={bgm_volume}[bgm];"
+            f"[0:a][bgm]amix=inputs=2:duration=first:dropout_transition=2[aout]"
+        )
+        command.extend([
+            "-i", str(bgm_path),
+            "-filter_complex", filter_complex,
+            "-map", "0:v",
+            "-map", "[aout]",
+            "-c:v", "copy",    # 视频流直接复制，不重新编码
+            "-c:a", "aac",
+            "-b:a", "192k",
+        ])
+
+    command.extend(output_args or [])
+    command.append(output)
+    return command
+
+
+def start_ffmpeg_stream(command: List[str]) -> Tuple[subprocess.Popen, IO[bytes]]:
+    """
+    启动输出到标准输出的FFmpeg进程
+
+    标准错误写入临时文件而不是管道,避免读取stdout时因stderr缓冲区写满而死锁
+
+    Args:
+        command: FFmpeg命令列表(输出为 pipe:1)
+
+    Returns:
+        (进程对象, 标准错误临时文件)
+    """
+    logger.info(f"执行FFmpeg命令(流式输出): {' '.join(command)}")
+    stderr_file = tempfile.TemporaryFile()
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr_file)
+    return process, stderr_file
+
+
+def finish_ffmpeg_stream(
+        process: subprocess.Popen,
+        stderr_file: IO[bytes],
+        timeout: int = 600
+) -> Tuple[bool, str]:
+    """
+    等待流式FFmpeg进程结束并收集标准错误
+
+    Args:
+        process: start_ffmpeg_stream返回的进程
+        stderr_file: start_ffmpeg_stream返回的标准错误文件
+        timeout: 超时时间（秒）
+
+    Returns:
+        (是否成功, 标准错误)
+    """
+    try:
+        if process.stdout:
+            process.stdout.close()
+        try:
+            returncode = process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            returncode = process.wait()
+            logger.error(f"FFmpeg命令执行超时（{timeout}秒）")
+
+        stderr_file.seek(0)
+        stderr = stderr_file.read().decode("utf-8", errors="replace")
+    finally:
+        stderr_file.close()
+
+    success = returncode == 0
+    if success:
+        logger.info("FFmpeg命令执行成功")
+    else:
+        logger.error(f"FFmpeg命令执行失败: {stderr}")
+    return success, stderr
+
+
 def _concatenate_videos_fast(video_paths: List[Path], output_path: Path, concat_file_path: Path) -> bool:
     """
     快速拼接视频(不去除重复帧)
+
+    Args:
+        video_paths: 视频文件路径列表
+        output_path: 输出视频路径
+        concat_file_path: concat文件路径
+
+    Returns:
+        是否成功
+    """
+    success, _ = concatenate_videos_fast(video_paths, output_path, concat_file_path)
+    return success
+
+
+def concatenate_videos_fast(
+        video_paths: List[Path],
+        output_path: Path,
+        concat_file_path: Path
+) -> Tuple[bool, Optional[float]]:
+    """
+    快速拼接视频(不去除重复帧)
     
     使用 -c copy 直接复制流,速度快但会保留重复帧
     
@@ -633,36 +798,28 @@ def _concatenate_videos_fast(video_paths: List[Path], output_path: Path, concat_
         concat_file_path: concat文件路径
     
     Returns:
-        是否成功
+        (是否成功, 输出视频时长), 时长从FFmpeg进度输出解析,失败时为None
     """
     try:
         # 创建concat文件
         create_concat_file(video_paths, concat_file_path)
 
         # 构建拼接命令
-        command = [
-            "ffmpeg",
-            "-y",
-            "-f", "concat",
-            "-safe", "0",
-            "-i", str(concat_file_path),
-            "-c", "copy",  # 直接复制流，不重新编码
-            str(output_path)
-        ]
+        command = build_concat_command(concat_file_path, str(output_path))
 
         # 执行命令
         success, stdout, stderr = run_ffmpeg_command(command, timeout=600)
 
         if success:
             logger.info(f"视频拼接成功(快速模式): {output_path}")
-        else:
-            logger.error(f"视频拼接失败: {stderr}")
+            return True, parse_ffmpeg_output_duration(stderr)
 
-        return success
+        logger.error(f"视频拼接失败: {stderr}")
+        return False, None
 
     except Exception as e:
         logger.error(f"视频拼接异常: {e}")
-        return False
+        return False, None
 
 
 
@@ -753,6 +910,60 @@ def mix_bgm_with_video(
 
 
 
+def concat_and_mix_bgm(
+        video_paths: List[Path],
+        bgm_path: Path,
+        output_path: Path,
+        concat_file_path: Path,
+        bgm_volume: float = 0.15,
+        loop_bgm: bool = True
+) -> Tuple[bool, Optional[float]]:
+    """
+    一次FFmpeg调用完成视频快速拼接和BGM混合
+
+    视频流直接复制(-c:v copy),只有音频重新编码,
+    相比先拼接再混合BGM减少一次完整的读写过程
+
+    Args:
+        video_paths: 视频文件路径列表
+        bgm_path: BGM音频路径
+        output_path: 输出视频路径
+        concat_file_path: concat文件路径
+        bgm_volume: BGM音量（0.0-1.0），默认0.15（15%）
+        loop_bgm: 是否循环BGM以匹配视频长度
+
+    Returns:
+        (是否成功, 输出视频时长), 时长从FFmpeg进度输出解析,失败时为None
+    """
+    try:
+        if len(video_paths) == 0:
+            logger.error("视频路径列表为空")
+            return False, None
+
+        create_concat_file(video_paths, concat_file_path)
+
+        command = build_concat_command(
+            concat_file_path,
+            str(output_path),
+            bgm_path=bgm_path,
+            bgm_volume=bgm_volume,
+            loop_bgm=loop_bgm
+        )
+
+        success, stdout, stderr = run_ffmpeg_command(command, timeout=600)
+
+        if success:
+            logger.info(f"视频拼接并混合BGM成功: {output_path}")
+            return True, parse_ffmpeg_output_duration(stderr)
+
+        logger.error(f"视频拼接并混合BGM失败: {stderr}")
+        return False, None
+
+    except Exception as e:
+        logger.error(f"视频拼接并混合BGM异常: {e}")
+        return False, None
+
+
 def apply_video_speed(
         input_path: str,
         output_path: str,
@@ -836,8 +1047,15 @@ __all__ = [
     "get_video_fps",
     "create_concat_file",
     "run_ffmpeg_command",
+    "parse_ffmpeg_output_duration",
     "build_sentence_video_command",
     "concatenate_videos",
+    "concatenate_videos_fast",
+    "concat_and_mix_bgm",
+    "build_concat_command",
+    "start_ffmpeg_stream",
+    "finish_ffmpeg_stream",
+    "FRAGMENTED_MP4_OUTPUT_ARGS",
     "apply_video_speed",
     "mix_bgm_with_video",
 ]
@@ -0,0 +1,121 @@
+"""
+本地磁盘文件缓存 - 按键缓存下载过的文件,按总大小做LRU淘汰
+"""
+
+import hashlib
+import os
+import shutil
+from pathlib import Path
+from typing import Union
+
+from src.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class LocalFileCache:
+    """
+    基于本地目录的内容缓存
+
+    - 缓存文件路径: cache_dir/<sha256前两位>/<sha256>
+    - 命中时优先使用硬链接(同一文件系统下零拷贝),否则复制
+    - 以文件mtime作为最近使用时间,超过容量时淘汰最久未使用的文件
+    """
+
+    def __init__(self, cache_dir: Union[str, Path], max_size_bytes: int):
+        """
+        初始化缓存
+
+        Args:
+            cache_dir: 缓存目录
+            max_size_bytes: 缓存总大小上限(字节)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_size_bytes = max_size_bytes
+
+    def _cache_path(self, key: str) -> Path:
+        """计算缓存键对应的文件路径"""
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.cache_dir / digest[:2] / digest
+
+    @staticmethod
+    def _link_or_copy(src: Path, dest: Path) -> None:
+        """硬链接src到dest,跨文件系统时退化为复制"""
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        if dest.exists():
+            dest.unlink()
+        try:
+            os.link(src, dest)
+        except OSError:
+            shutil.copyfile(src, dest)
+
+    def get(self, key: str, dest_path: Union[str, Path]) -> bool:
+        """
+        从缓存取出文件到目标路径
+
+        Args:
+            key: 缓存键
+            dest_path: 目标路径
+
+        Returns:
+            是否命中缓存
+        """
+        cache_path = self._cache_path(key)
+        try:
+            self._link_or_copy(cache_path, Path(dest_path))
+            # 更新mtime作为最近使用时间
+            os.utime(cache_path)
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logger.warning(f"读取文件缓存失败: {key}, {e}")
+            return False
+
+    def put(self, key: str, src_path: Union[str, Path]) -> None:
+        """
+        将文件放入缓存(失败不影响调用方)
+
+        不会触发淘汰,批量写入后由调用方调用一次evict()
+
+        Args:
+            key: 缓存键
+            src_path: 源文件路径
+        """
+        cache_path = self._cache_path(key)
+        try:
+            # 先写临时文件再原子替换,避免并发读取到不完整文件
+            tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+            self._link_or_copy(Path(src_path), tmp_path)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning(f"写入文件缓存失败: {key}, {e}")
+
+    def evict(self) -> None:
+        """淘汰最久未使用的文件,直到缓存总大小不超过上限"""
+        try:
+            entries = []
+            total_size = 0
+            for path in self.cache_dir.glob("*/*"):
+                if path.name.endswith(".tmp"):
+                    continue
+                stat = path.stat()
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total_size += stat.st_size
+
+            if total_size <= self.max_size_bytes:
+                return
+
+            for _, size, path in sorted(entries):
+                path.unlink(missing_ok=True)
+                total_size -= size
+                logger.debug(f"淘汰文件缓存: {path}")
+                if total_size <= self.max_size_bytes:
+                    break
+        except OSError as e:
+            logger.warning(f"文件缓存淘汰失败: {e}")
+
+
+__all__ = [
+    "LocalFileCache",
+]
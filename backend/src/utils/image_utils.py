@@ -1,6 +1,7 @@
 """
 图像处理工具函数
 """
+import asyncio
 import base64
 import io
 import re
@@ -13,6 +14,36 @@ from src.utils.storage import get_storage_client, UploadFile
 
 logger = get_logger(__name__)
 
+# 图片文件头签名 (前缀字节, MIME类型)
+_MIME_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def detect_image_mime(data: bytes, default: str = "image/jpeg") -> str:
+    """
+    根据文件头识别图片MIME类型
+
+    Args:
+        data: 图片字节
+        default: 无法识别时返回的类型
+
+    Returns:
+        MIME类型
+    """
+    for signature, mime in _MIME_SIGNATURES:
+        if data.startswith(signature):
+            return mime
+    # WEBP/AVIF 为容器格式，类型标识位于固定偏移处
+    if data.startswith(b"RIFF") and data.startswith(b"WEBP", 8):
+        return "image/webp"
+    if data.startswith(b"ftyp", 4) and data[8:12] in (b"avif", b"avis"):
+        return "image/avif"
+    return default
+
 
 async def extract_image_url_from_response(result: Any) -> str:
     """
@@ -121,7 +152,8 @@ async def _extract_image_bytes(result: Any) -> Tuple[bytes, str]:
             if missing_padding:
                 base64_data += '=' * (4 - missing_padding)
             
-            image_bytes = base64.b64decode(base64_data)
+            # 多MB图片的base64解码放到线程池中执行，避免阻塞事件循环
+            image_bytes = await asyncio.to_thread(base64.b64decode, base64_data)
             return image_bytes, mime_type
         
         # 使用 URL
@@ -156,13 +188,14 @@ async def _download_image_from_url(image_url: str) -> Tuple[bytes, str]:
     """
     if image_url.startswith("data:"):
         # 解析 data URL: data:image/jpeg;base64,/9j/4AAQ...
-        match = re.match(r'data:([^;]+);base64,(.+)', image_url)
-        if not match:
+        # 只匹配逗号前的头部，避免对多MB的数据部分做正则扫描
+        header, _, base64_data = image_url.partition(',')
+        match = re.fullmatch(r'data:([^;]+);base64', header)
+        if not match or not base64_data:
             raise ValueError(f"无效的 data URL 格式: {image_url[:100]}")
         
         mime_type = match.group(1)
-        base64_data = match.group(2)
-        image_bytes = base64.b64decode(base64_data)
+        image_bytes = await asyncio.to_thread(base64.b64decode, base64_data)
         logger.info(f"从 data URL 解码图片, MIME: {mime_type}, 大小: {len(image_bytes)} bytes")
         return image_bytes, mime_type
     
@@ -194,9 +227,7 @@ async def _download_image_from_url(image_url: str) -> Tuple[bytes, str]:
             try:
                 storage_client = await get_storage_client()
                 image_bytes = await storage_client.download_file(object_key)
-                mime_type = 'image/png' # 默认，后续会自动处理
-                if image_bytes[:4] == b'\xff\xd8\xff\xe0': mime_type = 'image/jpeg'
-                elif image_bytes[:4] == b'\x89PNG': mime_type = 'image/png'
+                mime_type = detect_image_mime(image_bytes, default='image/png')
                 
                 logger.info(f"通过内部存储直接读取图片成功, 大小: {len(image_bytes)} bytes")
                 return image_bytes, mime_type
@@ -222,11 +253,13 @@ def _get_extension_from_mime(mime_type: str) -> str:
         'image/png': 'png',
         'image/gif': 'gif',
         'image/webp': 'webp',
+        'image/avif': 'avif',
     }
     return mime_to_ext.get(mime_type.lower(), 'jpg')
 
 
 __all__ = [
+    'detect_image_mime',
     'extract_image_url_from_response',
     'extract_and_upload_image',
 ]
@@ -0,0 +1,37 @@
+"""
+JSON编解码工具 - 优先使用orjson,未安装时退化为标准库json
+
+用于LLM返回的大段JSON、含多MB base64的请求体等解析/序列化开销明显的场景;
+需要缩进等可读格式的调试输出仍直接使用标准库json
+"""
+
+import json
+from typing import Any
+
+try:
+    # orjson 随 langsmith 安装(CPython)
+    import orjson
+
+    json_loads = orjson.loads
+    json_dumps_bytes = orjson.dumps
+
+    def json_dumps(obj: Any) -> str:
+        """序列化为紧凑的UTF-8 JSON字符串(不转义非ASCII字符)"""
+        return orjson.dumps(obj).decode("utf-8")
+except ImportError:
+    json_loads = json.loads
+
+    def json_dumps(obj: Any) -> str:
+        """序列化为紧凑的UTF-8 JSON字符串(不转义非ASCII字符)"""
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+    def json_dumps_bytes(obj: Any) -> bytes:
+        """序列化为UTF-8编码的JSON字节串"""
+        return json_dumps(obj).encode("utf-8")
+
+
+__all__ = [
+    "json_dumps",
+    "json_dumps_bytes",
+    "json_loads",
+]
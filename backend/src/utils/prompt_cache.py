@@ -0,0 +1,90 @@
+"""
+LLM输出缓存 - 按模型和完整prompt的哈希在Redis中缓存生成结果
+"""
+
+import hashlib
+from typing import Optional
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from src.core.logging import get_logger
+from src.utils.concurrency import get_redis_client
+
+logger = get_logger(__name__)
+
+
+class PromptResultCache:
+    """
+    LLM生成结果的精确匹配缓存
+
+    - 键: namespace + blake2b(模型 + 全部prompt片段)
+    - 只在输入完全相同时命中,不做相似度匹配(相近的输入仍需各自生成)
+    - Redis不可用时视为未命中,不影响生成
+    """
+
+    def __init__(
+            self,
+            namespace: str,
+            ttl_seconds: int,
+            redis_client: Optional[redis.Redis] = None,
+    ):
+        """
+        初始化缓存
+
+        Args:
+            namespace: 键前缀,区分不同用途的缓存
+            ttl_seconds: 缓存有效期(秒),不大于0时禁用缓存
+            redis_client: Redis客户端,默认使用当前事件循环共享的客户端
+        """
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self._redis = redis_client
+
+    @property
+    def enabled(self) -> bool:
+        """是否启用缓存"""
+        return self.ttl_seconds > 0
+
+    def make_key(self, model: Optional[str], *parts: str) -> str:
+        """
+        计算缓存键
+
+        Args:
+            model: 模型名称
+            *parts: 决定生成结果的全部prompt片段
+
+        Returns:
+            缓存键
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for part in (model or "", *parts):
+            digest.update(part.encode("utf-8"))
+            # 分隔符避免不同切分方式得到相同的拼接结果
+            digest.update(b"\x00")
+        return f"{self.namespace}:{digest.hexdigest()}"
+
+    async def get(self, key: str) -> Optional[str]:
+        """读取缓存,未命中或Redis不可用时返回None"""
+        if not self.enabled:
+            return None
+        try:
+            value = await (self._redis or get_redis_client()).get(key)
+        except RedisError as e:
+            logger.warning(f"读取LLM输出缓存失败: {e}")
+            return None
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    async def set(self, key: str, value: str) -> None:
+        """写入缓存(失败不影响调用方)"""
+        if not self.enabled:
+            return
+        try:
+            await (self._redis or get_redis_client()).set(key, value, ex=self.ttl_seconds)
+        except RedisError as e:
+            logger.warning(f"写入LLM输出缓存失败: {e}")
+
+
+__all__ = [
+    "PromptResultCache",
+]
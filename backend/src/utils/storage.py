@@ -2,10 +2,11 @@
 对象存储客户端 - 支持S3协议的多种存储服务
 """
 
+import asyncio
 import uuid
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterable, BinaryIO, Dict, List, Optional
 
 import aiofiles
 from fastapi import UploadFile
@@ -25,6 +26,41 @@ class StorageError(Exception):
     pass
 
 
+class _AsyncChunkReader:
+    """
+    把异步字节块迭代器包装成阻塞的 read(size) 接口
+
+    在线程池中被MinIO调用:每次需要更多数据时把下一次迭代提交到事件循环并等待结果,
+    内存中最多缓存一个分片的数据
+    """
+
+    def __init__(self, chunks: AsyncIterable[bytes], loop: asyncio.AbstractEventLoop):
+        self._chunks = chunks.__aiter__()
+        self._loop = loop
+        self._buffer = bytearray()
+        self._eof = False
+        # 迭代器抛出的原始异常(如网络超时),供调用方区分数据源错误和存储错误
+        self.error: Optional[BaseException] = None
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            try:
+                chunk = asyncio.run_coroutine_threadsafe(self._chunks.__anext__(), self._loop).result()
+            except StopAsyncIteration:
+                self._eof = True
+            except BaseException as e:
+                self.error = e
+                raise
+            else:
+                self._buffer += chunk
+
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
 class S3Storage:
     """S3协议存储客户端(支持MinIO, AWS S3, 阿里云OSS等)"""
 
@@ -53,6 +89,8 @@ class S3Storage:
             self.bucket_name = settings.STORAGE_BUCKET_NAME
             self.public_url = settings.STORAGE_PUBLIC_URL
 
+        # 存储桶已确认存在后不再重复检查
+        self._bucket_ready = False
         self.client = Minio(
             endpoint=endpoint,
             access_key=access_key,
@@ -62,10 +100,13 @@ class S3Storage:
         )
 
     async def ensure_bucket_exists(self) -> None:
-        """确保存储桶存在"""
+        """确保存储桶存在(每个客户端实例只检查一次)"""
+        if self._bucket_ready:
+            return
         try:
-            if not self.client.bucket_exists(self.bucket_name):
-                self.client.make_bucket(self.bucket_name, location="us-east-1")
+            # bucket_exists/make_bucket为同步网络调用,放到线程池中执行
+            if not await asyncio.to_thread(self.client.bucket_exists, self.bucket_name):
+                await asyncio.to_thread(self.client.make_bucket, self.bucket_name, location="us-east-1")
                 logger.info(f"创建MinIO存储桶: {self.bucket_name}")
 
                 # 设置存储桶策略（可选）
@@ -81,6 +122,7 @@ class S3Storage:
                     ]
                 }
                 # 注意：实际环境中可能需要更严格的权限控制
+            self._bucket_ready = True
         except S3Error as e:
             logger.error(f"创建MinIO存储桶失败: {e}")
             raise StorageError(f"无法创建存储桶: {str(e)}")
@@ -153,8 +195,9 @@ class S3Storage:
             file_size = file.file.tell()
             file.file.seek(0)  # 重置到开头
 
-            # 上传文件
-            result = self.client.put_object(
+            # put_object为同步阻塞调用,放到线程池执行,避免批量生成时阻塞事件循环
+            result = await asyncio.to_thread(
+                self.client.put_object,
                 bucket_name=self.bucket_name,
                 object_name=object_key,
                 data=file.file,
@@ -186,17 +229,21 @@ class S3Storage:
             file_path: str,
             original_filename: str,
             object_key: Optional[str] = None,
-            metadata: Optional[Dict[str, str]] = None
+            metadata: Optional[Dict[str, str]] = None,
+            content_type: str = "application/octet-stream"
     ) -> Dict[str, Any]:
         """
         从本地路径上传文件到MinIO
 
+        直接从磁盘流式上传(大文件自动分片),不经过内存缓冲
+
         Args:
             user_id: 用户ID
             file_path: 本地文件路径
             original_filename: 原始文件名
             object_key: 对象键（可选）
             metadata: 文件元数据
+            content_type: 文件MIME类型
 
         Returns:
             上传结果信息
@@ -218,21 +265,21 @@ class S3Storage:
             # 准备元数据
             metadata.update({
                 "original_filename": encoded_filename,
-                "content_type": "application/octet-stream",
+                "content_type": content_type,
                 "upload_time": datetime.now().isoformat(),
                 "user_id": user_id,
                 "file_path": file_path,
             })
 
-            # 上传文件
-            with open(file_path, 'rb') as file_data:
-                result = self.client.put_object(
-                    bucket_name=self.bucket_name,
-                    object_name=object_key,
-                    data=file_data,
-                    length=file_size,
-                    metadata=metadata,
-                )
+            # fput_object从磁盘分片读取并上传,属于阻塞调用,放到线程池执行
+            result = await asyncio.to_thread(
+                self.client.fput_object,
+                bucket_name=self.bucket_name,
+                object_name=object_key,
+                file_path=file_path,
+                content_type=content_type,
+                metadata=metadata,
+            )
 
             logger.info(f"文件上传成功: {object_key}, 大小: {file_size} bytes")
 
@@ -251,20 +298,133 @@ class S3Storage:
             logger.error(f"文件上传异常: {e}")
             raise StorageError(f"文件上传异常: {str(e)}")
 
+    async def upload_stream(
+            self,
+            user_id: str,
+            stream: BinaryIO,
+            original_filename: str,
+            object_key: Optional[str] = None,
+            content_type: str = "application/octet-stream",
+            part_size: int = 10 * 1024 * 1024,
+            metadata: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """
+        上传长度未知的数据流到MinIO(分片上传,边读边传)
+
+        Args:
+            user_id: 用户ID
+            stream: 可读的二进制流(如子进程stdout)
+            original_filename: 原始文件名
+            object_key: 对象键（可选）
+            content_type: 文件MIME类型
+            part_size: 分片大小(字节),不能小于5MB
+            metadata: 文件元数据
+
+        Returns:
+            上传结果信息
+        """
+        try:
+            if not object_key:
+                object_key = self.generate_object_key(user_id, original_filename)
+
+            import urllib.parse
+            metadata = {
+                **(metadata or {}),
+                "original_filename": urllib.parse.quote(original_filename or "", safe=""),
+                "content_type": content_type,
+                "upload_time": datetime.now().isoformat(),
+                "user_id": user_id,
+            }
+
+            # length=-1 时MinIO按part_size分片读取并上传,读取为阻塞调用,放到线程池执行
+            result = await asyncio.to_thread(
+                self.client.put_object,
+                bucket_name=self.bucket_name,
+                object_name=object_key,
+                data=stream,
+                length=-1,
+                part_size=part_size,
+                content_type=content_type,
+                metadata=metadata,
+            )
+
+            logger.info(f"数据流上传成功: {object_key}")
+
+            return {
+                "bucket": self.bucket_name,
+                "object_key": object_key,
+                "etag": result.etag,
+                "url": self.get_presigned_url(object_key),
+            }
+
+        except S3Error as e:
+            logger.error(f"MinIO上传失败: {e}")
+            raise StorageError(f"文件上传失败: {str(e)}")
+        except Exception as e:
+            logger.error(f"数据流上传异常: {e}")
+            raise StorageError(f"文件上传异常: {str(e)}")
+
+    async def upload_async_stream(
+            self,
+            user_id: str,
+            chunks: AsyncIterable[bytes],
+            original_filename: str,
+            object_key: Optional[str] = None,
+            content_type: str = "application/octet-stream",
+            metadata: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """
+        上传异步字节块迭代器(如HTTP响应体)到MinIO,边下载边分片上传,不在内存中缓存整个文件
+
+        Args:
+            user_id: 用户ID
+            chunks: 异步字节块迭代器
+            original_filename: 原始文件名
+            object_key: 对象键（可选）
+            content_type: 文件MIME类型
+            metadata: 文件元数据
+
+        Returns:
+            上传结果信息
+        """
+        await self.ensure_bucket_exists()
+        reader = _AsyncChunkReader(chunks, asyncio.get_running_loop())
+        try:
+            return await self.upload_stream(
+                user_id,
+                reader,
+                original_filename,
+                object_key=object_key,
+                content_type=content_type,
+                metadata=metadata,
+            )
+        except StorageError:
+            # 数据源出错时抛出原始异常,调用方可据此判断是否重试
+            if reader.error is not None:
+                raise reader.error
+            raise
+
     def get_presigned_url(
             self,
             object_key: str,
-            expires: timedelta = timedelta(hours=1)
+            expires: timedelta = timedelta(hours=1),
+            public: bool = True
     ) -> str:
         """
         获取预签名URL
+
+        Args:
+            object_key: 对象键
+            expires: 有效期
+            public: 是否使用公开访问域名签名;后端自身访问(如ffprobe探测)时传False,
+                使用内部endpoint,避免公开域名(如localhost)在容器内不可达
         """
         try:
             # 默认使用内部客户端
             signing_client = self.client
 
             # 如果配置了公开访问 URL
-            if self.public_url:
+            if public and self.public_url:
                 public_url = self.public_url
                 clean_endpoint = public_url.replace("http://", "").replace("https://", "").rstrip('/')
                 is_secure = public_url.startswith("https://")
@@ -317,40 +477,67 @@ class S3Storage:
             文件内容
         """
         try:
-            response = self.client.get_object(self.bucket_name, object_key)
-            return response.read()
+            # get_object/read()为同步阻塞调用,放到线程池中执行,并发下载时才能真正重叠
+            return await asyncio.to_thread(self._read_object, object_key)
         except S3Error as e:
             logger.error(f"下载文件失败: {e}")
             raise StorageError(f"下载文件失败: {str(e)}")
 
-    async def download_file_to_path(self, object_key: str, dest_path: str) -> None:
+    def _read_object(self, object_key: str) -> bytes:
+        """同步读取完整对象内容,读取后释放连接"""
+        response = self.client.get_object(self.bucket_name, object_key)
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+    async def download_file_to_path(
+            self,
+            object_key: str,
+            dest_path: str,
+            chunk_size: int = 1024 * 1024
+    ) -> int:
         """
-        下载文件到指定路径
+        流式下载文件到指定路径(不在内存中缓存完整文件)
 
         Args:
             object_key: 对象键
             dest_path: 目标路径
+            chunk_size: 每次读取的块大小(字节)
+
+        Returns:
+            写入的字节数
         """
         try:
-            response = self.client.get_object(self.bucket_name, object_key)
+            # MinIO的get_object/stream()均为同步阻塞调用,放到线程池中执行以免阻塞事件循环
+            written = await asyncio.to_thread(
+                self._stream_object_to_path, object_key, dest_path, chunk_size
+            )
+            logger.info(f"文件下载成功: {object_key} -> {dest_path}, 大小: {written} bytes")
+            return written
 
+        except S3Error as e:
+            logger.error(f"下载文件失败: {e}")
+            raise StorageError(f"下载文件失败: {str(e)}")
+
+    def _stream_object_to_path(self, object_key: str, dest_path: str, chunk_size: int) -> int:
+        """同步地将对象分块写入本地文件,返回写入字节数"""
+        response = self.client.get_object(self.bucket_name, object_key)
+        try:
             # 确保目标目录存在
             Path(dest_path).parent.mkdir(parents=True, exist_ok=True)
 
-            # MinIO的stream()返回同步生成器，使用同步写入
+            written = 0
             with open(dest_path, 'wb') as f:
-                for chunk in response.stream(8192):
+                for chunk in response.stream(chunk_size):
                     f.write(chunk)
-            
+                    written += len(chunk)
+            return written
+        finally:
             response.close()
             response.release_conn()
 
-            logger.info(f"文件下载成功: {object_key} -> {dest_path}")
-
-        except S3Error as e:
-            logger.error(f"下载文件失败: {e}")
-            raise StorageError(f"下载文件失败: {str(e)}")
-
     async def delete_file(self, object_key: str) -> bool:
         """
         删除文件
@@ -485,6 +672,47 @@ class S3Storage:
         except S3Error:
             return False
 
+    async def stat_objects(
+            self,
+            object_keys: List[str],
+            max_workers: int = 32
+    ) -> Dict[str, Optional[int]]:
+        """
+        并发获取多个对象的大小
+
+        Args:
+            object_keys: 对象键列表
+            max_workers: 最大并发请求数
+
+        Returns:
+            对象键到文件大小(字节)的映射,不存在的对象对应None
+
+        Raises:
+            StorageError: 除对象不存在以外的存储错误(权限、签名、服务端错误等)
+        """
+        if not object_keys:
+            return {}
+
+        semaphore = asyncio.Semaphore(max_workers)
+
+        def stat_one(object_key: str) -> Optional[int]:
+            try:
+                return self.client.stat_object(self.bucket_name, object_key).size
+            except S3Error as e:
+                # 只有对象不存在才视为缺失,其余错误不能误报为文件丢失
+                if e.code in ("NoSuchKey", "NoSuchObject"):
+                    return None
+                logger.error(f"获取文件信息失败 {object_key}: {e}")
+                raise StorageError(f"获取文件信息失败: {str(e)}")
+
+        async def stat_limited(object_key: str) -> Optional[int]:
+            async with semaphore:
+                return await asyncio.to_thread(stat_one, object_key)
+
+        sizes = await asyncio.gather(*(stat_limited(object_key) for object_key in object_keys))
+
+        return dict(zip(object_keys, sizes))
+
 
 # 全局存储客户端实例(向后兼容)
 storage_client = S3Storage()
@@ -13,6 +13,49 @@ from src.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+# LLM输出首尾的Markdown代码块标记(```json ... ```)
+# 开头和结尾的标记分别匹配: 缺少结尾标记(输出被截断)时也只去掉开头标记
+_CODE_FENCE_RE = re.compile(r"\A\s*```(?:json5?|JSON5?)?[ \t]*\n?|\s*```\s*\Z")
+
+
+def strip_code_fence(content: str) -> str:
+    """
+    去除LLM输出首尾的Markdown代码块标记
+
+    Args:
+        content: LLM输出内容
+
+    Returns:
+        去除代码块标记后的内容
+    """
+    return _CODE_FENCE_RE.sub("", content)
+
+
+# 截断文本时优先停在这些句末标点之后
+_SENTENCE_ENDINGS = "。！？!?；;\n"
+
+
+def clip_text(text: str, max_chars: int) -> str:
+    """
+    将文本截断到不超过max_chars个字符
+
+    截断位置后半段内有句末标点时停在完整句子处,否则硬截断并加省略号
+
+    Args:
+        text: 原文本
+        max_chars: 最大字符数
+
+    Returns:
+        截断后的文本,未超长时原样返回
+    """
+    if len(text) <= max_chars:
+        return text
+    head = text[:max_chars]
+    cut = max(head.rfind(mark) for mark in _SENTENCE_ENDINGS)
+    if cut >= max_chars // 2:
+        return head[:cut + 1].rstrip()
+    return head[:max_chars - 1] + "…"
+
 
 class ParagraphSplitter:
     """段落分割器，委托给 RecursiveCharacterTextSplitter"""
@@ -139,5 +182,7 @@ __all__ = [
     'ParagraphSplitter',
     'SentenceSplitter',
     'paragraph_splitter',
-    'sentence_splitter'
+    'sentence_splitter',
+    'clip_text',
+    'strip_code_fence'
 ]
@@ -10,7 +10,7 @@ from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.tasks.task import process_uploaded_file, get_processing_status, retry_failed_project, health_check
-from src.services.project_processing import project_processing_service
+from src.services.project_processing import ProjectProcessingService
 from src.services.project import ProjectService
 from src.models.project import Project, ProjectStatus
 from src.models.chapter import Chapter
@@ -317,28 +317,29 @@ class TestProjectProcessingService:
             {'content': '这是第三段。包含句子五。', 'order_index': 0, 'word_count': 6, 'character_count': 8}
         ]
 
-        with patch.object(project_processing_service, '_get_project') as mock_get_project, \
-             patch.object(project_processing_service, '_update_project_status') as mock_update_status, \
-             patch.object(project_processing_service, '_parse_text_content') as mock_parse, \
-             patch.object(project_processing_service, '_save_parsed_content') as mock_save, \
-             patch.object(project_processing_service, '_update_project_statistics') as mock_update_stats:
+        service = ProjectProcessingService(mock_db_session)
+
+        with patch.object(service, '_get_project') as mock_get_project, \
+             patch.object(service, '_clean_existing_data'), \
+             patch.object(service, '_update_project_status') as mock_update_status, \
+             patch.object(service, '_persist_status') as mock_persist_status, \
+             patch.object(service, '_parse_and_save_content') as mock_parse, \
+             patch.object(service, '_update_project_statistics') as mock_update_stats:
 
             # 设置模拟返回值
             mock_get_project.return_value = mock_project
-            mock_parse.return_value = (chapters_data, paragraphs_data, sentences_data)
+            mock_parse.return_value = (len(chapters_data), len(paragraphs_data), len(sentences_data))
 
             # 执行处理
-            result = await project_processing_service.process_uploaded_file(
-                mock_db_session, project_id, file_content
-            )
+            result = await service.process_uploaded_file(project_id, file_content)
 
-            # 验证调用
-            mock_get_project.assert_called_once_with(mock_db_session, project_id)
-            mock_update_status.assert_any_call(mock_db_session, mock_project, ProjectStatus.PARSING, 10)
+            # 验证调用（状态更新只修改对象，由_persist_status提交）
+            mock_get_project.assert_called_once_with(project_id)
+            mock_update_status.assert_any_call(mock_project, ProjectStatus.PARSING, 10)
             mock_parse.assert_called_once_with(project_id, file_content)
-            mock_save.assert_called_once()
-            mock_update_stats.assert_called_once()
-            mock_update_status.assert_called_with(mock_db_session, mock_project, ProjectStatus.PARSED, 100)
+            mock_update_stats.assert_called_once_with(mock_project)
+            mock_update_status.assert_called_with(mock_project, ProjectStatus.PARSED, 100)
+            assert mock_persist_status.call_count == 2
 
             # 验证结果
             assert result['success'] is True
@@ -73,7 +73,7 @@ def validate_processing_service():
 
     required_methods = [
         'process_uploaded_file',
-        '_parse_text_content',
+        '_parse_and_save_content',
         '_save_parsed_content',
         '_update_project_statistics',
         'get_processing_status'
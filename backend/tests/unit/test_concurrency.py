@@ -0,0 +1,183 @@
+"""
+并发控制工具单元测试
+"""
+
+import asyncio
+import time
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from src.utils.concurrency import AimdLimiter, RedisConcurrencyLimiter, TokenBucket, get_token_bucket
+
+
+class TestAimdLimiter:
+    """AIMD自适应并发限制器测试"""
+
+    async def test_increase_on_fast_success(self):
+        """成功且未超过目标延迟时加性增加"""
+        limiter = AimdLimiter(initial=4, increase_step=0.5, target_latency=1.0)
+
+        for _ in range(4):
+            async with limiter:
+                pass
+
+        assert limiter.limit == 6
+
+    async def test_decrease_on_failure(self):
+        """失败时乘性减少,且不低于下界"""
+        limiter = AimdLimiter(initial=8, min_limit=2)
+
+        with pytest.raises(RuntimeError):
+            async with limiter:
+                raise RuntimeError("429")
+        assert limiter.limit == 4
+
+        for _ in range(3):
+            with pytest.raises(RuntimeError):
+                async with limiter:
+                    raise RuntimeError("429")
+        assert limiter.limit == 2
+
+    async def test_concurrent_failures_decrease_once(self):
+        """同一批并发的失败只减半一次"""
+        limiter = AimdLimiter(initial=8)
+        release = asyncio.Event()
+
+        async def fail():
+            async with limiter:
+                await release.wait()
+                raise RuntimeError("timeout")
+
+        tasks = [asyncio.create_task(fail()) for _ in range(4)]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        assert limiter.limit == 4
+
+    async def test_limits_in_flight(self):
+        """同时执行的调用数不超过当前上限"""
+        limiter = AimdLimiter(initial=2, min_limit=2, max_limit=2)
+        running = 0
+        peak = 0
+
+        async def work():
+            nonlocal running, peak
+            async with limiter:
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*[work() for _ in range(6)])
+
+        assert peak == 2
+
+
+class TestTokenBucket:
+    """令牌桶限速器测试"""
+
+    async def test_burst_then_wait(self):
+        """积攒的令牌用完后按补充速率等待"""
+        bucket = TokenBucket(rate_per_min=600, burst=2)
+
+        start = time.monotonic()
+        await bucket.acquire()
+        await bucket.acquire()
+        assert time.monotonic() - start < 0.05
+
+        await bucket.acquire()
+        assert time.monotonic() - start >= 0.09
+
+    async def test_disabled(self):
+        """速率不大于0时不限制"""
+        bucket = TokenBucket(rate_per_min=0)
+
+        start = time.monotonic()
+        for _ in range(100):
+            await bucket.acquire()
+
+        assert time.monotonic() - start < 0.05
+
+    async def test_shared_by_key(self):
+        """相同键返回同一个令牌桶"""
+        assert get_token_bucket(("p", "k"), 60) is get_token_bucket(("p", "k"), 60)
+        assert get_token_bucket(("p", "k"), 60) is not get_token_bucket(("p", "other"), 60)
+
+
+class FakeRedis:
+    """只实现限制器用到的eval/zrem的假Redis客户端"""
+
+    def __init__(self, grants=None, error=None):
+        self.grants = list(grants or [])
+        self.error = error
+        self.removed = []
+        self.renewals = 0
+
+    async def eval(self, script, numkeys, *args):
+        if self.error:
+            raise self.error
+        if script == RedisConcurrencyLimiter._RENEW_SCRIPT:
+            self.renewals += 1
+            return 1
+        return self.grants.pop(0)
+
+    async def zrem(self, key, member):
+        self.removed.append((key, member))
+
+
+class TestRedisConcurrencyLimiter:
+    """基于Redis的跨进程并发限制器测试"""
+
+    async def test_waits_until_granted_and_releases(self):
+        """名额已满时轮询等待,退出时删除自己的成员"""
+        client = FakeRedis(grants=[0, 0, 1])
+        limiter = RedisConcurrencyLimiter("k", limit=1, poll_interval=0, redis_client=client)
+
+        async with limiter.acquire():
+            assert client.grants == []
+
+        assert len(client.removed) == 1
+        assert client.removed[0][0] == "k"
+
+    async def test_redis_unavailable_does_not_block(self):
+        """Redis不可用时直接放行,且不尝试释放"""
+        client = FakeRedis(error=RedisConnectionError("down"))
+        limiter = RedisConcurrencyLimiter("k", limit=1, redis_client=client)
+
+        async with limiter.acquire():
+            pass
+
+        assert client.removed == []
+
+    async def test_renews_lease_while_held(self):
+        """持有期间按三分之一租期续租,退出后停止"""
+        client = FakeRedis(grants=[1])
+        limiter = RedisConcurrencyLimiter("k", limit=1, lease_seconds=0.3, redis_client=client)
+
+        async with limiter.acquire():
+            await asyncio.sleep(0.35)
+
+        renewals = client.renewals
+        assert renewals >= 2
+        await asyncio.sleep(0.15)
+        assert client.renewals == renewals
+        assert len(client.removed) == 1
+
+    async def test_cancel_while_acquiring_releases(self):
+        """获取过程中被取消时删除可能已授予的成员"""
+        client = FakeRedis(grants=[0] * 1000)
+        limiter = RedisConcurrencyLimiter("k", limit=1, poll_interval=0.01, redis_client=client)
+
+        async def hold():
+            async with limiter.acquire():
+                pass
+
+        task = asyncio.create_task(hold())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert len(client.removed) == 1
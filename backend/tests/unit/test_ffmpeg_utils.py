@@ -0,0 +1,33 @@
+"""
+FFmpeg工具函数单元测试
+"""
+
+from src.utils.ffmpeg_utils import parse_ffmpeg_output_duration
+
+
+class TestParseFfmpegOutputDuration:
+    """FFmpeg进度输出解析测试"""
+
+    def test_uses_last_out_time(self):
+        """取最后一次进度输出的时长"""
+        stderr = "\n".join([
+            "frame=100",
+            "out_time_us=1000000",
+            "out_time_ms=1000000",
+            "progress=continue",
+            "frame=200",
+            "out_time_us=12500000",
+            "progress=end",
+        ])
+
+        assert parse_ffmpeg_output_duration(stderr) == 12.5
+
+    def test_ignores_unknown_values(self):
+        """无效值不覆盖已解析的时长"""
+        stderr = "out_time_us=3000000\nout_time_us=N/A\n"
+
+        assert parse_ffmpeg_output_duration(stderr) == 3.0
+
+    def test_returns_none_without_progress(self):
+        """没有进度输出时返回None"""
+        assert parse_ffmpeg_output_duration("Input #0, concat, from 'concat.txt'") is None
@@ -0,0 +1,47 @@
+"""
+本地文件缓存单元测试
+"""
+
+import os
+
+from src.utils.file_cache import LocalFileCache
+
+
+class TestLocalFileCache:
+    """本地文件缓存测试"""
+
+    def test_get_miss(self, tmp_path):
+        """未缓存的键返回False"""
+        cache = LocalFileCache(tmp_path / "cache", max_size_bytes=1024)
+
+        assert cache.get("missing", tmp_path / "out.mp4") is False
+        assert not (tmp_path / "out.mp4").exists()
+
+    def test_put_then_get(self, tmp_path):
+        """写入后可以取回相同内容"""
+        cache = LocalFileCache(tmp_path / "cache", max_size_bytes=1024)
+        src = tmp_path / "src.mp4"
+        src.write_bytes(b"video-bytes")
+
+        cache.put("videos/a.mp4", src)
+
+        dest = tmp_path / "work" / "dest.mp4"
+        assert cache.get("videos/a.mp4", dest) is True
+        assert dest.read_bytes() == b"video-bytes"
+
+    def test_evict_least_recently_used(self, tmp_path):
+        """超过容量时淘汰最久未使用的文件"""
+        cache = LocalFileCache(tmp_path / "cache", max_size_bytes=10)
+        old = tmp_path / "old.mp4"
+        old.write_bytes(b"123456")
+        new = tmp_path / "new.mp4"
+        new.write_bytes(b"abcdef")
+
+        cache.put("old", old)
+        cache.put("new", new)
+        os.utime(cache._cache_path("old"), (1, 1))
+
+        cache.evict()
+
+        assert cache.get("old", tmp_path / "x.mp4") is False
+        assert cache.get("new", tmp_path / "y.mp4") is True
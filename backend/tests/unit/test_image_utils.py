@@ -0,0 +1,25 @@
+"""
+图像工具函数单元测试
+"""
+
+from src.utils.image_utils import detect_image_mime
+
+
+class TestDetectImageMime:
+    """图片MIME类型识别测试"""
+
+    def test_common_signatures(self):
+        """识别常见图片格式的文件头"""
+        assert detect_image_mime(b"\x89PNG\r\n\x1a\n" + b"\x00" * 8) == "image/png"
+        assert detect_image_mime(b"\xff\xd8\xff\xe1" + b"\x00" * 8) == "image/jpeg"
+        assert detect_image_mime(b"GIF89a" + b"\x00" * 8) == "image/gif"
+
+    def test_container_formats(self):
+        """识别WEBP/AVIF容器格式"""
+        assert detect_image_mime(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "image/webp"
+        assert detect_image_mime(b"\x00\x00\x00\x1cftypavif") == "image/avif"
+
+    def test_unknown_uses_default(self):
+        """无法识别时返回默认类型"""
+        assert detect_image_mime(b"RIFF\x00\x00\x00\x00WAVE") == "image/jpeg"
+        assert detect_image_mime(b"", default="image/png") == "image/png"
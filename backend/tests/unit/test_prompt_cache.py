@@ -0,0 +1,56 @@
+"""
+LLM输出缓存单元测试
+"""
+
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from src.utils.prompt_cache import PromptResultCache
+
+
+class FakeRedis:
+    """只实现缓存用到的get/set的假Redis客户端"""
+
+    def __init__(self, error=None):
+        self.data = {}
+        self.error = error
+
+    async def get(self, key):
+        if self.error:
+            raise self.error
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        if self.error:
+            raise self.error
+        self.data[key] = value.encode("utf-8")
+
+
+class TestPromptResultCache:
+    """LLM输出缓存测试"""
+
+    async def test_set_then_get(self):
+        """写入后相同模型和prompt命中"""
+        cache = PromptResultCache("t", ttl_seconds=60, redis_client=FakeRedis())
+        key = cache.make_key("model-a", "prompt")
+
+        assert await cache.get(key) is None
+        await cache.set(key, "结果")
+
+        assert await cache.get(key) == "结果"
+
+    def test_key_depends_on_model_and_parts(self):
+        """模型或prompt切分不同时键不同"""
+        cache = PromptResultCache("t", ttl_seconds=60)
+
+        assert cache.make_key("a", "xy") != cache.make_key("b", "xy")
+        assert cache.make_key("a", "x", "y") != cache.make_key("a", "xy")
+
+    async def test_disabled_and_unavailable(self):
+        """禁用或Redis不可用时视为未命中"""
+        disabled = PromptResultCache("t", ttl_seconds=0, redis_client=FakeRedis())
+        await disabled.set("k", "v")
+        assert await disabled.get("k") is None
+
+        broken = PromptResultCache("t", ttl_seconds=60, redis_client=FakeRedis(RedisConnectionError("down")))
+        await broken.set("k", "v")
+        assert await broken.get("k") is None
@@ -0,0 +1,54 @@
+"""
+提示词生成服务单元测试
+"""
+
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.services.prompt import PromptService
+
+
+class TestPromptService:
+    """PromptService测试"""
+
+    @pytest.fixture
+    def prompt_service(self):
+        """创建提示词服务实例"""
+        return PromptService(AsyncMock(spec=AsyncSession))
+
+    @pytest.fixture
+    def mock_sentence(self):
+        """模拟句子"""
+        sentence = Mock()
+        sentence.paragraph.chapter.project.owner_id = "user123"
+        return sentence
+
+    def test_build_system_prompt_unknown_style(self, prompt_service):
+        """测试未知风格回退到cinematic"""
+        assert prompt_service._build_system_prompt("unknown") == PromptService.SYSTEM_PROMPTS["cinematic"]
+        assert PromptService.SYSTEM_PROMPTS["anime"].endswith(PromptService.STYLE_TEMPLATES["anime"])
+
+    @pytest.mark.parametrize("custom_prompt, style, expected", [
+        (None, "anime", PromptService.SYSTEM_PROMPTS["anime"]),
+        ("", "ink", PromptService.SYSTEM_PROMPTS["ink"]),
+        ("自定义提示词", "anime", "自定义提示词"),
+    ])
+    @patch('src.services.prompt.APIKeyService')
+    @patch('src.services.prompt.ProviderFactory')
+    @patch('src.services.prompt.process_sentence', new_callable=AsyncMock)
+    async def test_generate_prompts_system_prompt(
+            self, mock_process, mock_factory, mock_api_key_service,
+            prompt_service, mock_sentence, custom_prompt, style, expected
+    ):
+        """测试未提供自定义提示词时使用风格预设作为系统提示词"""
+        mock_process.return_value = (mock_sentence, "a prompt")
+        mock_api_key_service.return_value.update_usage = AsyncMock()
+
+        result = await prompt_service._generate_prompts(
+            [mock_sentence], Mock(), style, custom_prompt=custom_prompt
+        )
+
+        # process_sentence(sentence, api_key, llm_provider, system_prompt, semaphore, model)
+        assert mock_process.call_args.args[3] == expected
+        assert result["success"] == 1
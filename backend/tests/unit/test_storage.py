@@ -208,6 +208,28 @@ class TestMinIOStorage:
         with pytest.raises(StorageError):
             await storage.download_file("test-object-key")
 
+    @patch('src.utils.storage.get_storage_client')
+    async def test_download_file_to_path_streams_chunks(self, mock_get_storage, tmp_path):
+        """测试流式下载到本地路径"""
+        mock_storage = AsyncMock()
+        mock_response = Mock()
+        mock_response.stream.return_value = iter([b"chunk-1", b"chunk-2"])
+        mock_storage.client.get_object.return_value = mock_response
+        mock_get_storage.return_value = mock_storage
+
+        storage = MinIOStorage()
+        storage.client = mock_storage.client
+        storage.bucket_name = "test-bucket"
+
+        dest_path = tmp_path / "sub" / "video.mp4"
+        written = await storage.download_file_to_path("test-object-key", str(dest_path), chunk_size=4)
+
+        assert written == len(b"chunk-1chunk-2")
+        assert dest_path.read_bytes() == b"chunk-1chunk-2"
+        mock_response.stream.assert_called_once_with(4)
+        mock_response.close.assert_called_once()
+        mock_response.release_conn.assert_called_once()
+
     @patch('src.utils.storage.get_storage_client')
     async def test_delete_file_success(self, mock_get_storage):
         """测试文件删除成功"""
@@ -256,6 +278,22 @@ class TestMinIOStorage:
         assert result == mock_url
         mock_storage.client.presigned_get_object.assert_called_once()
 
+    def test_get_presigned_url_internal(self):
+        """测试不使用公开域名签名时直接使用内部客户端"""
+        mock_client = Mock()
+        mock_client.presigned_get_object.return_value = "http://minio:9000/file"
+
+        storage = MinIOStorage()
+        storage.client = mock_client
+        storage.bucket_name = "test-bucket"
+        storage.public_url = "http://localhost:9000"
+
+        with patch('src.utils.storage.Minio') as mock_minio:
+            result = storage.get_presigned_url("test-object-key", public=False)
+
+        assert result == "http://minio:9000/file"
+        mock_minio.assert_not_called()
+
     @patch('src.utils.storage.get_storage_client')
     async def test_get_presigned_url_error(self, mock_get_storage):
         """测试获取预签名URL失败"""
@@ -361,6 +399,54 @@ class TestMinIOStorage:
         mock_storage.client.stat_object.side_effect = S3Error("Not found", "NoSuchKey", "")
         assert await storage.file_exists("nonexistent-file") is False
 
+    @patch('src.utils.storage.get_storage_client')
+    async def test_stat_objects(self, mock_get_storage):
+        """测试批量获取对象大小"""
+        from minio.error import S3Error
+
+        mock_storage = AsyncMock()
+
+        def fake_stat(bucket, key):
+            if key == "missing":
+                raise S3Error(
+                    code="NoSuchKey", message="Not found", resource="",
+                    request_id="", host_id="", response=Mock(),
+                )
+            stat = Mock()
+            stat.size = len(key)
+            return stat
+
+        mock_storage.client.stat_object.side_effect = fake_stat
+        mock_get_storage.return_value = mock_storage
+
+        storage = MinIOStorage()
+        storage.client = mock_storage.client
+        storage.bucket_name = "test-bucket"
+
+        sizes = await storage.stat_objects(["a.mp4", "missing", "bb.mp4"])
+
+        assert sizes == {"a.mp4": 5, "missing": None, "bb.mp4": 6}
+        assert await storage.stat_objects([]) == {}
+
+    @patch('src.utils.storage.get_storage_client')
+    async def test_stat_objects_access_denied(self, mock_get_storage):
+        """测试批量获取对象大小时非NoSuchKey错误不被当作文件缺失"""
+        from minio.error import S3Error
+
+        mock_storage = AsyncMock()
+        mock_storage.client.stat_object.side_effect = S3Error(
+            code="AccessDenied", message="Access Denied", resource="",
+            request_id="", host_id="", response=Mock(),
+        )
+        mock_get_storage.return_value = mock_storage
+
+        storage = MinIOStorage()
+        storage.client = mock_storage.client
+        storage.bucket_name = "test-bucket"
+
+        with pytest.raises(StorageError):
+            await storage.stat_objects(["a.mp4"])
+
     @patch('src.utils.storage.get_storage_client')
     async def test_upload_file_from_path(self, mock_get_storage, sample_file):
         """测试从路径上传文件"""
@@ -370,7 +456,7 @@ class TestMinIOStorage:
 
         mock_result = Mock()
         mock_result.etag = "path-etag"
-        mock_storage.client.put_object.return_value = mock_result
+        mock_storage.client.fput_object.return_value = mock_result
         mock_storage.client.presigned_get_object.return_value = "http://test-url"
 
         mock_get_storage.return_value = mock_storage
@@ -390,6 +476,56 @@ class TestMinIOStorage:
         assert result['size'] > 0
         assert 'url' in result
 
+    async def test_upload_async_stream(self):
+        """测试异步字节块边读边上传"""
+        mock_client = Mock()
+        mock_client.bucket_exists.return_value = True
+        mock_client.presigned_get_object.return_value = "http://test-url"
+        received = []
+
+        def fake_put_object(**kwargs):
+            # 模拟MinIO按分片大小读取
+            while part := kwargs["data"].read(4):
+                received.append(part)
+            result = Mock()
+            result.etag = "stream-etag"
+            return result
+
+        mock_client.put_object.side_effect = fake_put_object
+
+        storage = MinIOStorage()
+        storage.client = mock_client
+        storage.bucket_name = "test-bucket"
+
+        async def chunks():
+            for chunk in [b"ab", b"cdef", b"g"]:
+                yield chunk
+
+        result = await storage.upload_async_stream(
+            "user123", chunks(), "video.mp4", content_type="video/mp4", metadata={"k": "v"}
+        )
+
+        assert received == [b"abcd", b"efg"]
+        assert result["etag"] == "stream-etag"
+        assert mock_client.put_object.call_args.kwargs["metadata"]["k"] == "v"
+
+    async def test_upload_async_stream_source_error(self):
+        """测试数据源出错时抛出原始异常"""
+        mock_client = Mock()
+        mock_client.bucket_exists.return_value = True
+        mock_client.put_object.side_effect = lambda **kwargs: kwargs["data"].read(4)
+
+        storage = MinIOStorage()
+        storage.client = mock_client
+        storage.bucket_name = "test-bucket"
+
+        async def chunks():
+            yield b"ab"
+            raise TimeoutError("read timeout")
+
+        with pytest.raises(TimeoutError):
+            await storage.upload_async_stream("user123", chunks(), "video.mp4")
+
     @patch('src.utils.storage.get_storage_client')
     async def test_copy_file(self, mock_get_storage):
         """测试复制文件"""
@@ -148,6 +148,34 @@ class TestTextParserService:
         assert all(s['order_index'] in [1, 2, 3, 4, 5] for s in sentences_data)
         assert all(s['status'] == 'pending' for s in sentences_data)
 
+        # 验证预分配的主键和上级外键
+        assert all(p['chapter_id'] == chapters_data[0]['id'] for p in paragraphs_data)
+        paragraph_ids = {p['id'] for p in paragraphs_data}
+        assert all(s['paragraph_id'] in paragraph_ids for s in sentences_data)
+
+    @pytest.mark.asyncio
+    async def test_iter_parse_to_models(self, parser_service):
+        """测试逐章节解析"""
+        text = """
+第一章 开始
+
+这是第一段。这是第一句。
+
+第二章 继续
+
+这是第二段。这是第二句。这是第三句。
+        """.strip()
+
+        batches = [
+            batch async for batch in parser_service.iter_parse_to_models("test-project-id", text)
+        ]
+
+        assert len(batches) == 2
+        for chapter_data, paragraphs_data, sentences_data in batches:
+            assert chapter_data['paragraph_count'] == len(paragraphs_data)
+            assert chapter_data['sentence_count'] == len(sentences_data)
+            assert all(p['chapter_id'] == chapter_data['id'] for p in paragraphs_data)
+
     def test_get_detection_stats(self, parser_service):
         """测试获取检测统计"""
         stats = parser_service.get_detection_stats()
@@ -0,0 +1,44 @@
+"""
+文本处理工具函数单元测试
+"""
+
+from src.utils.text_utils import clip_text, strip_code_fence
+
+
+class TestStripCodeFence:
+    """代码块标记清理测试"""
+
+    def test_json_fence(self):
+        """去除```json代码块标记"""
+        assert strip_code_fence('```json\n{"scenes": []}\n```') == '{"scenes": []}'
+
+    def test_plain_fence_with_trailing_whitespace(self):
+        """去除普通代码块标记,结尾带空白也能处理"""
+        assert strip_code_fence('```\n{"shots": []}\n```  \n') == '{"shots": []}'
+
+    def test_language_tag_variants_and_missing_closing_fence(self):
+        """支持JSON/json5标记,缺少结尾标记时保留完整内容"""
+        assert strip_code_fence('```JSON\n{"a": 1}\n```') == '{"a": 1}'
+        assert strip_code_fence('```json5\n{"a": 1}') == '{"a": 1}'
+
+    def test_without_fence(self):
+        """没有代码块标记时内容不变"""
+        assert strip_code_fence('{"a": "```"}') == '{"a": "```"}'
+
+
+class TestClipText:
+    """文本截断测试"""
+
+    def test_short_text_unchanged(self):
+        """未超长时原样返回"""
+        assert clip_text("短句。", 10) == "短句。"
+
+    def test_stops_at_sentence_end(self):
+        """后半段有句末标点时停在完整句子处"""
+        assert clip_text("第一句话很长。第二句话。第三句", 12) == "第一句话很长。第二句话。"
+
+    def test_hard_cut_with_ellipsis(self):
+        """没有合适的句末标点时硬截断并加省略号"""
+        clipped = clip_text("一" * 20, 10)
+        assert clipped == "一" * 9 + "…"
+        assert len(clipped) == 10